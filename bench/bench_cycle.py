@@ -0,0 +1,368 @@
+"""
+End-to-end benchmark of bot cycles against the offline stand-in in bench/fake_chain.py
+
+Runs every bot in main.BOTS once per key, in-process the way main.py does, for each key count,
+and reports per-phase timings (connect, balance check, quote/signature fetch, estimate, sign,
+send, confirm), transactions per second, p50/p95/p99 end-to-end latency and peak RSS.
+Results are written as JSON; --compare prints the change against an earlier results file.
+
+With --faults, one per simulated endpoint, the RPC goes through bench/fault_proxy.py: each scenario
+runs once through clean proxied endpoints and once through the faulty ones, and the report shows
+how wall-clock time, success rate and tail latency degrade.
+
+Usage: python bench/bench_cycle.py [--keys 1,10,100] [--bots owlto,apriori_bot] [--block-time 0.4]
+       [--latency 0.02] [--concurrency 50] [--output bench_cycle.json] [--compare old.json]
+       [--faults none --faults none --faults "latency=lognormal:0.3:1,ratelimit=0.1,stall=0.02"]
+"""
+import argparse
+import asyncio
+import atexit
+import collections
+import contextlib
+import hashlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional, Tuple
+
+# Make the project packages importable when this script is run directly
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# Reported phases and the timed operations (kind, name) that make them up; see utils.timings
+PHASES = {
+    'connect': [('connect', None)],
+    'balance check': [('rpc', 'eth_getBalance'), ('rpc', 'eth_call'), ('rpc', 'batch')],
+    'quote/signature fetch': [('http', None)],
+    'estimate': [('rpc', 'eth_estimateGas')],
+    'sign': [('sign', None)],
+    'send': [('rpc', 'eth_sendRawTransaction')],
+    'confirm': [('confirm', None)],
+}
+PERCENTILES = (50, 95, 99)
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile, None for no values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(p / 100 * len(ordered))) - 1))]
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    """Count, total and percentiles of durations, in milliseconds"""
+    summary = {'count': len(values), 'total_ms': round(sum(values) * 1000, 3)}
+    for p in PERCENTILES:
+        value = percentile(values, p)
+        summary[f"p{p}_ms"] = round(value * 1000, 3) if value is not None else None
+    return summary
+
+def phase_of(kind: str, name: str) -> str:
+    for phase, operations in PHASES.items():
+        if any(kind == op_kind and (op_name is None or op_name == name) for op_kind, op_name in operations):
+            return phase
+    return 'other rpc' if kind == 'rpc' else kind
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (ru_maxrss is in KiB on Linux, bytes on macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def bench_keys(count: int, scenario: str) -> List[str]:
+    """Fresh deterministic keys per scenario, so nonces and balances never carry over between scenarios"""
+    return ['0x' + hashlib.sha256(f"bench {scenario} {index}".encode()).hexdigest() for index in range(count)]
+
+@contextlib.contextmanager
+def quiet_output():
+    """Send stdout and stderr to /dev/null at the descriptor level, which also silences loggers holding their own stream"""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    with open(os.devnull, 'w') as devnull:
+        os.dup2(devnull.fileno(), 1)
+        os.dup2(devnull.fileno(), 2)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        for fd, copy in zip((1, 2), saved):
+            os.dup2(copy, fd)
+            os.close(copy)
+
+class PhaseCollector:
+    """Timing hook collecting durations per phase, plus successful sends and confirmations"""
+
+    def __init__(self):
+        self.durations: Dict[str, List[float]] = collections.defaultdict(list)
+        self.sent = 0
+        self.confirmed = 0
+
+    def __call__(self, kind: str, name: str, seconds: float, ok: bool):
+        phase = phase_of(kind, name)
+        self.durations[phase].append(seconds)
+        if ok and phase == 'send':
+            self.sent += 1
+        elif ok and phase == 'confirm':
+            self.confirmed += 1
+
+def start_fake_chain(args: argparse.Namespace) -> Tuple[subprocess.Popen, Dict[str, str]]:
+    """Start bench/fake_chain.py in its own process and read the environment it prints once listening"""
+    command = [
+        sys.executable, '-u', os.path.join(ROOT, 'bench', 'fake_chain.py'), '--port', str(args.port),
+        '--block-time', str(args.block_time), '--latency', str(args.latency), '--bridge-delay', str(args.bridge_delay),
+    ]
+    chain = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    environment = {}
+    for line in chain.stdout:
+        if line.strip().startswith('export '):
+            name, value = line.strip()[len('export '):].split('=', 1)
+            environment[name] = value
+            if len(environment) == 5:
+                break
+    else:
+        raise SystemExit(f"fake chain exited with code {chain.wait()}")
+    # Serving starts right after the banner; wait until the port answers
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"http://127.0.0.1:{args.port}/stats", timeout=1).read()
+            break
+        except OSError:
+            time.sleep(0.1)
+    return chain, environment
+
+def start_fault_proxy(args: argparse.Namespace) -> Tuple[subprocess.Popen, List[str], List[str]]:
+    """Start bench/fault_proxy.py with a clean and a faulty port per --faults profile, returning both URL lists"""
+    count = len(args.faults)
+    clean_ports = [args.port + 1 + index for index in range(count)]
+    faulty_ports = [args.port + 1 + count + index for index in range(count)]
+    endpoints = [f"{port}=none" for port in clean_ports] + [f"{port}={profile}" for port, profile in zip(faulty_ports, args.faults)]
+    command = [sys.executable, '-u', os.path.join(ROOT, 'bench', 'fault_proxy.py'), '--upstream', f"http://127.0.0.1:{args.port}"]
+    for endpoint in endpoints:
+        command += ['--endpoint', endpoint]
+    proxy = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    for line in proxy.stdout:
+        if line.startswith('export '):
+            break
+    else:
+        raise SystemExit(f"fault proxy exited with code {proxy.wait()}")
+    return proxy, [f"http://127.0.0.1:{port}" for port in clean_ports], [f"http://127.0.0.1:{port}" for port in faulty_ports]
+
+def injected_faults(urls: List[str]) -> Dict[str, int]:
+    """Faults injected so far by the proxy endpoints behind these URLs, summed"""
+    totals: collections.Counter = collections.Counter()
+    for url in urls:
+        with urllib.request.urlopen(f"{url}/stats", timeout=5) as response:
+            stats = json.load(response)
+        totals.update({key: value for key, value in stats.items() if key not in ('profile', 'requests', 'forwarded')})
+    return dict(totals)
+
+def degradation(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Faulted against clean runs of the same bot and key count"""
+    clean = {(item['bot'], item['keys']): item for item in results if item['mode'] == 'clean'}
+    report = []
+    for faulted in (item for item in results if item['mode'] == 'faulted'):
+        before = clean.get((faulted['bot'], faulted['keys']))
+        if before is None:
+            continue
+        ratio = lambda now, then: round(now / then, 2) if now is not None and then else None
+        report.append({
+            'bot': faulted['bot'],
+            'keys': faulted['keys'],
+            'wall_ratio': ratio(faulted['wall_s'], before['wall_s']),
+            'success_rate_clean': round(before['succeeded'] / before['runs'], 3),
+            'success_rate_faulted': round(faulted['succeeded'] / faulted['runs'], 3),
+            'p99_ratio': ratio(faulted['latency']['p99_ms'], before['latency']['p99_ms']),
+            'tx_per_s_ratio': ratio(faulted['tx_per_s'], before['tx_per_s']),
+            'faults_injected': faulted.get('faults_injected', {}),
+        })
+    return report
+
+def print_degradation(report: List[Dict[str, Any]]):
+    print(f"\n{'degradation':<24}{'keys':>6}{'wall x':>9}{'ok clean':>10}{'ok faulted':>12}{'p99 x':>8}{'tx/s x':>8}  faults")
+    for item in report:
+        faults = ', '.join(f"{name} {count}" for name, count in sorted(item['faults_injected'].items()) if count)
+        print(
+            f"{item['bot']:<24}{item['keys']:>6}{item['wall_ratio'] or 0:>9.2f}{item['success_rate_clean']:>10.0%}"
+            f"{item['success_rate_faulted']:>12.0%}{item['p99_ratio'] or 0:>8.2f}{item['tx_per_s_ratio'] or 0:>8.2f}  {faults or '-'}"
+        )
+
+async def run_scenario(runner, script: str, keys: List[str], concurrency: int, verbose: bool) -> Dict[str, Any]:
+    from utils.timings import add_timing_hook, remove_timing_hook
+    from utils.worker_pool import AccountWorkerPool
+
+    collector = PhaseCollector()
+    latencies: List[float] = []
+    results: List[bool] = []
+
+    async def job(private_key: str):
+        started = time.perf_counter()
+        results.append(await runner.run_bot(script, private_key))
+        latencies.append(time.perf_counter() - started)
+
+    pool = AccountWorkerPool(min(concurrency, len(keys)))
+    add_timing_hook(collector)
+    started = time.perf_counter()
+    try:
+        with contextlib.nullcontext() if verbose else quiet_output():
+            await pool.run_all([(key, lambda key=key: job(key)) for key in keys])
+    finally:
+        remove_timing_hook(collector)
+    wall = time.perf_counter() - started
+    latency = summarize(latencies)
+    return {
+        'runs': len(keys),
+        'succeeded': sum(results),
+        'wall_s': round(wall, 3),
+        'tx_per_s': round(collector.sent / wall, 3) if wall else None,
+        'confirmed_per_s': round(collector.confirmed / wall, 3) if wall else None,
+        'latency': {key: value for key, value in latency.items() if key != 'total_ms'},
+        'phases': {phase: summarize(values) for phase, values in sorted(collector.durations.items())},
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+def print_result(result: Dict[str, Any]):
+    latency = result['latency']
+    print(
+        f"{result['bot']:<24}{result['mode']:>8}{result['keys']:>6}{result['succeeded']:>6}/{result['runs']:<6}{result['wall_s']:>9.2f}"
+        f"{result['tx_per_s']:>9.2f}{latency['p50_ms']:>10.0f}{latency['p95_ms']:>10.0f}{latency['p99_ms']:>10.0f}{result['peak_rss_mb']:>9.1f}"
+    )
+
+def compare(results: List[Dict[str, Any]], previous_path: str):
+    """Print p50 latency and throughput changes against an earlier results file"""
+    with open(previous_path) as f:
+        previous = {(item['bot'], item['keys'], item.get('mode', 'direct')): item for item in json.load(f)['results']}
+    print(f"\nCompared with {previous_path}:")
+    for result in results:
+        before = previous.get((result['bot'], result['keys'], result['mode']))
+        if before is None:
+            continue
+        changes = []
+        for label, now, then in (
+            ('p50', result['latency']['p50_ms'], before['latency']['p50_ms']),
+            ('tx/s', result['tx_per_s'], before['tx_per_s']),
+        ):
+            if now is not None and then:
+                changes.append(f"{label} {then:.2f} -> {now:.2f} ({(now - then) / then * 100:+.1f}%)")
+        print(f"  {result['bot']:<24}{result['mode']:>8}{result['keys']:>6} keys: {', '.join(changes)}")
+
+async def run_benchmark(args: argparse.Namespace, modes: List[Tuple[str, Optional[List[str]]]]) -> List[Dict[str, Any]]:
+    """Run every bot at every key count once per (mode, RPC URLs); URLs of None mean RPC_CONFIG['urls']"""
+    # Imported only now: config reads the endpoint overrides when first imported
+    from config import RPC_CONFIG
+    from main import BOTS
+    from utils.bot_runner import BotRunner
+    from utils.rpc_client import close_session, get_web3
+
+    wanted = args.bots.split(',') if args.bots else None
+    bots = [(name, script) for name, script in BOTS if wanted is None or os.path.splitext(os.path.basename(script))[0] in wanted]
+    runners = {}
+    for mode, urls in modes:
+        runner = runners[mode] = BotRunner()
+        runner.preload(bots)
+        # A faulty endpoint can fail its first probe; without a client the bots would quietly connect on their own
+        for _ in range(10):
+            runner.w3 = await get_web3(urls, RPC_CONFIG['chain_id'])
+            if runner.w3 is not None:
+                break
+        else:
+            raise SystemExit(f"Could not connect to {urls or RPC_CONFIG['urls']} for the {mode} runs")
+    results = []
+    print(f"{'bot':<24}{'mode':>8}{'keys':>6}{'ok/runs':>13}{'wall s':>9}{'tx/s':>9}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS MB':>9}")
+    try:
+        for count in args.keys:
+            for name, script in bots:
+                for mode, urls in modes:
+                    keys = bench_keys(count, f"{script} {count} {mode} {time.time()}")
+                    result = {'bot': name, 'script': script, 'keys': count, 'mode': mode}
+                    before = injected_faults(urls) if mode == 'faulted' else None
+                    result.update(await run_scenario(runners[mode], script, keys, args.concurrency, args.verbose))
+                    if before is not None:
+                        after = injected_faults(urls)
+                        result['faults_injected'] = {fault: after[fault] - before.get(fault, 0) for fault in after}
+                    print_result(result)
+                    results.append(result)
+    finally:
+        await close_session()
+    return results
+
+def isolate_state(directory: str):
+    """Point every file the bots read or write at `directory`
+
+    The stand-in has the real chain id and contract addresses, so gas limits learned from its stub
+    receipts would otherwise be served to real runs from gas_profile.json.
+    """
+    from config import CASSETTE_CONFIG, GAS_PROFILE_CONFIG, KEY_STORE_CONFIG, TRACING_CONFIG
+    key_path = os.path.join(directory, 'pvkey.txt')
+    open(key_path, 'w').close()  # Benchmark keys are passed to the bots directly
+    KEY_STORE_CONFIG.update({'path': key_path, 'index_path': os.path.join(directory, 'pvkey.index.json')})
+    GAS_PROFILE_CONFIG['path'] = os.path.join(directory, 'gas_profile.json')
+    CASSETTE_CONFIG['path'] = os.path.join(directory, 'cassette.jsonl.gz')
+    TRACING_CONFIG['directory'] = os.path.join(directory, 'traces')
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of bot cycles against a local chain stand-in")
+    parser.add_argument('--keys', type=lambda text: [int(item) for item in text.split(',')], default=[1, 10, 100], help="comma-separated key counts")
+    parser.add_argument('--bots', help="comma-separated script names, e.g. owlto,apriori_bot (default: all)")
+    parser.add_argument('--block-time', type=float, default=0.4)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds the stand-in adds to every response")
+    parser.add_argument('--bridge-delay', type=float, default=1.0)
+    parser.add_argument('--concurrency', type=int, default=50, help="wallets run at the same time")
+    parser.add_argument('--port', type=int, default=8547)
+    parser.add_argument('--output', default='bench_cycle.json')
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    parser.add_argument('--verbose', action='store_true', help="show the bots' own output")
+    parser.add_argument('--faults', action='append', help="fault profile of one endpoint (see bench/fault_proxy.py); repeat per endpoint")
+    args = parser.parse_args()
+
+    chain, environment = start_fake_chain(args)
+    os.environ.update(environment)
+    processes = [chain]
+    workdir = tempfile.TemporaryDirectory(prefix='bench_cycle-')
+    atexit.register(workdir.cleanup)  # Registered first so it runs last, after the gas profile is saved
+    isolate_state(workdir.name)
+    try:
+        if args.faults:
+            proxy, clean_urls, faulty_urls = start_fault_proxy(args)
+            processes.append(proxy)
+            modes = [('clean', clean_urls), ('faulted', faulty_urls)]
+        else:
+            modes = [('direct', None)]
+        results = asyncio.run(run_benchmark(args, modes))
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    report = {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'options': {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'verbose')},
+        },
+        'results': results,
+    }
+    if args.faults:
+        report['degradation'] = degradation(results)
+        print_degradation(report['degradation'])
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
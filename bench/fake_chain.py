@@ -0,0 +1,1003 @@
+"""
+Offline stand-in for the Monad testnet and the services the bots talk to, for benchmarking
+
+Serves on one port:
+    /                            Monad testnet JSON-RPC (chain 10143), batch requests included
+    /ws                          Monad WebSocket subscriptions (newHeads, logs)
+    /sepolia                     Sepolia JSON-RPC (chain 11155111), for the Orbiter bridge
+    /nad/register/signature      NAD Domains registration signature API
+    /atlantis/api/Ox/swap/quote  Atlantis DEX quote API
+    /stats                       Request counts per method
+
+The chains are in-memory ledgers rather than an EVM: accounts, nonces, fees, the mempool,
+receipts and logs behave like a node's, and each contract the bots call is a Python stub
+dispatched by address and selector, implementing as much of the contract as the bots rely on.
+Only the latest state is kept, so every block tag reads the head. Blocks are mined every
+--block-time seconds, or as soon as a transaction arrives with --block-time 0. Given the same
+transactions, every balance, receipt and game outcome is the same from run to run.
+
+Usage: python bench/fake_chain.py [--port 8545] [--block-time 0.4]
+and run the bots with the environment printed at startup, e.g.
+    MONAD_RPC_URLS=http://127.0.0.1:8545 python script/owlto.py
+"""
+import argparse
+import asyncio
+import collections
+import heapq
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import rlp
+from aiohttp import web
+from eth_abi import decode, encode
+from eth_account import Account
+from eth_account._utils.legacy_transactions import Transaction
+from eth_account.messages import encode_defunct
+from eth_account.typed_transactions import TypedTransaction
+from eth_utils import function_signature_to_4byte_selector, keccak, to_checksum_address
+from hexbytes import HexBytes
+
+# Make the project packages importable when this script is run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import RPC_CONFIG
+from script.apriori_bot import STAKE_ADDRESS
+from script.atlantis_swap_bot import atl_address as ATL_ADDRESS
+from script.monadverse_mint import MINT_PRICE as MONADVERSE_PRICE, MONADVERSE_CONTRACT_ADDRESS
+from script.nad_domains import NAD_CONTRACT_ADDRESS, NAD_NFT_ADDRESS
+from script.narwhal_finance import COINFLIP_ADDRESS, DICE_ADDRESS, SLOTS_ADDRESS, USDT_ADDRESS, USDT_FAUCET_ADDRESS
+from script.onchaingm_bot import MINT_PRICE as ONCHAIN_GM_PRICE, ONCHAIN_GM_CONTRACT
+from script.orbiter import MONAD_SEPOLIA_TOKEN_ADDRESS, ORBITER_SEPOLIA_ADDRESS, TRANSFER_TOPIC
+
+MONAD_CHAIN_ID = 10143
+SEPOLIA_CHAIN_ID = 11155111
+GWEI = 10**9
+ETHER = 10**18
+ZERO_ADDRESS = '0x' + '00' * 20
+ATLANTIS_ROUTER_ADDRESS = '0x' + 'a7' * 20  # Swap target returned by the fake quote API
+ATL_PER_MON = 1000  # Fixed swap rate of the fake Atlantis router
+NAD_SIGNER = Account.from_key(keccak(b'fake nad signer'))  # Signs registrations in the fake NAD API
+NAD_FEE = ETHER // 10
+NARWHAL_VRF_FEE = 27000001350000001  # Value the Narwhal games require with each play
+FAUCET_AMOUNT = 100 * ETHER
+TRANSFER_SINGLE_TOPIC = '0x' + keccak(text='TransferSingle(address,address,address,uint256,uint256)').hex()
+
+class RpcError(Exception):
+    def __init__(self, code: int, message: str, data: Optional[str] = None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+class Revert(Exception):
+    """A reverted call, with the reason a Solidity require() would give"""
+
+def revert_error(reason: str) -> RpcError:
+    data = '0x08c379a0' + encode(['string'], [reason]).hex()  # Error(string)
+    return RpcError(3, f"execution reverted: {reason}", data)
+
+def address(value: Any) -> str:
+    """Lowercase 0x address from bytes or any-case hex"""
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    return str(value).lower()
+
+def topic(value: str) -> str:
+    return '0x' + value.lower()[2:].rjust(64, '0')
+
+def split_types(signature: str) -> List[str]:
+    """Argument types of a function signature, with tuples kept whole"""
+    inner = signature[signature.index('(') + 1:-1]
+    types, depth, current = [], 0, ''
+    for char in inner:
+        if char == ',' and depth == 0:
+            types.append(current)
+            current = ''
+            continue
+        depth += char == '('
+        depth -= char == ')'
+        current += char
+    return types + [current] if current else types
+
+def method(signature: str, returns: Tuple[str, ...] = (), gas: int = 30000, selector: Optional[str] = None):
+    """Mark a stub method as handling calls to `signature`; `selector` overrides the computed one"""
+    def wrap(function):
+        function.abi = (signature, returns, gas, selector)
+        return function
+    return wrap
+
+class Execution:
+    """Reads and writes of one transaction or call; writes reach the chain only on commit"""
+
+    def __init__(self, chain: 'Chain', sender: str, value: int = 0, tx_hash: bytes = b''):
+        self.chain = chain
+        self.sender = sender
+        self.value = value
+        self.tx_hash = tx_hash
+        self.writes: Dict[Tuple[str, Any], Any] = {}
+        self.logs: List[Dict[str, Any]] = []
+        self.effects: List[Callable[[], None]] = []  # Run on commit, so a revert drops them too
+        self.gas = 0
+
+    def get(self, table: str, key: Any, default: Any = 0) -> Any:
+        if (table, key) in self.writes:
+            return self.writes[(table, key)]
+        return self.chain.state[table].get(key, default)
+
+    def put(self, table: str, key: Any, value: Any):
+        self.writes[(table, key)] = value
+
+    def balance(self, account: str) -> int:
+        return self.get('balance', account, self.chain.genesis_balance(account))
+
+    def transfer(self, source: str, target: str, amount: int):
+        if not amount:
+            return
+        if self.balance(source) < amount:
+            raise Revert("insufficient balance")
+        self.put('balance', source, self.balance(source) - amount)
+        self.put('balance', target, self.balance(target) + amount)
+
+    def log(self, emitter: str, topics: List[str], data: bytes = b''):
+        self.logs.append({'address': emitter, 'topics': topics, 'data': '0x' + data.hex()})
+
+    def defer(self, effect: Callable[[], None]):
+        self.effects.append(effect)
+
+    def call(self, to: str, data: bytes, sender: str, value: int = 0) -> bytes:
+        """Nested call made by a contract, e.g. each call of a multicall"""
+        outer = (self.sender, self.value)
+        self.sender, self.value = sender, value
+        try:
+            self.transfer(sender, to, value)
+            return self.chain.dispatch(self, to, data)
+        finally:
+            self.sender, self.value = outer
+
+    def commit(self):
+        for (table, key), value in self.writes.items():
+            self.chain.state[table][key] = value
+        for effect in self.effects:
+            effect()
+
+class Contract:
+    """Stub of a deployed contract: methods marked with @method, looked up by selector"""
+
+    def __init__(self, chain: 'Chain', contract_address: str):
+        self.chain = chain
+        self.address = address(contract_address)
+        self.methods: Dict[bytes, Tuple[Callable, List[str], Tuple[str, ...], int]] = {}
+        for name in dir(type(self)):
+            function = getattr(self, name)
+            if callable(function) and hasattr(function, 'abi'):
+                signature, returns, gas, selector = function.abi
+                key = bytes(HexBytes(selector)) if selector else function_signature_to_4byte_selector(signature)
+                self.methods[key] = (function, split_types(signature), returns, gas)
+
+    def table(self, name: str) -> str:
+        return f"{self.address}:{name}"
+
+    def receive(self, ex: Execution):
+        raise Revert("no receive function")
+
+    def dispatch(self, ex: Execution, data: bytes) -> bytes:
+        if not data:
+            self.receive(ex)
+            return b''
+        if data[:4] not in self.methods:
+            raise Revert(f"unknown selector 0x{data[:4].hex()}")
+        function, arg_types, returns, gas = self.methods[data[:4]]
+        try:
+            args = decode(arg_types, data[4:])
+        except Exception:
+            raise Revert("malformed calldata") from None
+        ex.gas += gas
+        result = function(ex, *args)
+        if not returns:
+            return b''
+        return encode(list(returns), list(result) if len(returns) > 1 else [result])
+
+class ERC20(Contract):
+    @method('balanceOf(address)', ('uint256',), 2600)
+    def balance_of(self, ex, owner):
+        return ex.get(self.table('balances'), address(owner))
+
+    @method('allowance(address,address)', ('uint256',), 2600)
+    def allowance(self, ex, owner, spender):
+        return ex.get(self.table('allowances'), (address(owner), address(spender)))
+
+    @method('decimals()', ('uint8',), 300)
+    def decimals(self, ex):
+        return 18
+
+    @method('approve(address,uint256)', ('bool',), 24000)
+    def approve(self, ex, spender, amount):
+        ex.put(self.table('allowances'), (ex.sender, address(spender)), amount)
+        return True
+
+    @method('transfer(address,uint256)', ('bool',), 29000)
+    def transfer(self, ex, to, amount):
+        self.move(ex, ex.sender, address(to), amount)
+        return True
+
+    @method('transferFrom(address,address,uint256)', ('bool',), 34000)
+    def transfer_from(self, ex, owner, to, amount):
+        self.spend_allowance(ex, address(owner), ex.sender, amount)
+        self.move(ex, address(owner), address(to), amount)
+        return True
+
+    def spend_allowance(self, ex, owner: str, spender: str, amount: int):
+        allowed = ex.get(self.table('allowances'), (owner, spender))
+        if allowed < amount:
+            raise Revert("ERC20: insufficient allowance")
+        ex.put(self.table('allowances'), (owner, spender), allowed - amount)
+
+    def move(self, ex, source: str, target: str, amount: int):
+        balances = self.table('balances')
+        if source != ZERO_ADDRESS:
+            if ex.get(balances, source) < amount:
+                raise Revert("ERC20: transfer amount exceeds balance")
+            ex.put(balances, source, ex.get(balances, source) - amount)
+        ex.put(balances, target, ex.get(balances, target) + amount)
+        ex.log(self.address, [TRANSFER_TOPIC, topic(source), topic(target)], encode(['uint256'], [amount]))
+
+    def mint(self, ex, to: str, amount: int):
+        self.move(ex, ZERO_ADDRESS, to, amount)
+
+class Faucet(Contract):
+    def __init__(self, chain, contract_address, token: ERC20, amount: int):
+        super().__init__(chain, contract_address)
+        self.token = token
+        self.amount = amount
+
+    @method('mint()', (), 48000)
+    def mint(self, ex):
+        self.token.mint(ex, ex.sender, self.amount)
+
+class NarwhalGame(Contract):
+    """Slots, Coinflip and Dice: take the bet, pay out on a coin toss drawn from the transaction hash"""
+
+    def __init__(self, chain, contract_address, token: ERC20):
+        super().__init__(chain, contract_address)
+        self.token = token
+
+    def play(self, ex, amount: int, token: str, payout_per_10000: int):
+        if ex.value < NARWHAL_VRF_FEE:
+            raise Revert("insufficient VRF fee")
+        if address(token) != self.token.address:
+            raise Revert("unsupported token")
+        self.token.spend_allowance(ex, ex.sender, self.address, amount)
+        self.token.move(ex, ex.sender, self.address, amount)
+        if keccak(ex.tx_hash + bytes.fromhex(self.address[2:]))[0] & 1:
+            self.token.move(ex, self.address, ex.sender, amount * payout_per_10000 // 10000)
+
+    @method('Slots_Play(uint256,address,uint256,uint256,uint256)', (), 90000, selector='0xf26c05f2')
+    def slots(self, ex, amount, token, bets, stop_gain, stop_loss):
+        self.play(ex, amount, token, 20000)
+
+    @method('CoinFlip_Play(uint256,address,uint256,uint256,uint256,uint256)', (), 85000, selector='0x6d974773')
+    def coinflip(self, ex, amount, token, bets, side, stop_gain, stop_loss):
+        self.play(ex, amount, token, 19800)
+
+    @method('Dice_Play(uint256,uint256,address,uint256,uint256,uint256,uint256)', (), 88000, selector='0x74af2e59')
+    def dice(self, ex, amount, multiplier, token, bets, bet_type, stop_gain, stop_loss):
+        self.play(ex, amount, token, multiplier)
+
+class AprioriVault(Contract):
+    @method('deposit(uint256,address)', ('uint256',), 65000)
+    def deposit(self, ex, assets, receiver):
+        if ex.value != assets:
+            raise Revert("value does not match assets")
+        shares = self.table('shares')
+        ex.put(shares, address(receiver), ex.get(shares, address(receiver)) + assets)
+        return assets
+
+    @method('maxRedeem(address)', ('uint256',), 2600)
+    def max_redeem(self, ex, owner):
+        return ex.get(self.table('shares'), address(owner))
+
+    @method('requestRedeem(uint256,address,address)', ('uint256',), 70000)
+    def request_redeem(self, ex, amount, controller, owner):
+        shares = self.table('shares')
+        if address(owner) != ex.sender:
+            raise Revert("not the owner")
+        if ex.get(shares, ex.sender) < amount:
+            raise Revert("insufficient shares")
+        ex.put(shares, ex.sender, ex.get(shares, ex.sender) - amount)
+        request_id = ex.get(self.table('requests'), 'next') + 1
+        ex.put(self.table('requests'), 'next', request_id)
+        return request_id
+
+class NadNFT(Contract):
+    @method('balanceOf(address)', ('uint256',), 2600)
+    def balance_of(self, ex, owner):
+        return ex.get(self.table('balances'), address(owner))
+
+    @method('ownerOf(uint256)', ('address',), 2600)
+    def owner_of(self, ex, token_id):
+        owner = ex.get(self.table('owners'), token_id, None)
+        if owner is None:
+            raise Revert("ERC721: invalid token ID")
+        return owner
+
+    def mint(self, ex, to: str) -> int:
+        token_id = ex.get(self.table('supply'), 'total') + 1
+        ex.put(self.table('supply'), 'total', token_id)
+        ex.put(self.table('owners'), token_id, to)
+        ex.put(self.table('balances'), to, ex.get(self.table('balances'), to) + 1)
+        ex.log(self.address, [TRANSFER_TOPIC, topic(ZERO_ADDRESS), topic(to), '0x' + token_id.to_bytes(32, 'big').hex()])
+        return token_id
+
+def nad_message(name: str, owner: str, nonce: int, deadline: int):
+    return encode_defunct(keccak(encode(['string', 'address', 'uint256', 'uint256'], [name, to_checksum_address(owner), nonce, deadline])))
+
+class NadRegistry(Contract):
+    PARAMS = '(string,address,bool,address,bytes32,bytes,uint256,uint256)'
+
+    def __init__(self, chain, contract_address, nft: NadNFT):
+        super().__init__(chain, contract_address)
+        self.nft = nft
+
+    @method('calculateRegisterFee((string,address,bool,address,bytes32,bytes))', ('uint256',), 5000)
+    def register_fee(self, ex, params):
+        return NAD_FEE
+
+    @method(f'registerWithSignature({PARAMS},bytes)', (), 180000)
+    def register(self, ex, params, signature):
+        name, owner, _, _, _, _, nonce, deadline = params
+        if ex.value < NAD_FEE:
+            raise Revert("insufficient fee")
+        if deadline < self.chain.head['timestamp']:
+            raise Revert("signature expired")
+        signer = Account.recover_message(nad_message(name, owner, nonce, deadline), signature=signature)
+        if signer != NAD_SIGNER.address:
+            raise Revert("invalid signature")
+        if ex.get(self.table('names'), name, None) is not None:
+            raise Revert("name already registered")
+        if ex.get(self.table('nonces'), nonce, False):
+            raise Revert("nonce already used")
+        ex.put(self.table('names'), name, address(owner))
+        ex.put(self.table('nonces'), nonce, True)
+        self.nft.mint(ex, address(owner))
+
+class ERC1155Drop(Contract):
+    def __init__(self, chain, contract_address, price: int):
+        super().__init__(chain, contract_address)
+        self.price = price
+
+    @method('balanceOf(address,uint256)', ('uint256',), 2600)
+    def balance_of(self, ex, owner, token_id):
+        return ex.get(self.table('balances'), (address(owner), token_id))
+
+    @method('mint(uint256,uint256)', (), 95000)
+    def mint(self, ex, token_id, amount):
+        if ex.value < self.price * amount:
+            raise Revert("insufficient payment")
+        key = (ex.sender, token_id)
+        ex.put(self.table('balances'), key, ex.get(self.table('balances'), key) + amount)
+        ex.log(self.address, [TRANSFER_SINGLE_TOPIC, topic(ex.sender), topic(ZERO_ADDRESS), topic(ex.sender)], encode(['uint256', 'uint256'], [token_id, amount]))
+
+class OnChainGM(NadNFT):
+    """Mints an NFT to whoever sends exactly the mint price with no calldata"""
+
+    def __init__(self, chain, contract_address, price: int):
+        super().__init__(chain, contract_address)
+        self.price = price
+
+    def receive(self, ex):
+        if ex.value != self.price:
+            raise Revert("wrong mint price")
+        ex.gas += 60000
+        self.mint(ex, ex.sender)
+
+class AtlantisRouter(Contract):
+    def __init__(self, chain, contract_address, token: ERC20):
+        super().__init__(chain, contract_address)
+        self.token = token
+
+    @method('swapExactETHForTokens(address,uint256,address)', ('uint256',), 120000)
+    def swap(self, ex, buy_token, min_out, recipient):
+        if address(buy_token) != self.token.address:
+            raise Revert("unsupported token")
+        out = ex.value * ATL_PER_MON
+        if out < min_out:
+            raise Revert("insufficient output amount")
+        self.token.mint(ex, address(recipient), out)
+        return out
+
+class Multicall3(Contract):
+    @method('aggregate3((address,bool,bytes)[])', ('(bool,bytes)[]',), 5000)
+    def aggregate3(self, ex, calls):
+        results = []
+        for target, allow_failure, data in calls:
+            try:
+                results.append((True, ex.call(address(target), data, self.address)))
+            except Revert as e:
+                if not allow_failure:
+                    raise Revert(f"Multicall3: call failed ({e})") from None
+                results.append((False, b''))
+        return results
+
+    @method('getEthBalance(address)', ('uint256',), 2600)
+    def eth_balance(self, ex, account):
+        return ex.balance(address(account))
+
+class OrbiterMaker(Contract):
+    """Sepolia side of the bridge: whatever is sent arrives later as the bridged token on Monad"""
+
+    def __init__(self, chain, contract_address, target: 'Chain', token: ERC20, delay: float):
+        super().__init__(chain, contract_address)
+        self.target = target
+        self.token = token
+        self.delay = delay
+
+    def receive(self, ex):
+        # The maker is an externally owned account on the real network, so a deposit costs no more than a transfer
+        recipient, amount = ex.sender, ex.value
+        ex.defer(lambda: self.target.schedule(self.delay, lambda target_ex: self.token.mint(target_ex, recipient, amount)))
+
+class PendingTx:
+    def __init__(self, raw: bytes, fields: Dict[str, Any], sender: str):
+        self.raw = raw
+        self.hash = keccak(raw)
+        self.fields = fields
+        self.sender = sender
+        self.nonce = fields['nonce']
+        self.max_fee = fields.get('maxFeePerGas', fields.get('gasPrice', 0))
+        self.max_tip = fields.get('maxPriorityFeePerGas', fields.get('gasPrice', 0))
+        self.to = address(fields['to']) if fields.get('to') else None
+
+    def tip(self, base_fee: int) -> int:
+        return min(self.max_tip, self.max_fee - base_fee)
+
+def decode_raw_transaction(raw: bytes) -> Tuple[Dict[str, Any], Optional[int]]:
+    """Fields and chain id of a signed transaction, typed or legacy"""
+    if raw and raw[0] <= 0x7f:
+        fields = TypedTransaction.from_bytes(HexBytes(raw)).as_dict()
+        return fields, fields.get('chainId')
+    fields = rlp.decode(raw, Transaction).as_dict()
+    return fields, (fields['v'] - 35) // 2 if fields['v'] >= 35 else None
+
+class Chain:
+    """In-memory chain: state tables, blocks, a fee-ordered mempool and the JSON-RPC methods over them"""
+
+    def __init__(self, chain_id: int, block_time: float, base_fee: int = 50 * GWEI, suggested_tip: int = 2 * GWEI,
+                 min_tip: int = 0, balance: int = 100 * ETHER, block_gas_limit: int = 30_000_000):
+        self.chain_id = chain_id
+        self.block_time = block_time
+        self.base_fee = base_fee
+        self.suggested_tip = suggested_tip
+        self.min_tip = min_tip  # Transactions tipping less stay pending, like on a congested chain
+        self.balance = balance  # Every externally owned account starts with this much
+        self.block_gas_limit = block_gas_limit
+        self.state: Dict[str, Dict[Any, Any]] = collections.defaultdict(dict)
+        self.contracts: Dict[str, Contract] = {}
+        self.blocks: List[Dict[str, Any]] = []
+        self.transactions: Dict[bytes, Dict[str, Any]] = {}  # Mined, by hash
+        self.mempool: Dict[Tuple[str, int], PendingTx] = {}
+        self.pending: Dict[bytes, PendingTx] = {}  # The mempool by hash
+        self.scheduled: List[Tuple[float, Callable[[Execution], None]]] = []
+        self.listeners: List[Callable[[Dict[str, Any], List[Dict[str, Any]]], None]] = []
+        self._seal({'transactions': [], 'gasUsed': 0, 'tips': [], 'logs': []})
+
+    # ---------- state ----------
+
+    def deploy(self, contract: Contract) -> Contract:
+        self.contracts[contract.address] = contract
+        self.state['code'][contract.address] = b'\xfe'  # Non-empty code, so the address reads as a contract
+        return contract
+
+    def genesis_balance(self, account: str) -> int:
+        return 0 if account in self.state['code'] else self.balance
+
+    def nonce(self, account: str) -> int:
+        return self.state['nonce'].get(account, 0)
+
+    @property
+    def head(self) -> Dict[str, Any]:
+        return self.blocks[-1]
+
+    def dispatch(self, ex: Execution, to: str, data: bytes) -> bytes:
+        contract = self.contracts.get(to)
+        return contract.dispatch(ex, data) if contract is not None else b''
+
+    def schedule(self, delay: float, effect: Callable[[Execution], None]):
+        """Apply a state change in the first block mined `delay` seconds from now"""
+        self.scheduled.append((time.monotonic() + delay, effect))
+
+    # ---------- execution ----------
+
+    @staticmethod
+    def intrinsic_gas(data: bytes, create: bool) -> int:
+        return 21000 + (32000 if create else 0) + sum(16 if byte else 4 for byte in data)
+
+    def run(self, sender: str, to: Optional[str], value: int, data: bytes, gas_limit: int, nonce: int = 0, tx_hash: bytes = b'') -> Tuple[Execution, Optional[str], bytes]:
+        """Execute a call or transaction; returns the execution, the revert reason (None on success) and the output"""
+        ex = Execution(self, sender, value, tx_hash)
+        ex.gas = self.intrinsic_gas(data, to is None)
+        try:
+            if to is None:
+                created = address(keccak(rlp.encode([bytes.fromhex(sender[2:]), nonce]))[12:])
+                ex.gas += 200 * len(data)
+                ex.transfer(sender, created, value)
+                ex.put('code', created, data)  # The init code stands in for the runtime code
+                output = bytes.fromhex(created[2:])
+            else:
+                ex.transfer(sender, to, value)
+                output = self.dispatch(ex, to, data)
+            if ex.gas > gas_limit:
+                raise Revert("out of gas")
+            return ex, None, output
+        except Revert as e:
+            return ex, str(e), b''
+
+    def call_fields(self, call: Dict[str, Any]) -> Tuple[str, Optional[str], int, bytes, int]:
+        sender = address(call.get('from') or ZERO_ADDRESS)
+        to = address(call['to']) if call.get('to') else None
+        value = int(call.get('value') or '0x0', 16)
+        data = bytes(HexBytes(call.get('data') or call.get('input') or '0x'))
+        gas = int(call['gas'], 16) if call.get('gas') else self.block_gas_limit
+        return sender, to, value, data, gas
+
+    # ---------- blocks ----------
+
+    def _seal(self, block: Dict[str, Any]):
+        number = len(self.blocks)
+        block.update({
+            'number': number,
+            'hash': keccak(b'block' + self.chain_id.to_bytes(8, 'big') + number.to_bytes(8, 'big')),
+            'parentHash': self.blocks[-1]['hash'] if self.blocks else b'\x00' * 32,
+            'timestamp': max(int(time.time()), self.blocks[-1]['timestamp'] if self.blocks else 0),
+            'baseFee': self.base_fee,
+        })
+        for log in block['logs']:
+            log.update({'blockNumber': hex(number), 'blockHash': '0x' + block['hash'].hex()})
+        self.blocks.append(block)
+        for listener in list(self.listeners):
+            listener(block, block['logs'])
+
+    def mine(self):
+        """Seal a block with due bridge credits and the best-paying executable mempool transactions"""
+        block = {'transactions': [], 'gasUsed': 0, 'tips': [], 'logs': []}
+        now = time.monotonic()
+        for due, effect in [item for item in self.scheduled if item[0] <= now]:
+            self.scheduled.remove((due, effect))
+            ex = Execution(self, ZERO_ADDRESS, tx_hash=keccak(b'system' + len(self.blocks).to_bytes(8, 'big') + len(block['logs']).to_bytes(8, 'big')))
+            effect(ex)
+            ex.commit()
+            block['logs'] += self._stamp_logs(ex.logs, ex.tx_hash, -1, len(block['logs']))
+        # Each sender's next nonce competes on tip; including it lets the sender's following nonce compete
+        ready = [(-pending.tip(self.base_fee), pending.hash, pending) for pending in self.mempool.values() if pending.nonce == self.nonce(pending.sender)]
+        heapq.heapify(ready)
+        while ready:
+            _, _, pending = heapq.heappop(ready)
+            if pending.tip(self.base_fee) < self.min_tip or pending.fields['gas'] > self.block_gas_limit - block['gasUsed']:
+                continue
+            del self.mempool[(pending.sender, pending.nonce)]
+            del self.pending[pending.hash]
+            self._include(block, pending)
+            following = self.mempool.get((pending.sender, pending.nonce + 1))
+            if following is not None:
+                heapq.heappush(ready, (-following.tip(self.base_fee), following.hash, following))
+        self._seal(block)
+        for tx_hash in block['transactions']:
+            self.transactions[tx_hash]['receipt'].update({'blockNumber': hex(self.head['number']), 'blockHash': '0x' + self.head['hash'].hex()})
+            self.transactions[tx_hash]['block'] = self.head['number']
+
+    @staticmethod
+    def _stamp_logs(logs: List[Dict[str, Any]], tx_hash: bytes, index: int, first: int) -> List[Dict[str, Any]]:
+        for offset, log in enumerate(logs):
+            log.update({
+                'transactionHash': '0x' + tx_hash.hex(), 'transactionIndex': hex(max(index, 0)),
+                'logIndex': hex(first + offset), 'removed': False,
+            })
+        return logs
+
+    def _include(self, block: Dict[str, Any], pending: PendingTx):
+        fields = pending.fields
+        tip = pending.tip(self.base_fee)
+        price = self.base_fee + tip
+        ex, reason, output = self.run(pending.sender, pending.to, fields['value'], bytes(fields['data']), fields['gas'], pending.nonce, pending.hash)
+        gas_used = min(ex.gas, fields['gas'])
+        if reason is None:
+            ex.commit()
+        # Fees and the nonce are charged whether or not the call reverted
+        self.state['balance'][pending.sender] = Execution(self, pending.sender).balance(pending.sender) - gas_used * price
+        self.state['nonce'][pending.sender] = pending.nonce + 1
+        index = len(block['transactions'])
+        logs = self._stamp_logs(ex.logs if reason is None else [], pending.hash, index, len(block['logs']))
+        block['transactions'].append(pending.hash)
+        block['gasUsed'] += gas_used
+        block['tips'].append(tip)
+        block['logs'] += logs
+        created = '0x' + output.hex() if pending.to is None and reason is None else None
+        self.transactions[pending.hash] = {
+            'pending': pending,
+            'index': index,
+            'price': price,
+            'receipt': {
+                'transactionHash': '0x' + pending.hash.hex(),
+                'transactionIndex': hex(index),
+                'from': pending.sender,
+                'to': pending.to,
+                'cumulativeGasUsed': hex(block['gasUsed']),
+                'gasUsed': hex(gas_used),
+                'effectiveGasPrice': hex(price),
+                'contractAddress': created,
+                'logs': logs,
+                'logsBloom': '0x' + '00' * 256,
+                'status': '0x1' if reason is None else '0x0',
+                'type': hex(fields.get('type', 0)),
+            },
+        }
+
+    async def produce_blocks(self):
+        """Mine every block_time seconds; with block_time 0, blocks are mined on submission and here only for due credits"""
+        while True:
+            await asyncio.sleep(self.block_time or 0.25)
+            if self.block_time or any(due <= time.monotonic() for due, _ in self.scheduled):
+                self.mine()
+
+    # ---------- JSON-RPC ----------
+
+    def block_number(self, tag: Any) -> int:
+        if tag in (None, 'latest', 'pending', 'safe', 'finalized'):
+            return self.head['number']
+        if tag == 'earliest':
+            return 0
+        return int(tag, 16)
+
+    def format_block(self, block: Dict[str, Any], full: bool) -> Dict[str, Any]:
+        transactions = [self.format_transaction(tx_hash) if full else '0x' + tx_hash.hex() for tx_hash in block['transactions']]
+        return {
+            'number': hex(block['number']), 'hash': '0x' + block['hash'].hex(), 'parentHash': '0x' + block['parentHash'].hex(),
+            'timestamp': hex(block['timestamp']), 'baseFeePerGas': hex(block['baseFee']), 'gasLimit': hex(self.block_gas_limit),
+            'gasUsed': hex(block['gasUsed']), 'transactions': transactions, 'miner': ZERO_ADDRESS, 'difficulty': '0x0',
+            'totalDifficulty': '0x0', 'extraData': '0x', 'logsBloom': '0x' + '00' * 256, 'nonce': '0x' + '00' * 8,
+            'mixHash': '0x' + '00' * 32, 'sha3Uncles': '0x' + '00' * 32, 'stateRoot': '0x' + '00' * 32,
+            'receiptsRoot': '0x' + '00' * 32, 'transactionsRoot': '0x' + '00' * 32, 'size': '0x0', 'uncles': [],
+        }
+
+    def format_transaction(self, tx_hash: bytes) -> Dict[str, Any]:
+        mined = self.transactions.get(tx_hash)
+        pending = mined['pending'] if mined else self.pending[tx_hash]
+        fields = pending.fields
+        result = {
+            'hash': '0x' + tx_hash.hex(), 'from': pending.sender, 'to': pending.to, 'nonce': hex(pending.nonce),
+            'gas': hex(fields['gas']), 'value': hex(fields['value']), 'input': '0x' + bytes(fields['data']).hex(),
+            'type': hex(fields.get('type', 0)), 'chainId': hex(self.chain_id),
+            'gasPrice': hex(mined['price'] if mined else pending.max_fee),
+            'v': hex(fields['v']), 'r': hex(fields['r']), 's': hex(fields['s']),
+            'blockNumber': hex(mined['block']) if mined else None,
+            'blockHash': mined['receipt']['blockHash'] if mined else None,
+            'transactionIndex': hex(mined['index']) if mined else None,
+        }
+        if 'maxFeePerGas' in fields:
+            result.update({'maxFeePerGas': hex(pending.max_fee), 'maxPriorityFeePerGas': hex(pending.max_tip), 'accessList': []})
+        return result
+
+    def rpc_web3_clientVersion(self):
+        return 'fake-chain/1.0'
+
+    def rpc_net_version(self):
+        return str(self.chain_id)
+
+    def rpc_eth_chainId(self):
+        return hex(self.chain_id)
+
+    def rpc_eth_syncing(self):
+        return False
+
+    def rpc_eth_blockNumber(self):
+        return hex(self.head['number'])
+
+    def rpc_eth_getBlockByNumber(self, tag, full=False):
+        number = self.block_number(tag)
+        return self.format_block(self.blocks[number], full) if number < len(self.blocks) else None
+
+    def rpc_eth_getBlockByHash(self, block_hash, full=False):
+        block = next((block for block in self.blocks if '0x' + block['hash'].hex() == block_hash), None)
+        return self.format_block(block, full) if block else None
+
+    def rpc_eth_getBalance(self, account, tag='latest'):
+        return hex(Execution(self, ZERO_ADDRESS).balance(address(account)))
+
+    def rpc_eth_getTransactionCount(self, account, tag='latest'):
+        nonce = self.nonce(address(account))
+        if tag == 'pending':
+            while (address(account), nonce) in self.mempool:
+                nonce += 1
+        return hex(nonce)
+
+    def rpc_eth_getCode(self, account, tag='latest'):
+        return '0x' + self.state['code'].get(address(account), b'').hex()
+
+    def rpc_eth_call(self, call, tag='latest', overrides=None):
+        sender, to, value, data, gas = self.call_fields(call)
+        ex, reason, output = self.run(sender, to, value, data, gas, self.nonce(sender))
+        if reason is not None:
+            raise revert_error(reason)
+        return '0x' + output.hex()
+
+    def rpc_eth_estimateGas(self, call, tag='latest'):
+        sender, to, value, data, _ = self.call_fields(call)
+        ex, reason, _ = self.run(sender, to, value, data, self.block_gas_limit, self.nonce(sender))
+        if reason is not None:
+            raise revert_error(reason)
+        return hex(ex.gas)
+
+    def rpc_eth_gasPrice(self):
+        return hex(self.base_fee + self.suggested_tip)
+
+    def rpc_eth_maxPriorityFeePerGas(self):
+        return hex(self.suggested_tip)
+
+    def rpc_eth_feeHistory(self, count, newest, percentiles):
+        count = int(count, 16) if isinstance(count, str) else count
+        last = self.block_number(newest)
+        blocks = self.blocks[max(last - count + 1, 0):last + 1]
+        rewards = []
+        for block in blocks:
+            tips = sorted(block['tips'])
+            rewards.append([hex(tips[min(int(p / 100 * len(tips)), len(tips) - 1)] if tips else 0) for p in percentiles])
+        return {
+            'oldestBlock': hex(blocks[0]['number']),
+            'baseFeePerGas': [hex(block['baseFee']) for block in blocks] + [hex(self.base_fee)],
+            'gasUsedRatio': [block['gasUsed'] / self.block_gas_limit for block in blocks],
+            'reward': rewards,
+        }
+
+    def rpc_eth_getTransactionReceipt(self, tx_hash):
+        mined = self.transactions.get(bytes(HexBytes(tx_hash)))
+        return mined['receipt'] if mined else None
+
+    def rpc_eth_getTransactionByHash(self, tx_hash):
+        tx_hash = bytes(HexBytes(tx_hash))
+        if tx_hash in self.transactions or tx_hash in self.pending:
+            return self.format_transaction(tx_hash)
+        return None
+
+    def rpc_eth_getLogs(self, criteria):
+        first = self.block_number(criteria.get('fromBlock', 'latest'))
+        last = self.block_number(criteria.get('toBlock', 'latest'))
+        return [log for block in self.blocks[first:last + 1] for log in block['logs'] if log_matches(log, criteria)]
+
+    def rpc_eth_sendRawTransaction(self, raw_hex):
+        raw = bytes(HexBytes(raw_hex))
+        fields, chain_id = decode_raw_transaction(raw)
+        if chain_id != self.chain_id:
+            raise RpcError(-32000, f"invalid chain id {chain_id}, expected {self.chain_id}")
+        sender = address(Account.recover_transaction(raw))
+        pending = PendingTx(raw, fields, sender)
+        if pending.hash in self.transactions or pending.hash in self.pending:
+            raise RpcError(-32000, "already known")
+        if pending.nonce < self.nonce(sender):
+            raise RpcError(-32000, f"nonce too low: next nonce {self.nonce(sender)}, tx nonce {pending.nonce}")
+        if fields['gas'] < self.intrinsic_gas(bytes(fields['data']), pending.to is None):
+            raise RpcError(-32000, "intrinsic gas too low")
+        if fields['gas'] > self.block_gas_limit:
+            raise RpcError(-32000, "exceeds block gas limit")
+        if pending.max_fee < self.base_fee:
+            raise RpcError(-32000, f"max fee per gas less than block base fee: maxFeePerGas: {pending.max_fee}, baseFee: {self.base_fee}")
+        cost = fields['gas'] * pending.max_fee + fields['value']
+        if Execution(self, sender).balance(sender) < cost:
+            raise RpcError(-32000, "insufficient funds for gas * price + value")
+        replaced = self.mempool.get((sender, pending.nonce))
+        if replaced is not None and (pending.max_fee < replaced.max_fee * 1.1 or pending.max_tip < replaced.max_tip * 1.1):
+            raise RpcError(-32000, "replacement transaction underpriced")
+        if replaced is not None:
+            del self.pending[replaced.hash]
+        self.mempool[(sender, pending.nonce)] = pending
+        self.pending[pending.hash] = pending
+        if not self.block_time:
+            self.mine()
+        return '0x' + pending.hash.hex()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """Answer one JSON-RPC request object"""
+        response = {'jsonrpc': '2.0', 'id': request.get('id')}
+        handler = getattr(self, 'rpc_' + str(request.get('method')), None)
+        try:
+            if handler is None:
+                raise RpcError(-32601, f"the method {request.get('method')} does not exist/is not available")
+            response['result'] = handler(*request.get('params', []))
+        except RpcError as e:
+            response['error'] = {'code': e.code, 'message': e.message, **({'data': e.data} if e.data else {})}
+        except (TypeError, ValueError, KeyError, IndexError, rlp.DecodingError) as e:
+            response['error'] = {'code': -32602, 'message': f"invalid params: {e}"}
+        return response
+
+def log_matches(log: Dict[str, Any], criteria: Dict[str, Any]) -> bool:
+    """Whether a log passes an eth_getLogs / eth_subscribe('logs') filter"""
+    addresses = criteria.get('address')
+    if addresses:
+        addresses = [addresses] if isinstance(addresses, str) else addresses
+        if log['address'] not in [address(item) for item in addresses]:
+            return False
+    for position, wanted in enumerate(criteria.get('topics') or []):
+        if wanted is None:
+            continue
+        options = [wanted] if isinstance(wanted, str) else wanted
+        if position >= len(log['topics']) or log['topics'][position] not in [option.lower() for option in options]:
+            return False
+    return True
+
+class FakeNetwork:
+    """Both chains with every stubbed contract deployed, plus the fake NAD and Atlantis APIs"""
+
+    def __init__(self, block_time: float = 0.4, latency: float = 0.0, bridge_delay: float = 2.0, **chain_options):
+        self.latency = latency  # Seconds added before answering every HTTP request
+        self.monad = Chain(MONAD_CHAIN_ID, block_time, **chain_options)
+        self.sepolia = Chain(SEPOLIA_CHAIN_ID, block_time, base_fee=5 * GWEI, suggested_tip=GWEI, balance=ETHER)
+        self.stats: collections.Counter = collections.Counter()
+        self.nad_nonce = 0
+        monad = self.monad
+        usdt = monad.deploy(ERC20(monad, USDT_ADDRESS))
+        monad.deploy(Faucet(monad, USDT_FAUCET_ADDRESS, usdt, FAUCET_AMOUNT))
+        treasury = Execution(monad, ZERO_ADDRESS)
+        for game_address in (SLOTS_ADDRESS, COINFLIP_ADDRESS, DICE_ADDRESS):
+            game = monad.deploy(NarwhalGame(monad, game_address, usdt))
+            usdt.mint(treasury, game.address, 10**12 * ETHER)
+        treasury.commit()
+        monad.deploy(AprioriVault(monad, STAKE_ADDRESS))
+        nft = monad.deploy(NadNFT(monad, NAD_NFT_ADDRESS))
+        self.nad = monad.deploy(NadRegistry(monad, NAD_CONTRACT_ADDRESS, nft))
+        monad.deploy(ERC1155Drop(monad, MONADVERSE_CONTRACT_ADDRESS, int(MONADVERSE_PRICE * ETHER)))
+        monad.deploy(OnChainGM(monad, ONCHAIN_GM_CONTRACT, int(ONCHAIN_GM_PRICE * ETHER)))
+        monad.deploy(AtlantisRouter(monad, ATLANTIS_ROUTER_ADDRESS, monad.deploy(ERC20(monad, ATL_ADDRESS))))
+        monad.deploy(Multicall3(monad, RPC_CONFIG['multicall_address']))
+        bridged = monad.deploy(ERC20(monad, MONAD_SEPOLIA_TOKEN_ADDRESS))
+        self.sepolia.deploy(OrbiterMaker(self.sepolia, ORBITER_SEPOLIA_ADDRESS, monad, bridged, bridge_delay))
+
+    # ---------- HTTP ----------
+
+    async def _delay(self):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def _answer(self, chain: Chain, body: Any) -> Any:
+        requests = body if isinstance(body, list) else [body]
+        for request in requests:
+            self.stats[str(request.get('method'))] += 1
+        responses = [chain.handle(request) for request in requests]
+        return responses if isinstance(body, list) else responses[0]
+
+    async def monad_rpc(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response(self._answer(self.monad, await request.json()))
+
+    async def sepolia_rpc(self, request: web.Request) -> web.Response:
+        await self._delay()
+        return web.json_response(self._answer(self.sepolia, await request.json()))
+
+    async def nad_signature(self, request: web.Request) -> web.Response:
+        await self._delay()
+        name = request.query.get('name', '')
+        owner = request.query.get('nameOwner', '')
+        if not name or name in self.monad.state[self.nad.table('names')]:
+            return web.json_response({'success': False, 'message': 'Name is not available'})
+        self.nad_nonce += 1
+        deadline = int(time.time()) + 600
+        signed = NAD_SIGNER.sign_message(nad_message(name, owner, self.nad_nonce, deadline))
+        return web.json_response({'success': True, 'signature': '0x' + signed.signature.hex(), 'nonce': str(self.nad_nonce), 'deadline': str(deadline)})
+
+    async def atlantis_quote(self, request: web.Request) -> web.Response:
+        await self._delay()
+        try:
+            sell_amount = int(request.query['sellAmount'])
+            buy_token = to_checksum_address(request.query['buyToken'])
+            taker = to_checksum_address(request.query['taker'])
+        except (KeyError, ValueError):
+            return web.json_response({'message': 'invalid quote request'}, status=400)
+        buy_amount = sell_amount * ATL_PER_MON
+        min_out = buy_amount * (10000 - int(request.query.get('slippageBps', 50))) // 10000
+        data = function_signature_to_4byte_selector('swapExactETHForTokens(address,uint256,address)') + encode(['address', 'uint256', 'address'], [buy_token, min_out, taker])
+        return web.json_response({
+            'buyAmount': str(buy_amount),
+            'transaction': {'to': to_checksum_address(ATLANTIS_ROUTER_ADDRESS), 'data': '0x' + data.hex(), 'value': str(sell_amount), 'gas': '150000'},
+        })
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """eth_subscribe for newHeads and logs; other requests are answered like over HTTP"""
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscriptions: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        outbox: asyncio.Queue = asyncio.Queue()
+
+        def on_block(block, logs):
+            for subscription_id, (kind, criteria) in subscriptions.items():
+                if kind == 'newHeads':
+                    outbox.put_nowait((subscription_id, self.monad.format_block(block, False)))
+                elif kind == 'logs':
+                    for log in logs:
+                        if log_matches(log, criteria):
+                            outbox.put_nowait((subscription_id, log))
+
+        async def push():
+            while True:
+                subscription_id, result = await outbox.get()
+                await ws.send_json({'jsonrpc': '2.0', 'method': 'eth_subscription', 'params': {'subscription': subscription_id, 'result': result}})
+
+        self.monad.listeners.append(on_block)
+        pusher = asyncio.ensure_future(push())
+        try:
+            async for message in ws:
+                if message.type != web.WSMsgType.TEXT:
+                    continue
+                body = json.loads(message.data)
+                self.stats['ws:' + str(body.get('method'))] += 1
+                if body.get('method') == 'eth_subscribe':
+                    kind, *args = body['params']
+                    subscription_id = '0x' + keccak(f"{id(ws)}:{len(subscriptions)}".encode()).hex()[:32]
+                    subscriptions[subscription_id] = (kind, args[0] if args else {})
+                    await ws.send_json({'jsonrpc': '2.0', 'id': body.get('id'), 'result': subscription_id})
+                elif body.get('method') == 'eth_unsubscribe':
+                    found = subscriptions.pop(body['params'][0], None) is not None
+                    await ws.send_json({'jsonrpc': '2.0', 'id': body.get('id'), 'result': found})
+                else:
+                    await ws.send_json(self._answer(self.monad, body))
+        finally:
+            pusher.cancel()
+            self.monad.listeners.remove(on_block)
+        return ws
+
+    async def stats_page(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats))
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post('/', self.monad_rpc)
+        app.router.add_get('/ws', self.websocket)
+        app.router.add_post('/sepolia', self.sepolia_rpc)
+        app.router.add_get('/nad/register/signature', self.nad_signature)
+        app.router.add_get('/atlantis/api/Ox/swap/quote', self.atlantis_quote)
+        app.router.add_get('/stats', self.stats_page)
+
+        async def start_miners(app):
+            app['miners'] = [asyncio.ensure_future(chain.produce_blocks()) for chain in (self.monad, self.sepolia)]
+
+        async def stop_miners(app):
+            for miner in app['miners']:
+                miner.cancel()
+
+        app.on_startup.append(start_miners)
+        app.on_cleanup.append(stop_miners)
+        return app
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8545) -> web.AppRunner:
+        """Serve in the running event loop; call cleanup() on the returned runner to stop"""
+        runner = web.AppRunner(self.make_app())
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+def environment(host: str, port: int) -> Dict[str, str]:
+    """Environment variables pointing config.ENDPOINT_CONFIG at a stand-in served on host:port"""
+    base = f"http://{host}:{port}"
+    return {
+        'MONAD_RPC_URLS': base,
+        'MONAD_WS_URLS': f"ws://{host}:{port}/ws",
+        'SEPOLIA_RPC_URL': f"{base}/sepolia",
+        'NAD_API_URL': f"{base}/nad",
+        'ATLANTIS_API_URL': f"{base}/atlantis",
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline Monad testnet stand-in for benchmarking the bots")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8545)
+    parser.add_argument('--block-time', type=float, default=0.4, help="seconds between blocks (0 = mine on every transaction)")
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every HTTP response")
+    parser.add_argument('--bridge-delay', type=float, default=2.0, help="seconds before Orbiter deposits arrive on Monad")
+    parser.add_argument('--min-tip', type=float, default=0.0, help="gwei; transactions tipping less stay pending")
+    parser.add_argument('--balance', type=float, default=100.0, help="MON every account starts with")
+    args = parser.parse_args()
+    network = FakeNetwork(args.block_time, args.latency, args.bridge_delay, min_tip=int(args.min_tip * GWEI), balance=int(args.balance * ETHER))
+    print("Fake Monad testnet listening; point the bots at it with:")
+    for name, value in environment(args.host, args.port).items():
+        print(f"  export {name}={value}")
+    web.run_app(network.make_app(), host=args.host, port=args.port, print=None)
+
+if __name__ == '__main__':
+    main()
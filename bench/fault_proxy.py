@@ -0,0 +1,176 @@
+"""
+Fault-injecting JSON-RPC proxy for resilience benchmarks, one port per simulated endpoint
+
+Each endpoint forwards to the upstream RPC (normally bench/fake_chain.py) with its own fault profile,
+a comma-separated list of:
+    latency=fixed:S | uniform:A:B | exp:MEAN | lognormal:MEDIAN:SIGMA   delay added to every response
+    error=P        HTTP 502 with probability P
+    ratelimit=P    HTTP 429 with a Retry-After header
+    truncate=P     body cut off halfway and the connection closed
+    stall=P        nothing sent for stall_seconds (default 30), then the connection closed
+    drop=P         connection closed before any response
+    stall_seconds=S
+or "none" for a clean pass-through. GET /stats on an endpoint returns the faults it has injected.
+
+Usage: python bench/fault_proxy.py --upstream http://127.0.0.1:8545 \\
+           --endpoint 9001=none --endpoint 9002="latency=lognormal:0.2:1,ratelimit=0.1,stall=0.02"
+"""
+import argparse
+import asyncio
+import collections
+import math
+import random
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+import aiohttp
+from aiohttp import web
+
+FAULTS = ('drop', 'stall', 'ratelimit', 'error', 'truncate')  # Order the fault probabilities are stacked in
+
+class FaultProfile(NamedTuple):
+    latency: Callable[[random.Random], float]
+    probabilities: Dict[str, float]
+    stall_seconds: float
+    text: str
+
+def parse_latency(text: str) -> Callable[[random.Random], float]:
+    kind, *values = text.split(':')
+    numbers = [float(value) for value in values]
+    if kind == 'fixed':
+        return lambda rng: numbers[0]
+    if kind == 'uniform':
+        return lambda rng: rng.uniform(numbers[0], numbers[1])
+    if kind == 'exp':
+        return lambda rng: rng.expovariate(1 / numbers[0])
+    if kind == 'lognormal':
+        # Parameterised by the median rather than mu, so the typical delay reads directly off the profile
+        return lambda rng: rng.lognormvariate(math.log(numbers[0]), numbers[1])
+    raise ValueError(f"unknown latency distribution {kind}")
+
+def parse_profile(text: str) -> FaultProfile:
+    """FaultProfile from a spec like "latency=exp:0.05,ratelimit=0.1"; "none" injects nothing"""
+    latency: Callable[[random.Random], float] = lambda rng: 0.0
+    probabilities = {fault: 0.0 for fault in FAULTS}
+    stall_seconds = 30.0
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        if item == 'none':
+            continue
+        name, _, value = item.partition('=')
+        if name == 'latency':
+            latency = parse_latency(value)
+        elif name == 'stall_seconds':
+            stall_seconds = float(value)
+        elif name in probabilities:
+            probabilities[name] = float(value)
+        else:
+            raise ValueError(f"unknown fault {name}")
+    if sum(probabilities.values()) > 1:
+        raise ValueError(f"fault probabilities in {text!r} add up to more than 1")
+    return FaultProfile(latency, probabilities, stall_seconds, text)
+
+class FaultyEndpoint:
+    """One proxied endpoint: draws a delay and at most one fault per request, then forwards the rest"""
+
+    def __init__(self, upstream: str, profile: FaultProfile, seed: int):
+        self.upstream = upstream
+        self.profile = profile
+        self.rng = random.Random(seed)
+        self.stats: collections.Counter = collections.Counter()
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    def draw(self) -> Tuple[float, Optional[str]]:
+        delay = max(self.profile.latency(self.rng), 0.0)
+        roll = self.rng.random()
+        for fault in FAULTS:
+            roll -= self.profile.probabilities[fault]
+            if roll < 0:
+                return delay, fault
+        return delay, None
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        body = await request.read()
+        delay, fault = self.draw()
+        self.stats['requests'] += 1
+        self.stats[fault or 'forwarded'] += 1
+        if delay:
+            await asyncio.sleep(delay)
+        if fault == 'drop':
+            request.transport.close()
+            return web.Response()
+        if fault == 'stall':
+            await asyncio.sleep(self.profile.stall_seconds)
+            request.transport.close()
+            return web.Response()
+        if fault == 'ratelimit':
+            return web.json_response({'jsonrpc': '2.0', 'error': {'code': 429, 'message': 'Too Many Requests'}}, status=429, headers={'Retry-After': '1'})
+        if fault == 'error':
+            return web.Response(status=502, text='Bad Gateway')
+
+        async with self.session.post(self.upstream, data=body, headers={'Content-Type': 'application/json'}) as upstream:
+            answer = await upstream.read()
+            status = upstream.status
+        if fault == 'truncate':
+            response = web.StreamResponse(status=status, headers={'Content-Type': 'application/json'})
+            response.content_length = len(answer)
+            await response.prepare(request)
+            await response.write(answer[:len(answer) // 2])
+            request.transport.close()
+            return response
+        return web.Response(body=answer, status=status, content_type='application/json')
+
+    async def stats_page(self, request: web.Request) -> web.Response:
+        return web.json_response({'profile': self.profile.text, **self.stats})
+
+class FaultProxy:
+    def __init__(self, upstream: str, endpoints: List[Tuple[int, str]], seed: int = 1):
+        self.endpoints = {port: FaultyEndpoint(upstream, parse_profile(text), seed + port) for port, text in endpoints}
+        self.runners: List[web.AppRunner] = []
+        self.session: Optional[aiohttp.ClientSession] = None
+
+    async def start(self, host: str = '127.0.0.1'):
+        self.session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60))
+        for port, endpoint in self.endpoints.items():
+            endpoint.session = self.session
+            app = web.Application()
+            app.router.add_post('/', endpoint.handle)
+            app.router.add_get('/stats', endpoint.stats_page)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            await web.TCPSite(runner, host, port).start()
+            self.runners.append(runner)
+
+    async def stop(self):
+        for runner in self.runners:
+            await runner.cleanup()
+        if self.session is not None:
+            await self.session.close()
+
+def parse_endpoint(text: str) -> Tuple[int, str]:
+    port, _, profile = text.partition('=')
+    parse_profile(profile or 'none')  # Fail on a bad spec before anything starts
+    return int(port), profile or 'none'
+
+async def serve(args: argparse.Namespace):
+    proxy = FaultProxy(args.upstream, args.endpoint, args.seed)
+    await proxy.start(args.host)
+    for port, endpoint in proxy.endpoints.items():
+        print(f"  http://{args.host}:{port}  {endpoint.profile.text}")
+    print(f"export MONAD_RPC_URLS={','.join(f'http://{args.host}:{port}' for port in proxy.endpoints)}", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await proxy.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Fault-injecting JSON-RPC proxy")
+    parser.add_argument('--upstream', default='http://127.0.0.1:8545')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--endpoint', type=parse_endpoint, action='append', required=True, help="PORT=PROFILE, once per endpoint")
+    parser.add_argument('--seed', type=int, default=1, help="faults drawn are the same for the same seed and request order")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""
+Critical-path report over the span files written with TRACING=1 (see utils/tracing.py)
+
+Every bot run is one trace. Its critical path is the chain of spans that decided when it finished:
+walking back from the end of a span, the child that finished last is on the path, then the child
+that finished last before that one started, and so on; time not covered by a child on the path is
+the span's own. The report adds up, per phase (span name), the time it spent on critical paths,
+next to its span count, duration percentiles and errors, so the phases worth speeding up come first.
+
+Usage: python bench/trace_report.py [traces/ ...] [--bot nad_domains] [--top 30] [--all] [--json]
+"""
+import argparse
+import collections
+import glob
+import json
+import os
+import sys
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+class SpanRecord(NamedTuple):
+    span_id: str
+    parent_id: Optional[str]
+    trace_id: str
+    name: str
+    start: int  # Unix nanoseconds
+    end: int
+    attributes: Dict[str, Any]
+    failed: bool
+
+def attribute_value(value: Dict[str, Any]) -> Any:
+    for kind in ('stringValue', 'boolValue', 'doubleValue'):
+        if kind in value:
+            return value[kind]
+    if 'intValue' in value:
+        return int(value['intValue'])
+    return None
+
+def span_files(paths: List[str]) -> List[str]:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, 'spans-*.jsonl*')))
+        else:
+            files.append(path)
+    return files
+
+def read_spans(files: List[str]) -> Iterator[SpanRecord]:
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    continue  # Last line of a process that died mid-write
+                for resource_spans in request.get('resourceSpans', []):
+                    for scope_spans in resource_spans.get('scopeSpans', []):
+                        for span in scope_spans.get('spans', []):
+                            yield SpanRecord(
+                                span['spanId'], span.get('parentSpanId') or None, span['traceId'], span['name'],
+                                int(span['startTimeUnixNano']), int(span['endTimeUnixNano']),
+                                {item['key']: attribute_value(item['value']) for item in span.get('attributes', [])},
+                                span.get('status', {}).get('code') == 2,
+                            )
+
+def critical_path(span: SpanRecord, children: Dict[str, List[SpanRecord]], limit: int, path: Dict[str, int]):
+    """Add to path[name] the nanoseconds each span spends on the critical path of span, cut off at limit"""
+    cursor = min(span.end, limit)
+    for child in sorted(children.get(span.span_id, []), key=lambda child: child.end, reverse=True):
+        if child.start >= cursor:
+            continue  # Overlaps a later child already on the path
+        child_end = min(child.end, cursor)
+        path[span.name] += cursor - child_end
+        critical_path(child, children, child_end, path)
+        cursor = max(child.start, span.start)
+        if cursor <= span.start:
+            break
+    path[span.name] += max(cursor - span.start, 0)
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(len(ordered) * p / 100), len(ordered) - 1)]
+
+def build_report(spans: List[SpanRecord], bot: Optional[str] = None, include_all: bool = False) -> Dict[str, Any]:
+    by_id = {span.span_id: span for span in spans}
+    children: Dict[str, List[SpanRecord]] = collections.defaultdict(list)
+    roots = []
+    for span in spans:
+        if span.parent_id in by_id:
+            children[span.parent_id].append(span)
+        else:
+            roots.append(span)
+    if not include_all:
+        # Calls made outside any bot run (startup probes, balance snapshots) are their own traces
+        roots = [root for root in roots if root.name.startswith('bot ')]
+    if bot is not None:
+        roots = [root for root in roots if root.attributes.get('bot') == bot]
+
+    critical: Dict[str, int] = collections.Counter()
+    durations: Dict[str, List[float]] = collections.defaultdict(list)
+    errors: Dict[str, int] = collections.Counter()
+    runs = []
+    for root in roots:
+        critical_path(root, children, root.end, critical)
+        runs.append((root.end - root.start) / 1e9)
+        stack = [root]
+        while stack:
+            span = stack.pop()
+            durations[span.name].append((span.end - span.start) / 1e9)
+            errors[span.name] += span.failed
+            stack += children.get(span.span_id, [])
+
+    total = sum(critical.values()) or 1
+    phases = [{
+        'phase': name,
+        'spans': len(durations[name]),
+        'critical_seconds': critical[name] / 1e9,
+        'critical_share': critical[name] / total,
+        'p50': percentile(durations[name], 50),
+        'p95': percentile(durations[name], 95),
+        'errors': errors[name],
+    } for name in durations]
+    phases.sort(key=lambda phase: -phase['critical_seconds'])
+    return {
+        'runs': len(runs),
+        'run_p50': percentile(runs, 50) if runs else None,
+        'run_p95': percentile(runs, 95) if runs else None,
+        'failed_runs': sum(root.failed for root in roots),
+        'phases': phases,
+    }
+
+def print_report(report: Dict[str, Any], top: int):
+    if not report['runs']:
+        print("No traced bot runs found")
+        return
+    print(f"{report['runs']} runs ({report['failed_runs']} failed), duration p50 {report['run_p50']:.2f}s, p95 {report['run_p95']:.2f}s")
+    print(f"{'phase':<44} {'spans':>7} {'critical s':>11} {'share':>7} {'p50 ms':>9} {'p95 ms':>9} {'errors':>7}")
+    for phase in report['phases'][:top]:
+        print(
+            f"{phase['phase'][:44]:<44} {phase['spans']:>7} {phase['critical_seconds']:>11.2f} {phase['critical_share']:>7.1%} "
+            f"{phase['p50'] * 1000:>9.1f} {phase['p95'] * 1000:>9.1f} {phase['errors']:>7}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-phase critical-path report over traced bot runs")
+    parser.add_argument('paths', nargs='*', default=[os.getenv('TRACING_DIR', 'traces')], help="span files or directories holding them")
+    parser.add_argument('--bot', help="only runs of this bot, e.g. nad_domains")
+    parser.add_argument('--top', type=int, default=30, help="phases shown")
+    parser.add_argument('--all', action='store_true', help="also count traces that are not bot runs")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    files = span_files(args.paths)
+    if not files:
+        sys.exit(f"No span files in {', '.join(args.paths)}; run the bots with TRACING=1 first")
+    report = build_report(list(read_spans(files)), args.bot, args.all)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report, args.top)
+
+if __name__ == '__main__':
+    main()
@@ -24,4 +24,112 @@ SCHEDULE_CONFIG = {
 ACCOUNT_CONFIG = {
     'sequential_mode': True,  # Run accounts sequentially
     'random_mode': False,  # Run accounts in random order
-} 
\ No newline at end of file
+} 
+
+# Endpoint overrides from the environment, to point every bot at a local stand-in (bench/fake_chain.py)
+ENDPOINT_CONFIG = {
+    'monad_rpc_urls': [url for url in os.getenv('MONAD_RPC_URLS', '').split(',') if url],  # Replace every Monad RPC list when set
+    'monad_ws_urls': [url for url in os.getenv('MONAD_WS_URLS', '').split(',') if url],  # Replace RPC_CONFIG ws_urls when set
+    'sepolia_rpc_url': os.getenv('SEPOLIA_RPC_URL', "https://sepolia.drpc.org/"),
+    'nad_api_url': os.getenv('NAD_API_URL', "https://api.nad.domains"),
+    'atlantis_api_url': os.getenv('ATLANTIS_API_URL', "https://api.atlantisdex.xyz"),
+}
+
+# RPC configuration
+RPC_CONFIG = {
+    'urls': ENDPOINT_CONFIG['monad_rpc_urls'] or [
+        "https://testnet-rpc.monad.xyz",
+        "https://testnet-rpc.monorail.xyz",
+        "https://monad-testnet.drpc.org",
+    ],
+    'timeout': 10,  # Request timeout in seconds
+    'pool_size': 100,  # Maximum open connections in the shared HTTP session
+    'pool_per_host': 20,  # Maximum open connections per RPC host
+    'keepalive': 60,  # Seconds an idle connection is kept open for reuse
+    'chain_id': 10143,  # Endpoints reporting another chain are never used
+    'probe_interval': 15,  # Seconds between background health probes of every endpoint
+    'ewma_alpha': 0.3,  # Weight of the newest sample in the latency and error averages
+    'max_head_lag': 5,  # Endpoints this many blocks behind the best head are skipped
+    'hedge': False,  # Set to True to race reads across two endpoints and broadcast transactions to all
+    'hedge_percentile': 95,  # Ask a second endpoint once the first is slower than this latency percentile
+    'hedge_delay': 0.3,  # Hedge delay in seconds before enough latency samples are collected
+    'hedge_min_delay': 0.02,  # Never hedge sooner than this many seconds
+    'batch_size': 50,  # Maximum calls sent in one JSON-RPC batch request
+    'multicall_address': "0xcA11bde05977b3631167028862bE2a173976CA11",  # Multicall3 contract
+    'multicall_chunk_size': 500,  # Maximum view calls aggregated into one eth_call
+    'fee_max_age': 2,  # Seconds cached fee data is served before it is fetched again
+    'priority_fee': 'adaptive',  # Options: adaptive (fee history tip tuned to fee_target_blocks), node (eth_maxPriorityFeePerGas)
+    'fee_percentiles': [10, 25, 50, 75, 90],  # eth_feeHistory reward percentiles the adaptive tip chooses from
+    'fee_history_blocks': 20,  # Recent blocks sampled by eth_feeHistory
+    'fee_target_blocks': 2,  # Target blocks from broadcast to inclusion for the adaptive tip
+    'fee_window': 100,  # Inclusion samples kept per percentile for the latency/fee metrics
+    'fee_step_down_after': 10,  # On-target inclusions in a row before trying the next cheaper percentile
+    'receipt_poll_interval': 1,  # Seconds between new-block checks while transactions are pending
+    'receipt_max_block_scan': 20,  # Blocks behind beyond which every pending receipt is fetched directly
+    'receipt_recheck': 30,  # Seconds between direct receipt fetches for every pending transaction
+    'replace_after_blocks': 5,  # Blocks a transaction may stay pending before it is re-sent with higher fees
+    'replace_bump': 1.15,  # Fee multiplier for each replacement (nodes require at least +10% to +12.5%)
+    'replace_max': 5,  # Most replacements sent for one nonce
+    'ws_urls': ENDPOINT_CONFIG['monad_ws_urls'],  # WebSocket endpoints for pushed new blocks and logs, e.g. ["wss://..."] (empty = poll over HTTP)
+    'ws_heartbeat': 20,  # Seconds between WebSocket pings that detect dead connections
+    'ws_max_backoff': 30,  # Longest wait in seconds between WebSocket reconnect attempts
+}
+
+# Bot runner configuration
+RUNNER_CONFIG = {
+    'mode': 'inprocess',  # Options: inprocess (import bots once), subprocess (one python process per run)
+    'concurrency': 1,  # Number of private keys processed at the same time in random bot mode
+    'run_timeout': 1800,  # Kill a subprocess bot run after this many seconds (0 to disable)
+    'shards': 1,  # Worker processes for random bot mode (1 = single process, 0 = one per CPU core)
+    'balance_snapshot': True,  # Read every wallet's balance in one multicall pass before each cycle
+    'min_balance': 0.01,  # Wallets below this many MON are counted as low in the snapshot
+}
+
+# Transaction signing configuration
+SIGNER_CONFIG = {
+    'workers': 0,  # Signing workers (0 = one per CPU core)
+    'pool': 'auto',  # Options: auto (processes for pure-Python signing on multi-core outside shard workers, else threads), thread, process
+}
+
+# Private key store configuration
+KEY_STORE_CONFIG = {
+    'path': 'pvkey.txt',  # One private key per line, # for comments
+    'index_path': 'pvkey.index.json',  # Derived addresses kept between runs so startup skips key derivation
+    'derive_workers': 0,  # Processes deriving addresses on a cold start (0 = one per CPU core)
+    'parallel_threshold': 64,  # Fewer missing addresses than this are derived in-process
+}
+
+# Learned gas limit configuration
+GAS_PROFILE_CONFIG = {
+    'enabled': True,  # Serve gas limits learned from past receipts instead of calling eth_estimateGas every time
+    'path': 'gas_profile.json',  # JSON file the learned limits are kept in between runs
+    'min_samples': 5,  # Receipts needed for a call before its learned limit is used
+    'max_samples': 200,  # Most recent gasUsed values kept per call
+    'margin': 1.05,  # Learned limit = p99 of observed gasUsed times this
+    'reestimate': 3600,  # Seconds after which the node is asked again, to catch contract upgrades
+    'save_interval': 10,  # Minimum seconds between profile file writes
+}
+
+# RPC and HTTP API record/replay configuration
+CASSETTE_CONFIG = {
+    'mode': os.getenv('CASSETTE_MODE', 'off'),  # Options: off, record (write all RPC and API traffic), replay (serve it back offline)
+    'path': os.getenv('CASSETTE_PATH', 'cassette.jsonl.gz'),  # Gzipped JSON lines, one request/response pair each
+    'latency_scale': float(os.getenv('CASSETTE_LATENCY_SCALE', '0')),  # Replay delay as a multiple of the recorded latency (0 = instant, 1 = original)
+}
+
+# RPC metrics configuration
+METRICS_CONFIG = {
+    'enabled': True,  # Serve Prometheus metrics while main.py runs
+    'host': '127.0.0.1',  # Keep local unless a scraper elsewhere needs it
+    'port': 9464,  # GET http://host:port/metrics
+    'cycle_summary': True,  # Log a per-endpoint, per-method latency table after every cycle
+}
+
+# Span tracing configuration (report with python bench/trace_report.py)
+TRACING_CONFIG = {
+    'enabled': os.getenv('TRACING', '0') == '1',  # Set TRACING=1 to trace every bot run and its RPC, API, signing and confirmation phases
+    'directory': os.getenv('TRACING_DIR', 'traces'),  # One spans-<pid>.jsonl file per process, in OTLP/JSON
+    'max_bytes': 10 * 1024 * 1024,  # Rotate a trace file once it grows past this size
+    'backups': 5,  # Rotated files kept per process
+    'service': 'monad-bot',  # service.name resource attribute
+}
@@ -1,14 +1,23 @@
-import subprocess
 import sys
 from colorama import init, Fore, Style
 import os
 import asyncio
 import random
 from utils.bot_utils import ProxyManager, Scheduler, AccountManager
+from utils.bot_runner import BotRunner
+from utils.worker_pool import AccountWorkerPool
+from utils.shard_runner import ShardedRunner, merge_results
+from utils.rpc_client import close_session
+from utils.cassette import get_cassette
+from utils.multicall import balance_snapshot
+from utils.fee_oracle import get_fee_oracle
+from utils.key_store import KeyStore, get_key_store
+from utils.metrics import get_metrics, start_metrics_server
 from utils.banner import print_banner, print_section
 from utils.logger import Logger
-from config import PROXY_CONFIG, SCHEDULE_CONFIG, ACCOUNT_CONFIG
+from config import PROXY_CONFIG, SCHEDULE_CONFIG, ACCOUNT_CONFIG, RUNNER_CONFIG, RPC_CONFIG, METRICS_CONFIG
 import datetime
+import functools
 
 # Initialize colorama
 init(autoreset=True)
@@ -24,18 +33,27 @@ BOTS = [
     ("apriority Bot", "script/apriori_bot.py"),
 ]
 
-def load_private_keys():
-    try:
-        with open('pvkey.txt', 'r') as f:
-            keys = [line.strip() for line in f if line.strip()]
-            Logger.info(f"Loaded {len(keys)} private keys from pvkey.txt")
-            return keys
-    except FileNotFoundError:
-        Logger.error("pvkey.txt not found!")
+def load_private_keys() -> KeyStore:
+    keys = get_key_store()
+    if not len(keys):
+        Logger.error("No valid private keys in pvkey.txt!")
         sys.exit(1)
+    return keys
+
+async def take_balance_snapshot(runner: BotRunner, addresses: list):
+    """Log the balances of all wallets before a cycle, using a few multicalls instead of one call per wallet"""
+    w3 = await runner.get_client()
+    if w3 is None:
+        return
+    try:
+        await balance_snapshot(w3, addresses, RUNNER_CONFIG['min_balance'])
+    except Exception as e:
+        Logger.warning(f"Balance snapshot failed: {e}")
 
-async def run_bot_with_config(script_name: str, private_key: str, scheduler: Scheduler):
+async def run_bot_with_config(script_name: str, private_key: str, scheduler: Scheduler, runner: BotRunner = None):
     proxy_manager = ProxyManager()
+    if runner is None:
+        runner = BotRunner()
     
     # Test proxy if enabled
     if PROXY_CONFIG['enabled']:
@@ -44,6 +62,17 @@ async def run_bot_with_config(script_name: str, private_key: str, scheduler: Sch
             Logger.error("Proxy test failed! Please check your proxy settings.")
             return False
     
+    Logger.status("run", f"Running bot with private key: {private_key[:6]}...{private_key[-4:]}")
+    
+    # Run the bot inside this interpreter, reusing the already imported module
+    if RUNNER_CONFIG['mode'] == 'inprocess':
+        Logger.command(f"run {script_name} (in-process)")
+        if await runner.run_bot(script_name, private_key):
+            Logger.success(f"Bot execution completed successfully")
+            return True
+        Logger.error(f"Bot execution failed")
+        return False
+    
     # Set environment variables for the bot
     env = os.environ.copy()
     env['PRIVATE_KEY'] = private_key
@@ -51,17 +80,55 @@ async def run_bot_with_config(script_name: str, private_key: str, scheduler: Sch
         env['PROXY_URL'] = proxy_manager.get_proxy_url()
     
     # Run the bot
-    Logger.status("run", f"Running bot with private key: {private_key[:6]}...{private_key[-4:]}")
     Logger.command(f"python {script_name}")
     
-    process = subprocess.run([sys.executable, script_name], env=env)
-    
-    if process.returncode == 0:
+    if await runner.run_script(script_name, private_key, env):
         Logger.success(f"Bot execution completed successfully")
         return True
-    else:
-        Logger.error(f"Bot execution failed with exit code {process.returncode}")
-        return False
+    return False
+
+async def run_random_bots(idx: int, total_keys: int, private_key: str, bots_per_key: int, scheduler: Scheduler, runner: BotRunner):
+    """Run the requested number of random bots for one private key"""
+    key_progress = f"{idx+1}/{total_keys}"
+    Logger.step(idx+1, total_keys, f"Processing private key: {private_key[:6]}...{private_key[-4:]}")
+
+    # Run specified number of random bots for this key
+    bots_run = 0
+    succeeded = 0
+    used_bots = []  # Keep track of which bots have been used for this key
+
+    while bots_run < bots_per_key:
+        # Select a random bot that hasn't been used for this key yet
+        available_bots = [(name, script) for name, script in BOTS if (name, script) not in used_bots]
+
+        if not available_bots:
+            Logger.warning("All available bots have been run for this key")
+            break
+
+        bot_name, script = random.choice(available_bots)
+        used_bots.append((bot_name, script))
+
+        bot_progress = f"{bots_run+1}/{bots_per_key}"
+        Logger.status("bot", f"Running bot {bot_progress}: {bot_name}")
+
+        if not os.path.exists(script):
+            Logger.error(f"Script not found: {script}. Trying another...")
+            await asyncio.sleep(1)
+            continue
+
+        success = await run_bot_with_config(script, private_key, scheduler, runner)
+        bots_run += 1
+        succeeded += int(bool(success))
+
+        if not success:
+            Logger.error(f"Bot execution failed for key: {private_key[:6]}...{private_key[-4:]}")
+            Logger.warning(f"Delaying for 3 seconds before trying another bot...")
+            await asyncio.sleep(3)
+        else:
+            # Small pause between successful bot runs
+            await asyncio.sleep(2)
+
+    return {'runs': bots_run, 'succeeded': succeeded, 'failed': bots_run - succeeded}
 
 async def main_async():
     # Display the fancy banner
@@ -71,6 +138,9 @@ async def main_async():
     private_keys = load_private_keys()
     account_manager = AccountManager(private_keys)
     scheduler = Scheduler()
+    runner = BotRunner()
+    if RUNNER_CONFIG['mode'] == 'inprocess':
+        runner.preload(BOTS)
     
     while True:
         print_section("MAIN MENU")
@@ -113,7 +183,7 @@ async def main_async():
             
             while True:
                 private_key = account_manager.get_next_account()
-                success = await run_bot_with_config(script, private_key, scheduler)
+                success = await run_bot_with_config(script, private_key, scheduler, runner)
                 
                 if not success:
                     Logger.warning(f"Bot execution failed for key: {private_key[:6]}...{private_key[-4:]}")
@@ -182,77 +252,81 @@ async def main_async():
             
             # Load all private keys
             private_keys = load_private_keys()
+            addresses = [private_keys.address(index) for index in range(len(private_keys))] if RUNNER_CONFIG['balance_snapshot'] else []
+            
+            # Spread keys over several worker processes if configured
+            sharded_runner = None
+            if RUNNER_CONFIG['shards'] != 1 and len(private_keys) > 1:
+                sharded_runner = ShardedRunner(RUNNER_CONFIG['shards'], BOTS)
+                Logger.info(f"Using {sharded_runner.shards} worker processes")
             
             cycle_number = 1
-            while True:  # Main cycle loop
-                print_section("STARTING NEW CYCLE")
-                Logger.header(f"CYCLE #{cycle_number}")
-                Logger.info(f"Starting a new cycle of bot runs for all private keys")
+            try:
+                while True:  # Main cycle loop
+                    print_section("STARTING NEW CYCLE")
+                    Logger.header(f"CYCLE #{cycle_number}")
+                    Logger.info(f"Starting a new cycle of bot runs for all private keys")
+                    if RUNNER_CONFIG['balance_snapshot']:
+                        await take_balance_snapshot(runner, addresses)
                 
-                # For each private key
-                for idx, private_key in enumerate(private_keys):
-                    key_progress = f"{idx+1}/{len(private_keys)}"
-                    Logger.step(idx+1, len(private_keys), f"Processing private key: {private_key[:6]}...{private_key[-4:]}")
-                    
-                    # Run specified number of random bots for this key
-                    bots_run = 0
-                    used_bots = []  # Keep track of which bots have been used for this key
-                    
-                    while bots_run < bots_per_key:
-                        # Select a random bot that hasn't been used for this key yet
-                        available_bots = [(name, script) for name, script in BOTS if (name, script) not in used_bots]
-                        
-                        if not available_bots:
-                            Logger.warning("All available bots have been run for this key")
-                            break
-                        
-                        bot_name, script = random.choice(available_bots)
-                        used_bots.append((bot_name, script))
-                        
-                        bot_progress = f"{bots_run+1}/{bots_per_key}"
-                        Logger.status("bot", f"Running bot {bot_progress}: {bot_name}")
-                        
-                        if not os.path.exists(script):
-                            Logger.error(f"Script not found: {script}. Trying another...")
-                            await asyncio.sleep(1)
-                            continue
-                        
-                        success = await run_bot_with_config(script, private_key, scheduler)
-                        bots_run += 1
-                        
-                        if not success:
-                            Logger.error(f"Bot execution failed for key: {private_key[:6]}...{private_key[-4:]}")
-                            Logger.warning(f"Delaying for 3 seconds before trying another bot...")
-                            await asyncio.sleep(3)
-                        else:
-                            # Small pause between successful bot runs
-                            await asyncio.sleep(2)
+                    if sharded_runner is not None:
+                        # Each worker process runs its shard of keys on its own event loop
+                        job = functools.partial(run_random_bots, bots_per_key=bots_per_key, scheduler=scheduler)
+                        totals = await sharded_runner.run(job, private_keys, RUNNER_CONFIG['concurrency'])
+                    else:
+                        # Process private keys through the worker pool, one job per key
+                        pool = AccountWorkerPool(RUNNER_CONFIG['concurrency'])
+                        totals = merge_results(await pool.run_all([
+                            (private_key, functools.partial(run_random_bots, idx, len(private_keys), private_key, bots_per_key, scheduler, runner))
+                            for idx, private_key in enumerate(private_keys)
+                        ]))
+                    Logger.info(f"Cycle #{cycle_number} finished: {totals['succeeded']}/{totals['runs']} bot runs succeeded across {totals['keys']} keys ({totals['errors']} errors)")
+                    if RPC_CONFIG['priority_fee'] == 'adaptive' and runner.w3 is not None:
+                        # Inclusion latency measured at each tip level of the shared client
+                        get_fee_oracle(runner.w3).controller.log_summary()
+                    if METRICS_CONFIG['cycle_summary']:
+                        # Latency, errors and traffic per endpoint and method over this cycle
+                        get_metrics().log_cycle_summary()
                 
-                # Check if we should repeat the cycle
-                if wait_seconds <= 0:
-                    Logger.success("All private keys processed. Exiting as per configuration.")
-                    break
+                    # Check if we should repeat the cycle
+                    if wait_seconds <= 0:
+                        Logger.success("All private keys processed. Exiting as per configuration.")
+                        break
                 
-                # Wait for the specified time before starting a new cycle
-                wait_until = datetime.datetime.now() + datetime.timedelta(seconds=wait_seconds)
-                print_section("WAITING FOR NEXT CYCLE")
-                Logger.info(f"All private keys processed. Waiting until {wait_until.strftime('%Y-%m-%d %H:%M:%S')} before starting a new cycle...")
+                    # Wait for the specified time before starting a new cycle
+                    wait_until = datetime.datetime.now() + datetime.timedelta(seconds=wait_seconds)
+                    print_section("WAITING FOR NEXT CYCLE")
+                    Logger.info(f"All private keys processed. Waiting until {wait_until.strftime('%Y-%m-%d %H:%M:%S')} before starting a new cycle...")
                 
-                # Show progress bar for waiting
-                start_time = datetime.datetime.now()
-                total_wait = wait_seconds
+                    # Show progress bar for waiting
+                    start_time = datetime.datetime.now()
+                    total_wait = wait_seconds
                 
-                for remaining in range(wait_seconds, 0, -1):
-                    elapsed = total_wait - remaining
-                    Logger.progress(elapsed, total_wait, "Waiting", f"{remaining} seconds remaining")
-                    await asyncio.sleep(1)
+                    for remaining in range(wait_seconds, 0, -1):
+                        elapsed = total_wait - remaining
+                        Logger.progress(elapsed, total_wait, "Waiting", f"{remaining} seconds remaining")
+                        await asyncio.sleep(1)
                 
-                cycle_number += 1
+                    cycle_number += 1
+            finally:
+                # Shut the worker processes down however the loop ends (Ctrl-C, cancellation, errors)
+                if sharded_runner is not None:
+                    sharded_runner.close()
         else:
             Logger.error("Invalid choice!")
 
+async def run_main():
+    # Claim the recording before any shard worker or bot subprocess starts, see utils/cassette.py
+    get_cassette()
+    try:
+        await start_metrics_server()
+        await main_async()
+    finally:
+        await get_metrics().stop()
+        await close_session()
+
 def main():
-    asyncio.run(main_async())
+    asyncio.run(run_main())
 
 if __name__ == "__main__":
     main()
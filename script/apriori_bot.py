@@ -1,13 +1,26 @@
 import asyncio
+import os
+import sys
 import random
 import platform
 from decimal import Decimal
 from typing import Dict
 from web3 import AsyncWeb3, Web3
-from eth_account import Account
 from colorama import init, Fore, Style
 from loguru import logger
 
+# Make the utils package importable when this script is run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ENDPOINT_CONFIG
+from utils.abi_codec import ContractCodec
+from utils.fee_oracle import get_fee_oracle
+from utils.gas_profile import estimate_gas
+from utils.signer import get_account
+from utils.tx_manager import send_transaction, wait_for_receipt
+from utils.key_store import get_key_store
+from utils.rpc_client import get_web3
+from utils.tracing import traced
+
 # Initialize colorama
 init(autoreset=True)
 
@@ -16,7 +29,7 @@ if platform.system() == 'Windows':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 # ========== NETWORK SETTINGS ==========
-RPC_URLS = [
+RPC_URLS = ENDPOINT_CONFIG['monad_rpc_urls'] or [
     "https://testnet-rpc.monad.xyz",
     "https://testnet-rpc.monorail.xyz",
     "https://monad-testnet.drpc.org"
@@ -82,6 +95,9 @@ STAKE_ABI = [
     }
 ]
 
+# Selectors and encoders for the staking contract, prepared once
+STAKE = ContractCodec(STAKE_ABI)
+
 # ========== MINIMAL CONFIG ===========
 class DummyAprioriConfig:
     class APRIORI:
@@ -95,45 +111,30 @@ class DummyAprioriConfig:
 
 # ========== APRIORI CLASS ============
 class Apriori:
-    def __init__(self, account_index: int, proxy: str, private_key: str, config: DummyAprioriConfig):
+    def __init__(self, account_index: int, proxy: str, private_key: str, config: DummyAprioriConfig, web3: AsyncWeb3):
         self.account_index = account_index
         self.proxy = proxy
         self.private_key = private_key
         self.config = config
-        self.account = Account.from_key(private_key=private_key)
-        
-        # Connect to RPC
-        self.web3 = None
-        for rpc_url in RPC_URLS:
-            try:
-                # First check connection with synchronous Web3
-                sync_web3 = Web3(Web3.HTTPProvider(rpc_url))
-                if sync_web3.is_connected():
-                    logger.info(f"Successfully connected to RPC: {rpc_url}")
-                    # Now create AsyncWeb3 for later async usage
-                    self.web3 = AsyncWeb3(AsyncWeb3.AsyncHTTPProvider(rpc_url))
-                    break
-            except Exception as e:
-                logger.error(f"Cannot connect to {rpc_url}: {str(e)}")
+        self.account = get_account(private_key)
         
+        # Connected client from utils.rpc_client.get_web3
+        self.web3 = web3
         if not self.web3:
             raise Exception("Cannot connect to any RPC")
 
     async def get_gas_params(self) -> Dict[str, int]:
-        latest_block = await self.web3.eth.get_block("latest")
-        base_fee = latest_block["baseFeePerGas"]
-        max_priority_fee = await self.web3.eth.max_priority_fee
-        max_fee = base_fee + max_priority_fee
-        return {"maxFeePerGas": max_fee, "maxPriorityFeePerGas": max_priority_fee}
+        return await get_fee_oracle(self.web3).gas_params('eip1559')
 
     async def estimate_gas(self, transaction: dict) -> int:
         try:
-            estimated = await self.web3.eth.estimate_gas(transaction)
+            estimated = await estimate_gas(self.web3, transaction)
             return int(estimated * 1.1)
         except Exception as e:
             logger.warning(f"[{self.account_index}] Error estimating gas: {e}. Using default gas limit")
             raise e
 
+    @traced()
     async def stake_mon(self):
         insufficient_balance_count = 0
         for retry in range(self.config.SETTINGS.ATTEMPTS):
@@ -146,28 +147,25 @@ class Apriori:
                     random.randint(6, 12),
                 )
                 logger.info(f"[{self.account_index}] Staking {random_amount} MON on Apriori")
-                contract = Web3().eth.contract(address=STAKE_ADDRESS, abi=STAKE_ABI)
                 amount_wei = Web3.to_wei(random_amount, "ether")
                 gas_params = await self.get_gas_params()
                 transaction = {
                     "from": self.account.address,
                     "to": STAKE_ADDRESS,
                     "value": amount_wei,
-                    "data": contract.functions.deposit(amount_wei, self.account.address)._encode_transaction_data(),
+                    "data": STAKE.deposit.encode(amount_wei, self.account.address),
                     "chainId": 10143,
                     "type": 2,
                 }
                 estimated_gas = await self.estimate_gas(transaction)
                 transaction.update({
-                    "nonce": await self.web3.eth.get_transaction_count(self.account.address, "latest"),
                     "gas": estimated_gas,
                     **gas_params,
                 })
-                signed_txn = self.web3.eth.account.sign_transaction(transaction, self.private_key)
-                tx_hash = await self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+                tx_hash = await send_transaction(self.web3, transaction, self.private_key)
                 logger.info(f"[{self.account_index}] Waiting for transaction confirmation...")
-                await self.web3.eth.wait_for_transaction_receipt(tx_hash)
-                logger.success(f"[{self.account_index}] Successfully staked {random_amount} MON on Apriori. TX: {EXPLORER_URL}{tx_hash.hex()}")
+                receipt = await wait_for_receipt(self.web3, tx_hash, self.account.address)
+                logger.success(f"[{self.account_index}] Successfully staked {random_amount} MON on Apriori. TX: {EXPLORER_URL}{receipt.transactionHash.hex()}")
                 return True
             except Exception as e:
                 error_str = str(e)
@@ -184,12 +182,12 @@ class Apriori:
                     await asyncio.sleep(random_pause)
         return False
 
+    @traced()
     async def request_unstake(self):
         for retry in range(self.config.SETTINGS.ATTEMPTS):
             try:
                 logger.info(f"[{self.account_index}] Requesting to unstake MON from Apriori")
-                contract = self.web3.eth.contract(address=STAKE_ADDRESS, abi=STAKE_ABI)
-                max_shares = await contract.functions.maxRedeem(self.account.address).call()
+                max_shares = await STAKE.maxRedeem.call(self.web3, STAKE_ADDRESS, self.account.address)
                 if max_shares == 0:
                     logger.warning(f"[{self.account_index}] No shares available to redeem")
                     return False
@@ -199,22 +197,20 @@ class Apriori:
                 transaction = {
                     "from": self.account.address,
                     "to": STAKE_ADDRESS,
-                    "data": contract.functions.requestRedeem(amount_wei, self.account.address, self.account.address)._encode_transaction_data(),
+                    "data": STAKE.requestRedeem.encode(amount_wei, self.account.address, self.account.address),
                     "chainId": 10143,
                     "type": 2,
                 }
                 estimated_gas = await self.estimate_gas(transaction)
                 transaction.update({
-                    "nonce": await self.web3.eth.get_transaction_count(self.account.address, "latest"),
                     "gas": estimated_gas,
                     **gas_params,
                 })
-                signed_txn = self.web3.eth.account.sign_transaction(transaction, self.private_key)
-                tx_hash = await self.web3.eth.send_raw_transaction(signed_txn.raw_transaction)
+                tx_hash = await send_transaction(self.web3, transaction, self.private_key)
                 logger.info(f"[{self.account_index}] Waiting for unstake request confirmation...")
-                receipt = await self.web3.eth.wait_for_transaction_receipt(tx_hash)
+                receipt = await wait_for_receipt(self.web3, tx_hash, self.account.address)
                 if receipt["status"] == 1:
-                    logger.success(f"[{self.account_index}] Successfully requested to unstake {Web3.from_wei(amount_wei, 'ether')} MON from Apriori. TX: {EXPLORER_URL}{tx_hash.hex()}")
+                    logger.success(f"[{self.account_index}] Successfully requested to unstake {Web3.from_wei(amount_wei, 'ether')} MON from Apriori. TX: {EXPLORER_URL}{receipt.transactionHash.hex()}")
                     return True
                 else:
                     logger.error(f"[{self.account_index}] Transaction failed. Status: {receipt['status']}")
@@ -225,41 +221,32 @@ class Apriori:
                 await asyncio.sleep(random_pause)
         return False
 
-# ========== PRIVATE KEY READER ==========
-def read_private_key(file_path='pvkey.txt'):
-    try:
-        with open(file_path, 'r') as f:
-            for line in f:
-                if line.strip() and not line.strip().startswith('#'):
-                    pk = line.strip()
-                    if pk.startswith('0x'):
-                        pk = pk[2:]
-                    if len(pk) == 64:
-                        return '0x' + pk
-    except Exception as e:
-        print(f"{Fore.RED}Error reading private key: {e}{Style.RESET_ALL}")
-    return None
-
 # ========== MAIN CLI ==========
-async def main():
+async def run(private_key=None, w3=None):
     print(f"{Fore.GREEN}{'=' * 60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'APRIORI BOT':^60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'=' * 60}{Style.RESET_ALL}")
 
-    private_key = read_private_key('pvkey.txt')
+    if not private_key:
+        private_key = get_key_store().first()
     if not private_key:
         print(f"{Fore.RED}No valid private key found!{Style.RESET_ALL}")
-        return
+        return False
 
     proxy = ""
     config = DummyAprioriConfig()
     account_index = 0
-    apriori = Apriori(account_index, proxy, private_key, config)
-    print(f"{Fore.CYAN}Using account: {Account.from_key(private_key).address}{Style.RESET_ALL}")
+    if w3 is None:
+        w3 = await get_web3(RPC_URLS)
+    if not w3:
+        print(f"{Fore.RED}Cannot connect to any RPC{Style.RESET_ALL}")
+        return False
+    apriori = Apriori(account_index, proxy, private_key, config, web3=w3)
+    print(f"{Fore.CYAN}Using account: {get_key_store().address_of(private_key)}{Style.RESET_ALL}")
 
     # Automatically stake 0.1 MON
     print(f"{Fore.YELLOW}Staking 0.1 MON on Apriori...{Style.RESET_ALL}")
-    await apriori.stake_mon()
+    return await apriori.stake_mon()
 
 if __name__ == "__main__":
-    asyncio.run(main()) 
\ No newline at end of file
+    asyncio.run(run(os.environ.get('PRIVATE_KEY'))) 
\ No newline at end of file
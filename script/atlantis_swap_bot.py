@@ -1,17 +1,25 @@
-import requests
 from colorama import init, Fore, Style
 from web3 import Web3
-from eth_account import Account
 import time
 import os
+import sys
 import asyncio
 import random
 
+# Make the utils package importable when this script is run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ENDPOINT_CONFIG
+from utils.fee_oracle import get_gas_params
+from utils.tx_manager import send_transaction, wait_for_receipt
+from utils.key_store import get_key_store
+from utils.rpc_client import get_web3, http_get_json
+from utils.tracing import traced
+
 # Initialize colorama
 init(autoreset=True)
 
 # RPC URLs
-RPC_URLS = [
+RPC_URLS = ENDPOINT_CONFIG['monad_rpc_urls'] or [
     "https://testnet-rpc.monad.xyz",
     "https://testnet-rpc.monorail.xyz",
     "https://monad-testnet.drpc.org"
@@ -27,119 +35,63 @@ headers = {
     "Accept": "application/json"
 }
 
+# Swap quote endpoint
+ATLANTIS_QUOTE_URL = f"{ENDPOINT_CONFIG['atlantis_api_url']}/api/Ox/swap/quote"
+
 # API taker address
 taker_address = "0x18224a5bD5e270732CAF81570e8653572e7FFf25"
 
-# ฟังก์ชันอ่าน private key จากไฟล์
-def read_private_key(file_path='pvkey.txt'):
-    try:
-        # ลองอ่านไฟล์ด้วย encoding ต่างๆ
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'utf-16']
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    for line in file:
-                        # ข้ามบรรทัดที่เป็นคอมเมนต์
-                        if line.strip().startswith('#') or not line.strip():
-                            continue
-                        
-                        # ลบ whitespace และตรวจสอบรูปแบบ
-                        private_key = line.strip()
-                        
-                        # ลบ 0x นำหน้าออก (จะเติมกลับในภายหลัง)
-                        if private_key.startswith('0x'):
-                            private_key = private_key[2:]
-                        
-                        # ตรวจสอบความยาว
-                        if len(private_key) != 64:
-                            print(f"{Fore.YELLOW}คำเตือน: private key ไม่ถูกต้อง (ความยาวไม่ถูกต้อง){Style.RESET_ALL}")
-                            continue
-                        
-                        # ตรวจสอบว่าเป็น hex string
-                        try:
-                            int(private_key, 16)
-                            print(f"{Fore.GREEN}พบ private key ที่ถูกต้องในไฟล์{Style.RESET_ALL}")
-                            return '0x' + private_key  # เติม 0x นำหน้า
-                        except ValueError:
-                            print(f"{Fore.YELLOW}คำเตือน: พบตัวอักษรที่ไม่ใช่เลขฐานสิบหก (0-9, a-f){Style.RESET_ALL}")
-                            continue
-                
-                # ถ้าไม่พบ private key ที่ถูกต้องใน encoding นี้ ให้ลองต่อไป
-            except UnicodeDecodeError:
-                continue  # ลอง encoding ถัดไป
-    
-    except FileNotFoundError:
-        print(f"{Fore.RED}ไม่พบไฟล์ {file_path}{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}เกิดข้อผิดพลาดในการอ่านไฟล์: {str(e)}{Style.RESET_ALL}")
-    
-    print(f"{Fore.RED}ไม่พบ private key ที่ถูกต้องในไฟล์ {file_path}{Style.RESET_ALL}")
-    return None
+@traced()
+async def get_quote(url):
+    """Get a swap quote from the Atlantis API, as (HTTP status, response JSON)"""
+    return await http_get_json(url, headers=headers)
 
-async def get_gas_params(w3):
-    """Get current gas parameters from the network"""
-    try:
-        latest_block = w3.eth.get_block("latest")
-        base_fee = latest_block["baseFeePerGas"]
-        max_priority_fee = w3.eth.max_priority_fee
+@traced()
+async def swap(w3, tx, private_key, wallet_address):
+    """Send the quoted swap transaction and wait for its receipt"""
+    tx_hash = await send_transaction(w3, tx, private_key)
 
-        # Calculate maxFeePerGas (base fee + priority fee)
-        max_fee = base_fee + max_priority_fee
+    print(f"{Fore.YELLOW}Swap transaction sent: {tx_hash.hex()}{Style.RESET_ALL}")
+    print(f"{Fore.YELLOW}View on explorer: {EXPLORER_URL}{tx_hash.hex()}{Style.RESET_ALL}")
 
-        return {
-            "maxFeePerGas": max_fee,
-            "maxPriorityFeePerGas": max_priority_fee,
-        }
-    except Exception as e:
-        print(f"{Fore.YELLOW}Error getting EIP-1559 gas params: {str(e)}. Using legacy gas pricing.{Style.RESET_ALL}")
-        return None
+    # Wait for confirmation
+    print(f"{Fore.YELLOW}Waiting for transaction confirmation...{Style.RESET_ALL}")
+    return await wait_for_receipt(w3, tx_hash, wallet_address, timeout=300)
 
-async def run():
+async def run(private_key=None, w3=None):
     print(f"{Fore.GREEN}{'=' * 60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'ATLANTIS SWAP BOT':^60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'=' * 60}{Style.RESET_ALL}")
 
-    # Connect to Monad RPC
-    w3 = None
-    for rpc_url in RPC_URLS:
-        try:
-            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 10}))
-            if w3.is_connected():
-                print(f"{Fore.GREEN}Successfully connected to Monad network: {rpc_url}{Style.RESET_ALL}")
-                break
-        except Exception as e:
-            print(f"{Fore.RED}Cannot connect to Monad RPC {rpc_url}: {str(e)}{Style.RESET_ALL}")
+    # Connect to Monad RPC unless a shared client was passed in
+    if w3 is None:
+        w3 = await get_web3(RPC_URLS)
     
     if not w3:
         print(f"{Fore.RED}Cannot connect to any Monad RPC{Style.RESET_ALL}")
         return False
 
-    # Get private key from file
-    private_key = read_private_key('pvkey.txt')
+    # Get the first key from the key store unless one was passed in
+    if not private_key:
+        private_key = get_key_store().first()
     if not private_key:
         print(f"{Fore.RED}Cannot proceed without a valid private key{Style.RESET_ALL}")
         return False
 
-    # Create account from private key
-    account = Account.from_key(private_key)
-    wallet_address = account.address
+    # Look up the wallet address
+    wallet_address = get_key_store().address_of(private_key)
     print(f"{Fore.CYAN}Using account: {wallet_address}{Style.RESET_ALL}")
 
     # Get current balance
-    balance_wei = w3.eth.get_balance(wallet_address)
+    balance_wei = await w3.eth.get_balance(wallet_address)
     balance_eth = float(w3.from_wei(balance_wei, 'ether'))  # Convert to float
     print(f"{Fore.BLUE}Current MON balance: {balance_eth} MON{Style.RESET_ALL}")
 
-    # Get gas parameters
-    try:
-        gas_params = await get_gas_params(w3)
-        if not gas_params:
-            gas_price = w3.eth.gas_price
-            gas_params = {"gasPrice": int(gas_price * 1.1)}
-    except:
-        gas_price = w3.eth.gas_price
-        gas_params = {"gasPrice": int(gas_price * 1.1)}
+    # Get gas parameters (EIP-1559, or legacy +10% if the chain has no base fee)
+    gas_params = await get_gas_params(w3, 'eip1559')
+    if not gas_params:
+        print(f"{Fore.RED}Cannot get gas parameters{Style.RESET_ALL}")
+        return False
 
     # Calculate gas cost
     if "gasPrice" in gas_params:
@@ -169,16 +121,15 @@ async def run():
     print(f"{Fore.CYAN}Swap amount: {swap_amount_eth} MON{Style.RESET_ALL}")
 
     # Create URL for API with user's wallet address
-    url = f"https://api.atlantisdex.xyz/api/Ox/swap/quote?chainId=10143&sellToken=0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee&buyToken={atl_address}&sellAmount={swap_amount_wei}&taker={wallet_address}&slippageBps=50"
+    url = f"{ATLANTIS_QUOTE_URL}?chainId=10143&sellToken=0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee&buyToken={atl_address}&sellAmount={swap_amount_wei}&taker={wallet_address}&slippageBps=50"
     print(f"{Fore.CYAN}Using native MON to buy ATL token...{Style.RESET_ALL}")
 
     # Send GET request to get quote
     try:
         await asyncio.sleep(1)  # Delay to avoid rate limit
-        response = requests.get(url, headers=headers)
+        status, quote_data = await get_quote(url)
         
-        if response.status_code == 200:
-            quote_data = response.json()
+        if status == 200:
             print(f"{Fore.GREEN}Successfully got quote from Atlantis DEX{Style.RESET_ALL}")
             
             # Debug response structure
@@ -199,16 +150,15 @@ async def run():
                     print(f"{Fore.YELLOW}Updating URL to use your account...{Style.RESET_ALL}")
                     
                     # Create new URL with your wallet address
-                    new_url = f"https://api.atlantisdex.xyz/api/Ox/swap/quote?chainId=10143&sellToken=0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee&buyToken={atl_address}&sellAmount={swap_amount_wei}&taker={wallet_address}&slippageBps=50"
+                    new_url = f"{ATLANTIS_QUOTE_URL}?chainId=10143&sellToken=0xeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeeee&buyToken={atl_address}&sellAmount={swap_amount_wei}&taker={wallet_address}&slippageBps=50"
                     
                     print(f"{Fore.CYAN}Getting new quote with your account...{Style.RESET_ALL}")
                     await asyncio.sleep(2)  # Wait to avoid rate limit
                     
-                    response = requests.get(new_url, headers=headers)
-                    if response.status_code != 200:
+                    status, quote_data = await get_quote(new_url)
+                    if status != 200:
                         print(f"{Fore.RED}Failed to get quote with your account{Style.RESET_ALL}")
                         return False
-                    quote_data = response.json()
                     
                     # Debug updated response
                     print(f"{Fore.CYAN}Updated response structure:{Style.RESET_ALL}")
@@ -247,7 +197,6 @@ async def run():
                         'to': to_address,
                         'value': int(quote_data['transaction']['value']),
                         'data': quote_data['transaction']['data'],
-                        'nonce': w3.eth.get_transaction_count(wallet_address),
                         'chainId': 10143,  # Monad testnet
                         'gas': gas_with_buffer,
                         **gas_params
@@ -282,7 +231,6 @@ async def run():
                         'to': to_address,
                         'value': int(quote_data['value']),
                         'data': quote_data['data'],
-                        'nonce': w3.eth.get_transaction_count(wallet_address),
                         'chainId': 10143,  # Monad testnet
                         'gas': gas_with_buffer,
                         **gas_params
@@ -291,16 +239,8 @@ async def run():
                     print(f"{Fore.RED}Error: Cannot find required transaction fields in API response{Style.RESET_ALL}")
                     return False
                 
-                # Sign and send transaction
-                signed_tx = w3.eth.account.sign_transaction(tx, private_key)
-                tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-                
-                print(f"{Fore.YELLOW}Swap transaction sent: {tx_hash.hex()}{Style.RESET_ALL}")
-                print(f"{Fore.YELLOW}View on explorer: {EXPLORER_URL}{tx_hash.hex()}{Style.RESET_ALL}")
-                
-                # Wait for confirmation
-                print(f"{Fore.YELLOW}Waiting for transaction confirmation...{Style.RESET_ALL}")
-                receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+                # Sign and send transaction, then wait for confirmation
+                receipt = await swap(w3, tx, private_key, wallet_address)
                 
                 if receipt.status == 1:
                     print(f"{Fore.GREEN}Swap transaction successful!{Style.RESET_ALL}")
@@ -313,7 +253,7 @@ async def run():
                 print(f"{Fore.RED}Error creating transaction: {str(e)}{Style.RESET_ALL}")
                 return False
         else:
-            print(f"{Fore.RED}Failed to get quote from Atlantis DEX: {response.text}{Style.RESET_ALL}")
+            print(f"{Fore.RED}Failed to get quote from Atlantis DEX: {quote_data}{Style.RESET_ALL}")
             return False
             
     except Exception as e:
@@ -322,4 +262,4 @@ async def run():
 
 # ทำการรันโปรแกรมเมื่อเรียกใช้โดยตรง
 if __name__ == "__main__":
-    asyncio.run(run())
\ No newline at end of file
+    asyncio.run(run(os.environ.get('PRIVATE_KEY')))
\ No newline at end of file
@@ -3,13 +3,26 @@ import time
 import json
 import random
 import asyncio
+import os
+import sys
 import platform
 from web3 import Web3, AsyncWeb3
-from eth_account import Account
 from colorama import init, Fore, Style
 from decimal import Decimal
 from loguru import logger
 
+# Make the utils package importable when this script is run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ENDPOINT_CONFIG
+from utils.abi_codec import ContractCodec
+from utils.fee_oracle import fee_params, get_fee_oracle
+from utils.gas_profile import estimate_gas, get_gas_profile
+from utils.tx_manager import send_transaction, wait_for_receipt
+from utils.preflight import preflight
+from utils.key_store import get_key_store
+from utils.rpc_client import get_web3
+from utils.tracing import traced
+
 # Initialize colorama
 init(autoreset=True)
 
@@ -18,7 +31,7 @@ if platform.system() == 'Windows':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 # ========== NETWORK SETTINGS ==========
-RPC_URLS = [
+RPC_URLS = ENDPOINT_CONFIG['monad_rpc_urls'] or [
     "https://testnet-rpc.monad.xyz",
     "https://testnet-rpc.monorail.xyz",
     "https://monad-testnet.drpc.org"
@@ -42,6 +55,7 @@ COINFLIP_BET_AMOUNT = 0.001  # MON
 DICE_BET_AMOUNT = 0.001  # MON
 MAX_ATTEMPTS = 3
 PAUSE_BETWEEN_ATTEMPTS = (5, 15)
+GAME_GAS_LIMIT = 300000  # Game plays before a limit is learned from their receipts
 
 # ========== CONTRACT ABIs ==========
 NARWHAL_ABI = [
@@ -85,9 +99,19 @@ USDT_ABI = [
         "outputs": [{"name": "", "type": "uint256"}],
         "stateMutability": "view",
         "type": "function"
+    },
+    {
+        "inputs": [],
+        "name": "mint",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
     }
 ]
 
+# Selectors and encoders for the USDT token, prepared once
+USDT = ContractCodec(USDT_ABI)
+
 # Contract addresses
 USDT_ADDRESS = "0x6593F49Ca8D3038cA002314C187b63dD348c2F94"
 USDT_FAUCET_ADDRESS = "0xFF85587E991E16bcB9a6A0C52ff919305944f011"
@@ -95,104 +119,44 @@ SLOTS_ADDRESS = "0x5939199FC366f741c5f4981BF343aC5A3ddf748d"
 COINFLIP_ADDRESS = "0x5c1C68a709427Cfdb184399304251658f91d4ea8"
 DICE_ADDRESS = "0xc552a88f2FAB0b7800F2F54141ACe8C4C06f50A2"
 
-# Read private key function
-def read_private_key(file_path='pvkey.txt'):
-    try:
-        # Try different encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'utf-16']
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    for line in file:
-                        # Skip comment lines
-                        if line.strip().startswith('#') or not line.strip():
-                            continue
-                        
-                        # Remove whitespace and validate format
-                        private_key = line.strip()
-                        
-                        # Remove 0x prefix if present
-                        if private_key.startswith('0x'):
-                            private_key = private_key[2:]
-                        
-                        # Check length
-                        if len(private_key) != 64:
-                            print(f"{Fore.YELLOW}Warning: Invalid private key (incorrect length){Style.RESET_ALL}")
-                            continue
-                        
-                        # Check if hex string
-                        try:
-                            int(private_key, 16)
-                            print(f"{Fore.GREEN}Found valid private key in file{Style.RESET_ALL}")
-                            return '0x' + private_key  # Add 0x prefix
-                        except ValueError:
-                            print(f"{Fore.YELLOW}Warning: Found non-hex characters in private key{Style.RESET_ALL}")
-                            continue
-                
-                # If no valid private key found in this encoding, try next
-            except UnicodeDecodeError:
-                continue  # Try next encoding
-    
-    except FileNotFoundError:
-        print(f"{Fore.RED}File {file_path} not found{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}Error reading file: {str(e)}{Style.RESET_ALL}")
-    
-    print(f"{Fore.RED}No valid private key found in {file_path}{Style.RESET_ALL}")
-    return None
-
-async def get_gas_params(w3):
-    """Get gas parameters for transaction"""
-    try:
-        # Get base fee
-        latest_block = w3.eth.get_block('latest')
-        base_fee = latest_block['baseFeePerGas']
-        
-        # Get max priority fee
-        max_priority_fee = w3.eth.max_priority_fee
-        
-        # Calculate max fee
-        max_fee = (base_fee * 2) + max_priority_fee
-        
-        return {
-            'maxFeePerGas': max_fee,
-            'maxPriorityFeePerGas': max_priority_fee
-        }
-    except Exception as e:
-        print(f"{Fore.YELLOW}Error getting EIP-1559 gas params: {str(e)}. Using legacy gas pricing.{Style.RESET_ALL}")
-        return None
 
-async def estimate_gas(w3, transaction):
-    """Estimate gas for transaction and add some buffer"""
-    try:
-        estimated = w3.eth.estimate_gas(transaction)
-        # Add 10% to estimated gas for safety
-        return int(estimated * 1.1)
-    except Exception as e:
-        print(f"{Fore.RED}Error estimating gas: {e}. Using default gas limit{Style.RESET_ALL}")
+def gas_limit(pre):
+    """Gas limit from the preflight estimate with some buffer"""
+    if pre.gas_estimate is None:
+        print(f"{Fore.RED}Error estimating gas: {pre.estimate_error}. Using default gas limit{Style.RESET_ALL}")
         return 100000
+    # Add 10% to estimated gas for safety
+    return int(pre.gas_estimate * 1.1)
+
+def game_gas_limit(transaction):
+    """Gas limit for a game play: the one learned from earlier plays, or GAME_GAS_LIMIT
 
+    eth_estimateGas cannot be used here, it reverts on the USDT allowance until the approval sent just before is mined.
+    """
+    profile = get_gas_profile()
+    learned = profile.learned_limit(transaction) if profile is not None else None
+    return learned or GAME_GAS_LIMIT
+
+@traced()
 async def call_faucet(w3, private_key, wallet_address, token_address, max_attempts=3):
     """Call faucet to get test tokens"""
     for attempt in range(max_attempts):
         try:
             print(f"{Fore.CYAN}Calling faucet for {token_address}...{Style.RESET_ALL}")
             
-            # Create faucet contract instance
-            faucet_contract = w3.eth.contract(address=USDT_FAUCET_ADDRESS, abi=USDT_ABI)
-            
             # Build faucet transaction
-            transaction = faucet_contract.functions.mint().build_transaction({
+            transaction = {
                 "from": wallet_address,
-                "nonce": w3.eth.get_transaction_count(wallet_address),
-                "gasPrice": w3.eth.gas_price,
+                "to": USDT_FAUCET_ADDRESS,
+                "value": 0,
+                "data": USDT.mint.encode(),
+                "gasPrice": (await get_fee_oracle(w3).get_fee_data()).gas_price,
                 "chainId": CHAIN_ID
-            })
+            }
             
-            # Estimate gas
+            # Estimate gas, from the learned gas profile when possible
             try:
-                gas_estimate = w3.eth.estimate_gas(transaction)
+                gas_estimate = await estimate_gas(w3, transaction)
                 transaction["gas"] = int(gas_estimate * 1.1)  # Add 10% buffer
                 print(f"{Fore.BLUE}Estimated gas: {gas_estimate}{Style.RESET_ALL}")
             except Exception as e:
@@ -200,17 +164,16 @@ async def call_faucet(w3, private_key, wallet_address, token_address, max_attemp
                 transaction["gas"] = 300000  # Default gas limit
             
             # Sign and send transaction
-            signed_txn = w3.eth.account.sign_transaction(transaction, private_key)
-            tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            tx_hash = await send_transaction(w3, transaction, private_key)
             
             print(f"{Fore.YELLOW}Waiting for faucet transaction confirmation...{Style.RESET_ALL}")
             
             # Wait for confirmation
-            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+            receipt = await wait_for_receipt(w3, tx_hash, wallet_address, timeout=300)
             
             if receipt.status == 1:
                 print(f"{Fore.GREEN}Successfully called faucet!{Style.RESET_ALL}")
-                print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{tx_hash.hex()}{Style.RESET_ALL}")
+                print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{receipt.transactionHash.hex()}{Style.RESET_ALL}")
                 return True
             else:
                 print(f"{Fore.RED}Faucet call failed: {receipt}{Style.RESET_ALL}")
@@ -231,50 +194,40 @@ async def call_faucet(w3, private_key, wallet_address, token_address, max_attemp
     print(f"{Fore.RED}Failed to call faucet after {max_attempts} attempts{Style.RESET_ALL}")
     return False
 
+@traced()
 async def approve_usdt(w3, private_key, wallet_address, spender, amount):
-    """Approve a specified amount of USDT for a spender"""
+    """Send an approval of a specified amount of USDT for a spender, returning the tx hash without waiting for it"""
     try:
         print(f"{Fore.CYAN}Approving {amount / (10**18)} USDT for spender {spender}{Style.RESET_ALL}")
         
-        # Create contract instance
-        usdt_contract = w3.eth.contract(address=USDT_ADDRESS, abi=USDT_ABI)
-        
         # Convert amount to uint256
         amount_uint = int(amount)
         
-        # Get gas parameters
-        gas_params = await get_gas_params(w3)
-        
         # Build the approval transaction
-        transaction = usdt_contract.functions.approve(spender, amount_uint).build_transaction({
+        transaction = {
             "from": wallet_address,
+            "to": USDT_ADDRESS,
+            "value": 0,
             "chainId": CHAIN_ID,
-            "nonce": w3.eth.get_transaction_count(wallet_address),
-            **gas_params,
-        })
+            "data": USDT.approve.encode(spender, amount_uint),
+        }
         
-        # Estimate gas
-        estimated_gas = await estimate_gas(w3, transaction)
-        transaction.update({"gas": estimated_gas})
+        # Fetch fees and gas estimate in one batch request
+        pre = await preflight(w3, wallet_address, transaction)
+        transaction.update({"gas": gas_limit(pre), **fee_params(pre, 'eip1559_2x')})
         
         # Sign and send transaction
-        signed_txn = w3.eth.account.sign_transaction(transaction, private_key)
-        tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+        tx_hash = await send_transaction(w3, transaction, private_key)
         
         print(f"{Fore.YELLOW}Approval transaction sent: {tx_hash.hex()}{Style.RESET_ALL}")
-        
-        # Wait for transaction confirmation
-        print(f"{Fore.YELLOW}Waiting for approval transaction confirmation...{Style.RESET_ALL}")
-        receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
-        
-        print(f"{Fore.GREEN}Successfully approved {amount / (10**18)} USDT for spender {spender}{Style.RESET_ALL}")
         print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{tx_hash.hex()}{Style.RESET_ALL}")
-        return True
+        return tx_hash
         
     except Exception as e:
         print(f"{Fore.RED}Error in approval: {str(e)}{Style.RESET_ALL}")
-        return False
+        return None
 
+@traced()
 async def play_slots(w3, private_key, wallet_address, max_attempts=3):
     """Play Slots game on Narwhal Finance"""
     for attempt in range(max_attempts):
@@ -284,9 +237,10 @@ async def play_slots(w3, private_key, wallet_address, max_attempts=3):
             
             print(f"{Fore.CYAN}Playing Slots with {usdt_amount / (10**18)} USDT...{Style.RESET_ALL}")
             
-            # First approve USDT spending
-            approve_success = await approve_usdt(w3, private_key, wallet_address, SLOTS_ADDRESS, usdt_amount)
-            if not approve_success:
+            # First approve USDT spending. The approval is not waited for: the game transaction
+            # takes the next nonce, so it is always mined after the approval
+            approve_hash = await approve_usdt(w3, private_key, wallet_address, SLOTS_ADDRESS, usdt_amount)
+            if not approve_hash:
                 print(f"{Fore.RED}Failed to approve USDT for Slots{Style.RESET_ALL}")
                 if attempt < max_attempts - 1:
                     continue
@@ -307,41 +261,39 @@ async def play_slots(w3, private_key, wallet_address, max_attempts=3):
                 "000000000000000000000000ffffffffffffffffffffffffffffffffffffffff"  # stopLoss
             )
             
-            # Get gas parameters
-            gas_params = await get_gas_params(w3)
-            
             # Create transaction
             transaction = {
                 "from": wallet_address,
                 "to": SLOTS_ADDRESS,
                 "value": 27000001350000001,  # Exact value in wei required by contract
-                "nonce": w3.eth.get_transaction_count(wallet_address),
                 "chainId": CHAIN_ID,
                 "type": 2,
                 "data": payload,
-                **gas_params,
             }
             
-            # Estimate gas
-            try:
-                gas_estimate = w3.eth.estimate_gas(transaction)
-                transaction["gas"] = int(gas_estimate * 1.3)
-            except Exception as e:
-                print(f"{Fore.YELLOW}Error estimating gas: {str(e)}. Using default gas limit.{Style.RESET_ALL}")
-                transaction["gas"] = 300000
+            # Fetch fees; the gas limit is not estimated since the approval is not mined yet
+            pre = await preflight(w3, wallet_address)
+            transaction.update(fee_params(pre, 'eip1559_2x'))
+            transaction["gas"] = game_gas_limit(transaction)
             
             # Sign and send transaction
-            signed_txn = w3.eth.account.sign_transaction(transaction, private_key)
-            tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            tx_hash = await send_transaction(w3, transaction, private_key)
             
             print(f"{Fore.YELLOW}Slots_Play transaction sent: {tx_hash.hex()}{Style.RESET_ALL}")
             
-            # Wait for transaction confirmation
-            print(f"{Fore.YELLOW}Waiting for Slots_Play transaction confirmation...{Style.RESET_ALL}")
-            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+            # Wait for the approval and the game transaction together
+            print(f"{Fore.YELLOW}Waiting for approval and Slots_Play transaction confirmation...{Style.RESET_ALL}")
+            approve_receipt, receipt = await asyncio.gather(
+                wait_for_receipt(w3, approve_hash, wallet_address, timeout=300),
+                wait_for_receipt(w3, tx_hash, wallet_address, timeout=300),
+            )
+            if approve_receipt.status != 1:
+                raise Exception(f"USDT approval failed: {EXPLORER_URL}{approve_hash.hex()}")
+            if receipt.status != 1:
+                raise Exception(f"Game transaction reverted: {EXPLORER_URL}{receipt.transactionHash.hex()}")
             
             print(f"{Fore.GREEN}Successfully played Slots with {usdt_amount / (10**18)} USDT{Style.RESET_ALL}")
-            print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{tx_hash.hex()}{Style.RESET_ALL}")
+            print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{receipt.transactionHash.hex()}{Style.RESET_ALL}")
             return True
             
         except Exception as e:
@@ -355,6 +307,7 @@ async def play_slots(w3, private_key, wallet_address, max_attempts=3):
     print(f"{Fore.RED}Failed to play Slots after {max_attempts} attempts{Style.RESET_ALL}")
     return False
 
+@traced()
 async def play_coinflip(w3, private_key, wallet_address, max_attempts=3):
     """Play Coinflip game on Narwhal Finance"""
     for attempt in range(max_attempts):
@@ -364,9 +317,10 @@ async def play_coinflip(w3, private_key, wallet_address, max_attempts=3):
             
             print(f"{Fore.CYAN}Playing Coinflip with {usdt_amount / (10**18)} USDT...{Style.RESET_ALL}")
             
-            # First approve USDT spending
-            approve_success = await approve_usdt(w3, private_key, wallet_address, COINFLIP_ADDRESS, usdt_amount)
-            if not approve_success:
+            # First approve USDT spending. The approval is not waited for: the game transaction
+            # takes the next nonce, so it is always mined after the approval
+            approve_hash = await approve_usdt(w3, private_key, wallet_address, COINFLIP_ADDRESS, usdt_amount)
+            if not approve_hash:
                 print(f"{Fore.RED}Failed to approve USDT for Coinflip{Style.RESET_ALL}")
                 if attempt < max_attempts - 1:
                     continue
@@ -388,41 +342,39 @@ async def play_coinflip(w3, private_key, wallet_address, max_attempts=3):
                 "000000000000000000000000ffffffffffffffffffffffffffffffffffffffff"  # stopLoss
             )
             
-            # Get gas parameters
-            gas_params = await get_gas_params(w3)
-            
             # Create transaction
             transaction = {
                 "from": wallet_address,
                 "to": COINFLIP_ADDRESS,
                 "value": 27000001350000001,  # Exact value in wei required by contract
-                "nonce": w3.eth.get_transaction_count(wallet_address),
                 "chainId": CHAIN_ID,
                 "type": 2,
                 "data": payload,
-                **gas_params,
             }
             
-            # Estimate gas
-            try:
-                gas_estimate = w3.eth.estimate_gas(transaction)
-                transaction["gas"] = int(gas_estimate * 1.3)
-            except Exception as e:
-                print(f"{Fore.YELLOW}Error estimating gas: {str(e)}. Using default gas limit.{Style.RESET_ALL}")
-                transaction["gas"] = 300000
+            # Fetch fees; the gas limit is not estimated since the approval is not mined yet
+            pre = await preflight(w3, wallet_address)
+            transaction.update(fee_params(pre, 'eip1559_2x'))
+            transaction["gas"] = game_gas_limit(transaction)
             
             # Sign and send transaction
-            signed_txn = w3.eth.account.sign_transaction(transaction, private_key)
-            tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            tx_hash = await send_transaction(w3, transaction, private_key)
             
             print(f"{Fore.YELLOW}Coinflip_Play transaction sent: {tx_hash.hex()}{Style.RESET_ALL}")
             
-            # Wait for transaction confirmation
-            print(f"{Fore.YELLOW}Waiting for Coinflip_Play transaction confirmation...{Style.RESET_ALL}")
-            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+            # Wait for the approval and the game transaction together
+            print(f"{Fore.YELLOW}Waiting for approval and Coinflip_Play transaction confirmation...{Style.RESET_ALL}")
+            approve_receipt, receipt = await asyncio.gather(
+                wait_for_receipt(w3, approve_hash, wallet_address, timeout=300),
+                wait_for_receipt(w3, tx_hash, wallet_address, timeout=300),
+            )
+            if approve_receipt.status != 1:
+                raise Exception(f"USDT approval failed: {EXPLORER_URL}{approve_hash.hex()}")
+            if receipt.status != 1:
+                raise Exception(f"Game transaction reverted: {EXPLORER_URL}{receipt.transactionHash.hex()}")
             
             print(f"{Fore.GREEN}Successfully played Coinflip with {usdt_amount / (10**18)} USDT{Style.RESET_ALL}")
-            print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{tx_hash.hex()}{Style.RESET_ALL}")
+            print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{receipt.transactionHash.hex()}{Style.RESET_ALL}")
             return True
             
         except Exception as e:
@@ -436,6 +388,7 @@ async def play_coinflip(w3, private_key, wallet_address, max_attempts=3):
     print(f"{Fore.RED}Failed to play Coinflip after {max_attempts} attempts{Style.RESET_ALL}")
     return False
 
+@traced()
 async def play_dice(w3, private_key, wallet_address, max_attempts=3):
     """Play Dice game on Narwhal Finance"""
     for attempt in range(max_attempts):
@@ -448,9 +401,10 @@ async def play_dice(w3, private_key, wallet_address, max_attempts=3):
             
             print(f"{Fore.CYAN}Playing Dice with {usdt_amount / (10**18)} USDT and multiplier {multiplier}x...{Style.RESET_ALL}")
             
-            # First approve USDT spending
-            approve_success = await approve_usdt(w3, private_key, wallet_address, DICE_ADDRESS, usdt_amount)
-            if not approve_success:
+            # First approve USDT spending. The approval is not waited for: the game transaction
+            # takes the next nonce, so it is always mined after the approval
+            approve_hash = await approve_usdt(w3, private_key, wallet_address, DICE_ADDRESS, usdt_amount)
+            if not approve_hash:
                 print(f"{Fore.RED}Failed to approve USDT for Dice{Style.RESET_ALL}")
                 if attempt < max_attempts - 1:
                     continue
@@ -476,41 +430,39 @@ async def play_dice(w3, private_key, wallet_address, max_attempts=3):
                 "000000000000000000000000ffffffffffffffffffffffffffffffffffffffff"  # stopLoss
             )
             
-            # Get gas parameters
-            gas_params = await get_gas_params(w3)
-            
             # Create transaction
             transaction = {
                 "from": wallet_address,
                 "to": DICE_ADDRESS,
                 "value": 27000001350000001,  # Exact value in wei required by contract
-                "nonce": w3.eth.get_transaction_count(wallet_address),
                 "chainId": CHAIN_ID,
                 "type": 2,
                 "data": payload,
-                **gas_params,
             }
             
-            # Estimate gas
-            try:
-                gas_estimate = w3.eth.estimate_gas(transaction)
-                transaction["gas"] = int(gas_estimate * 1.3)
-            except Exception as e:
-                print(f"{Fore.YELLOW}Error estimating gas: {str(e)}. Using default gas limit.{Style.RESET_ALL}")
-                transaction["gas"] = 300000
+            # Fetch fees; the gas limit is not estimated since the approval is not mined yet
+            pre = await preflight(w3, wallet_address)
+            transaction.update(fee_params(pre, 'eip1559_2x'))
+            transaction["gas"] = game_gas_limit(transaction)
             
             # Sign and send transaction
-            signed_txn = w3.eth.account.sign_transaction(transaction, private_key)
-            tx_hash = w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            tx_hash = await send_transaction(w3, transaction, private_key)
             
             print(f"{Fore.YELLOW}Dice_Play transaction sent: {tx_hash.hex()}{Style.RESET_ALL}")
             
-            # Wait for transaction confirmation
-            print(f"{Fore.YELLOW}Waiting for Dice_Play transaction confirmation...{Style.RESET_ALL}")
-            receipt = w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+            # Wait for the approval and the game transaction together
+            print(f"{Fore.YELLOW}Waiting for approval and Dice_Play transaction confirmation...{Style.RESET_ALL}")
+            approve_receipt, receipt = await asyncio.gather(
+                wait_for_receipt(w3, approve_hash, wallet_address, timeout=300),
+                wait_for_receipt(w3, tx_hash, wallet_address, timeout=300),
+            )
+            if approve_receipt.status != 1:
+                raise Exception(f"USDT approval failed: {EXPLORER_URL}{approve_hash.hex()}")
+            if receipt.status != 1:
+                raise Exception(f"Game transaction reverted: {EXPLORER_URL}{receipt.transactionHash.hex()}")
             
             print(f"{Fore.GREEN}Successfully played Dice with {usdt_amount / (10**18)} USDT and multiplier {multiplier}x{Style.RESET_ALL}")
-            print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{tx_hash.hex()}{Style.RESET_ALL}")
+            print(f"{Fore.GREEN}View details at: {EXPLORER_URL}{receipt.transactionHash.hex()}{Style.RESET_ALL}")
             return True
             
         except Exception as e:
@@ -524,6 +476,7 @@ async def play_dice(w3, private_key, wallet_address, max_attempts=3):
     print(f"{Fore.RED}Failed to play Dice after {max_attempts} attempts{Style.RESET_ALL}")
     return False
 
+@traced()
 async def gamble(w3, private_key, wallet_address):
     """Play a random selection of games on Narwhal Finance"""
     try:
@@ -542,22 +495,27 @@ async def gamble(w3, private_key, wallet_address):
         # Shuffle the games for random selection
         random.shuffle(games)
         
-        # Play the selected number of games
-        for i in range(min(num_games, len(games))):
-            game_func, game_name = games[i]
-            
-            print(f"{Fore.CYAN}Playing game {i+1}/{num_games}: {game_name}{Style.RESET_ALL}")
-            success = await game_func(w3, private_key, wallet_address)
-            
-            if not success:
-                print(f"{Fore.RED}Failed to play {game_name}. Stopping gambling session.{Style.RESET_ALL}")
-                return False
-            
-            # Add a random pause between games if there are more games to play
-            if i < min(num_games, len(games)) - 1:
-                pause_time = random.randint(5, 15)
-                print(f"{Fore.CYAN}Pausing for {pause_time} seconds before next game...{Style.RESET_ALL}")
-                await asyncio.sleep(pause_time)
+        # Play the selected number of games at once; nonces come from the shared nonce manager,
+        # so all of their transactions can be in flight together
+        selected = games[:min(num_games, len(games))]
+        print(f"{Fore.CYAN}Playing {len(selected)} games: {', '.join(game_name for _, game_name in selected)}{Style.RESET_ALL}")
+        tasks = {asyncio.ensure_future(game_func(w3, private_key, wallet_address)): game_name for game_func, game_name in selected}
+        pending = set(tasks)
+        failed = []
+        try:
+            while pending and not failed:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                failed += [tasks[task] for task in done if task.exception() is not None or not task.result()]
+        finally:
+            # The first failure ends the session: games still waiting on confirmations are cancelled
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        if failed:
+            print(f"{Fore.RED}Failed to play {', '.join(failed)}. Stopping gambling session.{Style.RESET_ALL}")
+            return False
         
         print(f"{Fore.GREEN}Successfully completed gambling session!{Style.RESET_ALL}")
         return True
@@ -569,46 +527,38 @@ async def gamble(w3, private_key, wallet_address):
 async def get_token_balance(w3, token_address, wallet_address):
     """Get token balance for the account"""
     try:
-        contract = w3.eth.contract(address=Web3.to_checksum_address(token_address), abi=USDT_ABI)
-        balance = contract.functions.balanceOf(wallet_address).call()
+        balance = await USDT.balanceOf.call(w3, Web3.to_checksum_address(token_address), wallet_address)
         return balance, Decimal(str(balance)) / Decimal('1000000000000000000')  # Assuming 18 decimals
     except Exception as e:
         print(f"{Fore.RED}Error getting token balance: {str(e)}{Style.RESET_ALL}")
         return 0, Decimal('0')
 
-async def run():
+async def run(private_key=None, w3=None):
     print(f"{Fore.GREEN}{'=' * 60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'NARWHAL FINANCE BOT':^60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'=' * 60}{Style.RESET_ALL}")
 
-    # Connect to RPC
-    w3 = None
-    for rpc_url in RPC_URLS:
-        try:
-            w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 10}))
-            if w3.is_connected():
-                print(f"{Fore.GREEN}Successfully connected to RPC: {rpc_url}{Style.RESET_ALL}")
-                break
-        except Exception as e:
-            print(f"{Fore.RED}Cannot connect to {rpc_url}: {str(e)}{Style.RESET_ALL}")
+    # Connect to RPC unless a shared client was passed in
+    if w3 is None:
+        w3 = await get_web3(RPC_URLS)
     
     if not w3:
         print(f"{Fore.RED}Cannot connect to any RPC{Style.RESET_ALL}")
         return False
 
-    # Get private key from file
-    private_key = read_private_key('pvkey.txt')
+    # Get the first key from the key store unless one was passed in
+    if not private_key:
+        private_key = get_key_store().first()
     if not private_key:
         print(f"{Fore.RED}Cannot proceed without a valid private key{Style.RESET_ALL}")
         return False
 
-    # Create account from private key
-    account = Account.from_key(private_key)
-    wallet_address = account.address
+    # Look up the wallet address
+    wallet_address = get_key_store().address_of(private_key)
     print(f"{Fore.CYAN}Using account: {wallet_address}{Style.RESET_ALL}")
 
     # Get wallet balance
-    balance = w3.eth.get_balance(wallet_address)
+    balance = await w3.eth.get_balance(wallet_address)
     balance_eth = w3.from_wei(balance, 'ether')
     print(f"{Fore.BLUE}MON Balance: {balance_eth} MON{Style.RESET_ALL}")
 
@@ -629,10 +579,6 @@ async def run():
             print(f"{Fore.RED}Failed to get USDT from faucet. Cannot proceed without USDT.{Style.RESET_ALL}")
             return False
         
-        # Wait for faucet transaction to be confirmed
-        print(f"{Fore.CYAN}Waiting for faucet transaction to be confirmed...{Style.RESET_ALL}")
-        await asyncio.sleep(30)
-        
         # Check new USDT balance
         usdt_balance, usdt_balance_formatted = await get_token_balance(w3, USDT_ADDRESS, wallet_address)
         print(f"New USDT Balance: {usdt_balance_formatted} USDT")
@@ -648,4 +594,4 @@ async def run():
 
 # Run the bot when executed directly
 if __name__ == "__main__":
-    asyncio.run(run()) 
\ No newline at end of file
+    asyncio.run(run(os.environ.get('PRIVATE_KEY'))) 
\ No newline at end of file
@@ -3,17 +3,27 @@ import time
 import json
 import random
 import asyncio
+import os
+import sys
 from web3 import Web3
-from eth_account import Account
 from colorama import init, Fore, Style
 
+# Make the utils package importable when this script is run directly
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import ENDPOINT_CONFIG
+from utils.fee_oracle import get_fee_oracle, get_gas_params
+from utils.tx_manager import send_transaction, wait_for_receipt
+from utils.key_store import get_key_store
+from utils.rpc_client import get_web3
+from utils.tracing import traced
+
 # Initialize colorama
 init(autoreset=True)
 
 # URLs and contract addresses
-SEPOLIA_RPC_URL = "https://sepolia.drpc.org/"
+SEPOLIA_RPC_URL = ENDPOINT_CONFIG['sepolia_rpc_url']
 SEPOLIA_EXPLORER_URL = "https://sepolia.etherscan.io/tx/0x"
-MONAD_RPC_URLS = [
+MONAD_RPC_URLS = ENDPOINT_CONFIG['monad_rpc_urls'] or [
     "https://testnet-rpc.monad.xyz",
     "https://testnet-rpc.monorail.xyz",
     "https://monad-testnet.drpc.org"
@@ -24,6 +34,9 @@ MONAD_EXPLORER_URL = "https://testnet.monadexplorer.com/tx/0x"
 ORBITER_SEPOLIA_ADDRESS = "0xB5AADef97d81A77664fcc3f16Bfe328ad6CEc7ac"
 MONAD_SEPOLIA_TOKEN_ADDRESS = "0x836047a99e11F376522B447bffb6e3495Dd0637c"
 
+# keccak256("Transfer(address,address,uint256)")
+TRANSFER_TOPIC = "0xddf252ad1be2c89b69c2b068fc378daa952ba7f163c4a11628f55a4df523b3ef"
+
 # ERC20 ABI for checking token balances
 ERC20_ABI = [
     {
@@ -37,100 +50,49 @@ ERC20_ABI = [
     }
 ]
 
-# Read private key function
-def read_private_key(file_path='pvkey.txt'):
-    try:
-        # Try different encodings
-        encodings = ['utf-8', 'latin-1', 'cp1252', 'utf-16']
-        
-        for encoding in encodings:
-            try:
-                with open(file_path, 'r', encoding=encoding) as file:
-                    for line in file:
-                        # Skip comment lines
-                        if line.strip().startswith('#') or not line.strip():
-                            continue
-                        
-                        # Remove whitespace and validate format
-                        private_key = line.strip()
-                        
-                        # Remove 0x prefix if present
-                        if private_key.startswith('0x'):
-                            private_key = private_key[2:]
-                        
-                        # Check length
-                        if len(private_key) != 64:
-                            print(f"{Fore.YELLOW}Warning: Invalid private key (incorrect length){Style.RESET_ALL}")
-                            continue
-                        
-                        # Check if hex string
-                        try:
-                            int(private_key, 16)
-                            print(f"{Fore.GREEN}Found valid private key in file{Style.RESET_ALL}")
-                            return '0x' + private_key  # Add 0x prefix
-                        except ValueError:
-                            print(f"{Fore.YELLOW}Warning: Found non-hex characters in private key{Style.RESET_ALL}")
-                            continue
-                
-                # If no valid private key found in this encoding, try next
-            except UnicodeDecodeError:
-                continue  # Try next encoding
-    
-    except FileNotFoundError:
-        print(f"{Fore.RED}File {file_path} not found{Style.RESET_ALL}")
-    except Exception as e:
-        print(f"{Fore.RED}Error reading file: {str(e)}{Style.RESET_ALL}")
-    
-    print(f"{Fore.RED}No valid private key found in {file_path}{Style.RESET_ALL}")
-    return None
-
-async def get_gas_params(w3):
-    """Get EIP-1559 gas parameters from the network"""
-    try:
-        latest_block = await w3.eth.get_block("latest")
-        base_fee = latest_block["baseFeePerGas"]
-        max_priority_fee = await w3.eth.max_priority_fee
-        
-        # Multiply both fees by 1.5 for faster confirmation
-        max_priority_fee = int(max_priority_fee * 1.5)
-        max_fee = int((base_fee + max_priority_fee) * 1.5)
-        
-        return {
-            "maxFeePerGas": max_fee,
-            "maxPriorityFeePerGas": max_priority_fee,
-        }
-    except Exception as e:
-        print(f"{Fore.YELLOW}Error getting EIP-1559 gas params: {str(e)}. Using legacy gas pricing.{Style.RESET_ALL}")
-        return None
 
+@traced()
 async def wait_for_funds(monad_w3, wallet_address, initial_balance, max_wait_time=600):
     """Wait for funds to arrive in Monad network after bridging"""
+    # With a WebSocket feed, the token's Transfer logs to this wallet trigger a balance check right away
+    feed = monad_w3.provider.subscriptions
+    transfer_seen = asyncio.Event()
+    subscription = None
     try:
         # Create token contract instance
         token_contract = monad_w3.eth.contract(
             address=monad_w3.to_checksum_address(MONAD_SEPOLIA_TOKEN_ADDRESS),
             abi=ERC20_ABI
         )
+        if feed is not None:
+            subscription = await feed.subscribe('logs', {
+                'address': token_contract.address,
+                'topics': [TRANSFER_TOPIC, None, '0x' + wallet_address[2:].lower().rjust(64, '0')],
+            }, callback=lambda log: transfer_seen.set())
         
-        # Check balance every 10 seconds
-        max_attempts = max_wait_time // 10
+        # Check balance on every Transfer log, or every 10 seconds without a WebSocket feed
+        deadline = time.monotonic() + max_wait_time
         print(f"{Fore.CYAN}Waiting for funds to arrive in Monad (max wait time: {max_wait_time} seconds)...{Style.RESET_ALL}")
         
-        for attempt in range(max_attempts):
+        while time.monotonic() < deadline:
+            transfer_seen.clear()
             try:
-                current_balance = token_contract.functions.balanceOf(wallet_address).call()
+                current_balance = await token_contract.functions.balanceOf(wallet_address).call()
                 
                 if current_balance > initial_balance:
                     print(f"{Fore.GREEN}Funds arrived in Monad! New balance: {current_balance / 10**18} ETH{Style.RESET_ALL}")
                     return True
                 
-                seconds_remaining = (max_attempts - attempt) * 10
-                print(f"{Fore.BLUE}Still waiting for funds... (attempt {attempt + 1}/{max_attempts}, {seconds_remaining} seconds remaining){Style.RESET_ALL}")
-                await asyncio.sleep(10)  # Check every 10 seconds
+                seconds_remaining = int(deadline - time.monotonic())
+                print(f"{Fore.BLUE}Still waiting for funds... ({seconds_remaining} seconds remaining){Style.RESET_ALL}")
                 
             except Exception as e:
                 print(f"{Fore.RED}Error checking token balance: {str(e)}{Style.RESET_ALL}")
-                await asyncio.sleep(10)
+            
+            try:
+                await asyncio.wait_for(transfer_seen.wait(), min(10, max(deadline - time.monotonic(), 0)))
+            except asyncio.TimeoutError:
+                pass
                 
         print(f"{Fore.RED}Timeout waiting for funds after {max_wait_time} seconds{Style.RESET_ALL}")
         return False
@@ -138,7 +100,11 @@ async def wait_for_funds(monad_w3, wallet_address, initial_balance, max_wait_tim
     except Exception as e:
         print(f"{Fore.RED}Error in wait_for_funds: {str(e)}{Style.RESET_ALL}")
         return False
+    finally:
+        if subscription is not None:
+            await feed.unsubscribe(subscription)
 
+@traced()
 async def bridge_to_monad(sepolia_w3, monad_w3, private_key, wallet_address, max_attempts=3):
     """Bridge ETH from Sepolia to Monad via Orbiter"""
     for attempt in range(max_attempts):
@@ -151,20 +117,21 @@ async def bridge_to_monad(sepolia_w3, monad_w3, private_key, wallet_address, max
                 abi=ERC20_ABI
             )
             
-            initial_monad_balance = token_contract.functions.balanceOf(wallet_address).call()
+            initial_monad_balance = await token_contract.functions.balanceOf(wallet_address).call()
             print(f"{Fore.BLUE}Initial Monad-Sepolia token balance: {initial_monad_balance / 10**18} ETH{Style.RESET_ALL}")
             
             # Get current balance in Wei
-            balance_wei = sepolia_w3.eth.get_balance(wallet_address)
+            balance_wei = await sepolia_w3.eth.get_balance(wallet_address)
             balance_eth = sepolia_w3.from_wei(balance_wei, 'ether')
             print(f"{Fore.BLUE}Sepolia ETH balance: {balance_eth} ETH{Style.RESET_ALL}")
             
             # Get gas parameters for fee estimation
-            gas_params = await get_gas_params(sepolia_w3)
+            # Both fees are multiplied by 1.5 for faster confirmation
+            gas_params = await get_gas_params(sepolia_w3, 'eip1559_boost')
             
-            if not gas_params:
+            if not gas_params or 'maxFeePerGas' not in gas_params:
                 # Fallback to legacy gas pricing
-                gas_price = sepolia_w3.eth.gas_price
+                gas_price = (await get_fee_oracle(sepolia_w3).get_fee_data()).gas_price
                 gas_cost_wei = gas_price * 21000
                 transaction_type = 0
             else:
@@ -207,7 +174,6 @@ async def bridge_to_monad(sepolia_w3, monad_w3, private_key, wallet_address, max
                 'from': wallet_address,
                 'to': ORBITER_SEPOLIA_ADDRESS,
                 'value': amount_wei,
-                'nonce': sepolia_w3.eth.get_transaction_count(wallet_address),
                 'chainId': 11155111,  # Sepolia chain ID
                 'gas': 21000,  # Simple ETH transfer gas limit
             }
@@ -221,22 +187,21 @@ async def bridge_to_monad(sepolia_w3, monad_w3, private_key, wallet_address, max
                 })
             else:
                 transaction.update({
-                    'gasPrice': int(sepolia_w3.eth.gas_price * 1.1),  # Add 10% buffer
+                    'gasPrice': int(gas_price * 1.1),  # Add 10% buffer
                 })
             
             # Sign and send transaction
-            signed_txn = sepolia_w3.eth.account.sign_transaction(transaction, private_key)
-            tx_hash = sepolia_w3.eth.send_raw_transaction(signed_txn.raw_transaction)
+            tx_hash = await send_transaction(sepolia_w3, transaction, private_key)
             
             print(f"{Fore.YELLOW}Bridge transaction sent: {tx_hash.hex()}{Style.RESET_ALL}")
             
             # Wait for confirmation
             print(f"{Fore.YELLOW}Waiting for bridge transaction confirmation...{Style.RESET_ALL}")
-            receipt = sepolia_w3.eth.wait_for_transaction_receipt(tx_hash, timeout=300)
+            receipt = await wait_for_receipt(sepolia_w3, tx_hash, wallet_address, timeout=300)
             
             if receipt.status == 1:
                 print(f"{Fore.GREEN}Successfully initiated bridge to Monad!{Style.RESET_ALL}")
-                print(f"{Fore.GREEN}View details at: {SEPOLIA_EXPLORER_URL}{tx_hash.hex()}{Style.RESET_ALL}")
+                print(f"{Fore.GREEN}View details at: {SEPOLIA_EXPLORER_URL}{receipt.transactionHash.hex()}{Style.RESET_ALL}")
                 
                 # Wait for funds to arrive in Monad
                 wait_success = await wait_for_funds(monad_w3, wallet_address, initial_monad_balance)
@@ -264,54 +229,40 @@ async def bridge_to_monad(sepolia_w3, monad_w3, private_key, wallet_address, max
     print(f"{Fore.RED}Failed to bridge to Monad after {max_attempts} attempts{Style.RESET_ALL}")
     return False
 
-async def run():
+async def run(private_key=None, w3=None):
     print(f"{Fore.GREEN}{'=' * 60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'ORBITER BRIDGE BOT (SEPOLIA -> MONAD)':^60}{Style.RESET_ALL}")
     print(f"{Fore.GREEN}{'=' * 60}{Style.RESET_ALL}")
 
     # Connect to Sepolia RPC
-    sepolia_w3 = None
-    try:
-        print(f"{Fore.CYAN}Connecting to Sepolia network...{Style.RESET_ALL}")
-        sepolia_w3 = Web3(Web3.HTTPProvider(SEPOLIA_RPC_URL, request_kwargs={'timeout': 30}))
-        
-        if sepolia_w3.is_connected():
-            print(f"{Fore.GREEN}Successfully connected to Sepolia network{Style.RESET_ALL}")
-        else:
-            print(f"{Fore.RED}Cannot connect to Sepolia network{Style.RESET_ALL}")
-            return False
-    except Exception as e:
-        print(f"{Fore.RED}Error connecting to Sepolia: {str(e)}{Style.RESET_ALL}")
+    print(f"{Fore.CYAN}Connecting to Sepolia network...{Style.RESET_ALL}")
+    sepolia_w3 = await get_web3([SEPOLIA_RPC_URL])
+    if not sepolia_w3:
+        print(f"{Fore.RED}Cannot connect to Sepolia network{Style.RESET_ALL}")
         return False
 
-    # Connect to Monad RPC
-    monad_w3 = None
-    for rpc_url in MONAD_RPC_URLS:
-        try:
-            monad_w3 = Web3(Web3.HTTPProvider(rpc_url, request_kwargs={'timeout': 10}))
-            if monad_w3.is_connected():
-                print(f"{Fore.GREEN}Successfully connected to Monad network: {rpc_url}{Style.RESET_ALL}")
-                break
-        except Exception as e:
-            print(f"{Fore.RED}Cannot connect to Monad RPC {rpc_url}: {str(e)}{Style.RESET_ALL}")
+    # Connect to Monad RPC unless a shared client was passed in
+    monad_w3 = w3
+    if monad_w3 is None:
+        monad_w3 = await get_web3(MONAD_RPC_URLS)
     
     if not monad_w3:
         print(f"{Fore.RED}Cannot connect to any Monad RPC{Style.RESET_ALL}")
         return False
 
-    # Get private key from file
-    private_key = read_private_key('pvkey.txt')
+    # Get the first key from the key store unless one was passed in
+    if not private_key:
+        private_key = get_key_store().first()
     if not private_key:
         print(f"{Fore.RED}Cannot proceed without a valid private key{Style.RESET_ALL}")
         return False
 
-    # Create account from private key
-    account = Account.from_key(private_key)
-    wallet_address = account.address
+    # Look up the wallet address
+    wallet_address = get_key_store().address_of(private_key)
     print(f"{Fore.CYAN}Using account: {wallet_address}{Style.RESET_ALL}")
 
     # Check Sepolia balance
-    sepolia_balance = sepolia_w3.eth.get_balance(wallet_address)
+    sepolia_balance = await sepolia_w3.eth.get_balance(wallet_address)
     sepolia_balance_eth = sepolia_w3.from_wei(sepolia_balance, 'ether')
     print(f"{Fore.BLUE}Sepolia ETH Balance: {sepolia_balance_eth} ETH{Style.RESET_ALL}")
 
@@ -332,4 +283,4 @@ async def run():
 
 # Run the bot when executed directly
 if __name__ == "__main__":
-    asyncio.run(run()) 
\ No newline at end of file
+    asyncio.run(run(os.environ.get('PRIVATE_KEY'))) 
\ No newline at end of file
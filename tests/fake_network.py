@@ -0,0 +1,40 @@
+"""
+Helpers serving bench/fake_chain.py inside a test's event loop
+"""
+import contextlib
+from typing import Any, AsyncIterator, Dict, Tuple
+from eth_account import Account
+from web3 import AsyncWeb3
+from bench.fake_chain import GWEI, MONAD_CHAIN_ID, FakeNetwork
+from utils.endpoint_pool import EndpointPool
+from utils.rpc_client import PooledHTTPProvider, close_session, get_session
+
+KEY = '0x' + '42' * 32
+ADDRESS = Account.from_key(KEY).address
+RECIPIENT = '0x' + '77' * 20
+
+@contextlib.asynccontextmanager
+async def serve(block_time: float = 0, **options) -> AsyncIterator[Tuple[FakeNetwork, str]]:
+    """A FakeNetwork on a free local port, and its RPC URL; it mines on every transaction unless given a block_time"""
+    network = FakeNetwork(block_time=block_time, **options)
+    runner = await network.start('127.0.0.1', 0)
+    host, port = runner.addresses[0][:2]
+    try:
+        yield network, f"http://{host}:{port}"
+    finally:
+        await close_session()
+        await runner.cleanup()
+
+async def connect(url: str) -> AsyncWeb3:
+    """Client over one probed endpoint, without the background probes and WebSocket feed of get_web3()"""
+    pool = EndpointPool([url], get_session)
+    await pool.probe_all()
+    return AsyncWeb3(PooledHTTPProvider(pool))
+
+def transfer(tip: int = 2 * GWEI, sender: str = ADDRESS) -> Dict[str, Any]:
+    """A 1 wei transfer paying `tip`, ready for send_transaction with KEY"""
+    return {
+        'from': sender, 'to': RECIPIENT, 'value': 1, 'gas': 21000,
+        'maxFeePerGas': 100 * GWEI + tip, 'maxPriorityFeePerGas': tip,
+        'chainId': MONAD_CHAIN_ID, 'type': 2,
+    }
@@ -0,0 +1,73 @@
+import asyncio
+import pytest
+from eth_abi import encode
+from web3 import Web3
+from script.nad_domains import NAD, NAD_ABI, NAD_CONTRACT_ADDRESS
+from script.narwhal_finance import USDT, USDT_ADDRESS
+from utils.abi_codec import ContractCodec
+from tests.fake_network import ADDRESS, RECIPIENT, connect, serve
+
+ORDER_ABI = [
+    {
+        'type': 'function', 'name': 'fill', 'stateMutability': 'nonpayable',
+        'inputs': [
+            {'name': 'orders', 'type': 'tuple[]', 'components': [
+                {'name': 'maker', 'type': 'address'},
+                {'name': 'amounts', 'type': 'uint256[2]'},
+                {'name': 'salt', 'type': 'bytes32'},
+            ]},
+            {'name': 'signatures', 'type': 'bytes[]'},
+        ],
+        'outputs': [
+            {'name': 'filled', 'type': 'uint256[]'},
+            {'name': 'receipt', 'type': 'tuple', 'components': [
+                {'name': 'taker', 'type': 'address'},
+                {'name': 'memo', 'type': 'string'},
+            ]},
+        ],
+    },
+    {
+        'type': 'function', 'name': 'paused', 'stateMutability': 'view',
+        'inputs': [], 'outputs': [{'name': '', 'type': 'bool'}],
+    },
+    {'type': 'event', 'name': 'Filled', 'inputs': [], 'anonymous': False},
+]
+ORDERS = [(ADDRESS, [1, 2], '0x' + '01' * 32), (RECIPIENT, [3, 4], '0x' + '02' * 32)]
+SIGNATURES = ['0x' + '11' * 65, b'\x22' * 65]
+
+def test_encoding_matches_web3():
+    codec = ContractCodec(ORDER_ABI)
+    contract = Web3().eth.contract(abi=ORDER_ABI)
+    assert codec.fill.signature == 'fill((address,uint256[2],bytes32)[],bytes[])'
+    assert codec.fill.encode(ORDERS, SIGNATURES) == contract.encode_abi('fill', args=[ORDERS, SIGNATURES])
+    assert codec.paused.encode() == contract.encode_abi('paused')
+    assert codec.selectors() == [codec.fill.selector_hex, codec.paused.selector_hex]
+
+def test_encoding_of_the_bots_calls_matches_web3():
+    register = ['monadtest', ADDRESS, True, '0x' + '00' * 20, '0x' + '00' * 32, '0x' + '00' * 32, 12345, 1900000000]
+    signature = '0x' + '11' * 65
+    nad = Web3().eth.contract(address=NAD_CONTRACT_ADDRESS, abi=NAD_ABI)
+    assert NAD.registerWithSignature.encode(register, signature) == nad.encode_abi('registerWithSignature', args=[register, signature])
+
+def test_return_data_round_trips():
+    codec = ContractCodec(ORDER_ABI)
+    data = encode(codec.fill.output_types, [[5, 6], (RECIPIENT, 'gm')])
+    filled, receipt = codec.fill.decode(data)
+    assert filled == (5, 6)
+    assert receipt == (RECIPIENT.lower(), 'gm')
+    assert codec.paused.decode(encode(['bool'], [True])) is True  # A single value is unwrapped
+
+def test_misuse_is_reported():
+    codec = ContractCodec(ORDER_ABI)
+    with pytest.raises(TypeError):
+        codec.fill.encode(ORDERS)
+    with pytest.raises(AttributeError):
+        codec.Filled
+
+def test_view_call_is_decoded():
+    async def scenario():
+        async with serve() as (network, url):
+            w3 = await connect(url)
+            assert await USDT.balanceOf.call(w3, USDT_ADDRESS, ADDRESS) == 0
+            assert network.stats['eth_call'] == 1
+    asyncio.run(scenario())
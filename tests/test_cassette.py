@@ -0,0 +1,49 @@
+import asyncio
+import multiprocessing
+import time
+from utils.cassette import Cassette, part_paths
+
+def record_in_child(path: str, value: str):
+    cassette = Cassette(path, 'record')
+    cassette.record('rpc', 'monad', 'eth_getBalance', [value], value, 0.001)
+    cassette.close()
+
+def replay_all(path: str, count: int):
+    cassette = Cassette(path, 'replay')
+    async def scenario():
+        return [await cassette.replay('rpc', 'monad', 'eth_getBalance', ['unseen']) for _ in range(count)]
+    return asyncio.run(scenario())
+
+def test_each_process_records_its_own_file_and_replay_merges_them(tmp_path, monkeypatch):
+    monkeypatch.delenv('CASSETTE_RECORDER', raising=False)
+    path = str(tmp_path / 'cassette.jsonl.gz')
+    owner = Cassette(path, 'record')
+    owner.record('rpc', 'monad', 'eth_getBalance', ['first'], 'first', 0.001)
+    time.sleep(0.01)
+    child = multiprocessing.get_context('spawn').Process(target=record_in_child, args=(path, 'second'))
+    child.start()
+    child.join()
+    assert child.exitcode == 0
+    time.sleep(0.01)
+    owner.record('rpc', 'monad', 'eth_getBalance', ['third'], 'third', 0.001)
+    owner.close()
+
+    assert part_paths(path) == [f"{path}.{child.pid}"]
+    assert replay_all(path, 3) == ['first', 'second', 'third']
+
+def test_new_recording_replaces_the_previous_session(tmp_path, monkeypatch):
+    monkeypatch.delenv('CASSETTE_RECORDER', raising=False)
+    path = str(tmp_path / 'cassette.jsonl.gz')
+    old = Cassette(path, 'record')
+    old.record('rpc', 'monad', 'eth_getBalance', ['old'], 'old', 0.001)
+    old.close()
+    record_in_child(path, 'old part')  # Still marked as recording, so this writes <path>.<pid>
+    assert len(part_paths(path)) == 1
+
+    monkeypatch.delenv('CASSETTE_RECORDER')
+    new = Cassette(path, 'record')
+    new.record('rpc', 'monad', 'eth_getBalance', ['new'], 'new', 0.001)
+    new.close()
+
+    assert part_paths(path) == []
+    assert replay_all(path, 2) == ['new', 'new']
@@ -0,0 +1,51 @@
+import pytest
+import utils.metrics
+from utils.fee_controller import FeeController
+from utils.metrics import Metrics
+
+GWEI = 10**9
+
+@pytest.fixture
+def metrics(monkeypatch):
+    metrics = Metrics()
+    monkeypatch.setattr(utils.metrics, '_metrics', metrics)
+    return metrics
+
+def history(*tips_per_block):
+    return {
+        'gasUsedRatio': [0.5] * len(tips_per_block),
+        'reward': [[hex(tip) for tip in tips] for tips in tips_per_block],
+    }
+
+def test_chosen_tip_and_inclusion_latency_per_tip_are_exported(metrics):
+    controller = FeeController(percentiles=[25, 50, 75], target_blocks=2)
+    controller.update_history(history([1 * GWEI, 2 * GWEI, 3 * GWEI], [1 * GWEI, 2 * GWEI, 5 * GWEI]))
+    assert controller.priority_fee(None) == 2 * GWEI
+    controller.record_inclusion(2 * GWEI, 1)
+    controller.record_inclusion(4 * GWEI, 7)  # Covers p75's 4 gwei median
+
+    text = metrics.prometheus()
+    assert f'monad_bot_priority_fee_wei{{percentile="50"}} {2 * GWEI}' in text
+    assert 'monad_bot_inclusion_blocks_bucket{percentile="50",le="1"} 1' in text
+    assert 'monad_bot_inclusion_blocks_bucket{percentile="75",le="5"} 0' in text
+    assert 'monad_bot_inclusion_blocks_bucket{percentile="75",le="8"} 1' in text
+    assert 'monad_bot_inclusion_blocks_sum{percentile="75"} 7' in text
+    assert 'monad_bot_inclusion_blocks_count{percentile="75"} 1' in text
+
+def test_controller_moves_up_after_slow_inclusions(metrics):
+    controller = FeeController(percentiles=[25, 50, 75], target_blocks=2)
+    controller.update_history(history([1 * GWEI, 2 * GWEI, 3 * GWEI]))
+    controller.record_inclusion(2 * GWEI, 5)
+    assert controller.level == 2
+    assert controller.priority_fee(None) == 3 * GWEI
+    assert metrics.priority_fee == (75, 3 * GWEI)
+
+def test_shard_fee_cycles_merge_into_the_parent(metrics):
+    shard = Metrics()
+    shard.inclusion(50, 2)
+    shard.inclusion(50, 3)
+    shard.fee_level(50, 2 * GWEI)
+    metrics.merge_fees(shard.take_fee_cycle())
+    metrics.merge_fees(shard.take_fee_cycle())  # Nothing new since the last take
+    assert metrics.inclusions[50].count == 2 and metrics.inclusions[50].total == 5
+    assert metrics.priority_fee == (50, 2 * GWEI)
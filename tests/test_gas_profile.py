@@ -0,0 +1,75 @@
+import asyncio
+import time
+from config import GAS_PROFILE_CONFIG
+from utils import gas_profile
+from utils.gas_profile import GasProfile, estimate_gas, profile_key
+from tests.fake_network import ADDRESS, RECIPIENT, connect, serve
+
+CALL = {'chainId': 10143, 'from': ADDRESS, 'to': RECIPIENT, 'data': '0xa9059cbb' + '00' * 64, 'gas': 100_000}
+
+def receipt(gas_used: int, status: int = 1):
+    return {'status': status, 'gasUsed': gas_used}
+
+def test_calls_are_keyed_by_target_and_selector():
+    assert profile_key(CALL) == f"10143:{RECIPIENT}:0xa9059cbb"
+    assert profile_key(dict(CALL, data='0xa9059cbb' + '11' * 64)) == profile_key(CALL)
+    assert profile_key(dict(CALL, data='0x095ea7b3')) != profile_key(CALL)
+    assert profile_key(dict(CALL, to=None)).startswith('10143:create:')
+
+def test_limit_is_learned_after_min_samples(tmp_path):
+    profile = GasProfile(str(tmp_path / 'gas_profile.json'))
+    for gas_used in range(50_000, 50_000 + GAS_PROFILE_CONFIG['min_samples'] - 1):
+        profile.record_receipt(CALL, receipt(gas_used))
+    assert profile.learned_limit(CALL) is None
+    profile.record_receipt(CALL, receipt(60_000))
+    assert profile.learned_limit(CALL) == int(60_000 * GAS_PROFILE_CONFIG['margin'])
+    profile.record_receipt(CALL, receipt(90_000, status=0))  # Reverted well below the limit: ignored
+    assert profile.learned_limit(CALL) == int(60_000 * GAS_PROFILE_CONFIG['margin'])
+
+def test_running_out_of_gas_discards_the_samples(tmp_path):
+    profile = GasProfile(str(tmp_path / 'gas_profile.json'))
+    for _ in range(GAS_PROFILE_CONFIG['min_samples']):
+        profile.record_receipt(CALL, receipt(50_000))
+    profile.record_receipt(CALL, receipt(99_000, status=0))
+    assert profile.learned_limit(CALL) is None
+
+def test_estimate_needs_a_recent_node_estimate(tmp_path, monkeypatch):
+    profile = GasProfile(str(tmp_path / 'gas_profile.json'))
+    for _ in range(GAS_PROFILE_CONFIG['min_samples']):
+        profile.record_receipt(CALL, receipt(50_000))
+    assert profile.estimate(CALL) is None
+    profile.record_estimate(CALL, 55_000)
+    assert profile.estimate(CALL) == int(50_000 * GAS_PROFILE_CONFIG['margin'])
+    later = time.time() + GAS_PROFILE_CONFIG['reestimate'] + 1
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert profile.estimate(CALL) is None
+
+def test_estimate_far_above_the_learned_limit_relearns(tmp_path):
+    profile = GasProfile(str(tmp_path / 'gas_profile.json'))
+    for _ in range(GAS_PROFILE_CONFIG['min_samples']):
+        profile.record_receipt(CALL, receipt(50_000))
+    profile.record_estimate(CALL, 80_000)  # The contract was upgraded
+    assert profile.learned_limit(CALL) is None
+
+def test_profile_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'gas_profile.json')
+    profile = GasProfile(path)
+    for _ in range(GAS_PROFILE_CONFIG['min_samples']):
+        profile.record_receipt(CALL, receipt(50_000))
+    profile.save()
+    assert GasProfile(path).learned_limit(CALL) == int(50_000 * GAS_PROFILE_CONFIG['margin'])
+
+def test_node_is_only_asked_until_a_limit_is_learned(tmp_path, monkeypatch):
+    profile = GasProfile(str(tmp_path / 'gas_profile.json'))
+    monkeypatch.setattr(gas_profile, '_profile', profile)
+    transfer = {'chainId': 10143, 'from': ADDRESS, 'to': RECIPIENT, 'value': 1}
+
+    async def scenario():
+        async with serve() as (network, url):
+            w3 = await connect(url)
+            assert await estimate_gas(w3, transfer) == 21000
+            for _ in range(GAS_PROFILE_CONFIG['min_samples']):
+                profile.record_receipt(transfer, receipt(21000))
+            assert await estimate_gas(w3, transfer) == int(21000 * GAS_PROFILE_CONFIG['margin'])
+            assert network.stats['eth_estimateGas'] == 1
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+import pytest
+from eth_account import Account
+from config import KEY_STORE_CONFIG
+import utils.key_store
+from utils.key_store import KeyStore
+
+KEYS = ['0x' + f"{index + 1:064x}" for index in range(3)]
+OTHER_KEY = '0x' + '99' * 32
+
+@pytest.fixture
+def index_path(tmp_path, monkeypatch):
+    path = tmp_path / 'pvkey.index.json'
+    monkeypatch.setitem(KEY_STORE_CONFIG, 'index_path', str(path))
+    return path
+
+def write_keys(tmp_path, lines):
+    path = tmp_path / 'pvkey.txt'
+    path.write_text('\n'.join(lines) + '\n')
+    return str(path)
+
+def test_duplicates_are_skipped_with_a_warning_naming_their_line(tmp_path, index_path, monkeypatch):
+    warnings = []
+    monkeypatch.setattr(utils.key_store.Logger, 'warning', warnings.append)
+    store = KeyStore(write_keys(tmp_path, [KEYS[0], '# comment', KEYS[1], KEYS[0][2:].upper(), 'not a key', KEYS[2]]))
+    assert list(store) == KEYS
+    assert any('line 4' in warning and 'line 1' in warning for warning in warnings)
+    assert any('line 5' in warning and 'not a valid private key' in warning for warning in warnings)
+
+def test_addresses_match_eth_account_and_derived_ones_are_cached(tmp_path, index_path, monkeypatch):
+    store = KeyStore(write_keys(tmp_path, KEYS))
+    assert [address for _, address in store.items()] == [Account.from_key(key).address for key in KEYS]
+    assert store.address_of(KEYS[1]) == Account.from_key(KEYS[1]).address
+    assert store.index_of(OTHER_KEY) is None
+
+    calls = []
+    derive = utils.key_store.derive_addresses
+    monkeypatch.setattr(utils.key_store, 'derive_addresses', lambda packed: calls.append(packed) or derive(packed))
+    assert store.address_of(OTHER_KEY) == Account.from_key(OTHER_KEY).address
+    assert store.address_of(OTHER_KEY[2:]) == Account.from_key(OTHER_KEY).address
+    assert len(calls) == 1
+    with pytest.raises(ValueError):
+        store.address_of('0x1234')
+
+def test_sidecar_index_is_reused_and_ignores_keys_it_does_not_know(tmp_path, index_path, monkeypatch):
+    KeyStore(write_keys(tmp_path, KEYS[:2]))
+    assert index_path.exists()
+
+    derived = []
+    derive = utils.key_store.derive_addresses
+    monkeypatch.setattr(utils.key_store, 'derive_addresses', lambda packed: derived.append(len(packed) // 32) or derive(packed))
+    store = KeyStore(write_keys(tmp_path, KEYS))
+    assert derived == [1]  # Only the key added since the index was written
+    assert store.address(2) == Account.from_key(KEYS[2]).address
+
+    index_path.write_text('{not json')
+    store = KeyStore(write_keys(tmp_path, KEYS))
+    assert derived == [1, 3]  # An unreadable index means deriving everything again
+    assert [address for _, address in store.items()] == [Account.from_key(key).address for key in KEYS]
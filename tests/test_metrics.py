@@ -0,0 +1,20 @@
+import asyncio
+from utils.metrics import get_metrics
+from utils.rpc_client import http_get_json
+from tests.fake_network import connect, serve
+
+def test_traffic_counts_request_bodies_and_answers():
+    async def scenario():
+        async with serve() as (network, url):
+            w3 = await connect(url)
+            get_metrics().take_cycle()
+            await w3.eth.block_number
+            status, _ = await http_get_json(f"{url}/stats", params={'verbose': 'x' * 500})
+            assert status == 200
+            cycle = get_metrics().take_cycle()
+            rpc = cycle[(url, 'eth_blockNumber')]
+            assert rpc.requests == 1 and rpc.sent_bytes > 0 and rpc.received_bytes > 0
+            # A GET has no body however long its URL
+            http = cycle[(url, '/stats')]
+            assert http.requests == 1 and http.sent_bytes == 0 and http.received_bytes > 0
+    asyncio.run(scenario())
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from bench.fake_chain import ETHER, USDT_ADDRESS
+from utils.multicall import Call, MulticallReader, encode_call
+from tests.fake_network import connect, serve
+
+WALLETS = ['0x' + f"{index + 1:040x}" for index in range(25)]
+
+def balance_calls(reader: MulticallReader, addresses):
+    return [Call(reader.address, encode_call('getEthBalance(address)', ['address'], [address]), ('uint256',)) for address in addresses]
+
+def test_calls_are_chunked_at_chunk_size():
+    async def scenario():
+        async with serve(balance=7 * ETHER) as (network, url):
+            reader = MulticallReader(await connect(url), chunk_size=10)
+            balances = await reader.eth_balances(WALLETS)
+            assert balances == {address: 7 * ETHER for address in WALLETS}
+            assert network.stats['eth_call'] == 3  # 10 + 10 + 5
+    asyncio.run(scenario())
+
+def test_reverted_chunk_is_retried_in_halves():
+    async def scenario():
+        # 16 balance reads need about 88k gas, 8 about 57k: the full chunk runs out of gas, each half fits
+        async with serve(balance=ETHER, block_gas_limit=60_000) as (network, url):
+            reader = MulticallReader(await connect(url), chunk_size=16)
+            balances = await reader.eth_balances(WALLETS[:16])
+            assert balances == {address: ETHER for address in WALLETS[:16]}
+            assert network.stats['eth_call'] == 3  # The chunk, then its two halves
+    asyncio.run(scenario())
+
+def test_failing_call_fails_alone():
+    async def scenario():
+        async with serve() as (network, url):
+            reader = MulticallReader(await connect(url))
+            calls = balance_calls(reader, WALLETS[:3])
+            calls.insert(1, Call(USDT_ADDRESS, encode_call('noSuchFunction()'), ('uint256',)))
+            results = await reader.aggregate(calls)
+            assert [result.success for result in results] == [True, False, True, True]
+            assert results[1].value is None
+            assert network.stats['eth_call'] == 1
+    asyncio.run(scenario())
+
+def test_empty_result_means_no_multicall_contract():
+    async def scenario():
+        async with serve() as (network, url):
+            reader = MulticallReader(await connect(url), address=WALLETS[0])
+            with pytest.raises(ValueError, match="No Multicall3 contract"):
+                await reader.eth_balances(WALLETS[:2])
+    asyncio.run(scenario())
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from bench.fake_chain import GWEI
+from utils.nonce_manager import NonceManager, get_nonce_manager
+from utils.tx_manager import send_transaction
+from tests.fake_network import ADDRESS, KEY, connect, serve, transfer
+
+def test_reset_waits_for_an_allocation_in_progress():
+    async def scenario():
+        # Every answer takes 0.2s, so the allocation below is still syncing when reset() is called
+        async with serve(latency=0.2) as (network, url):
+            manager = NonceManager(await connect(url), ADDRESS)
+            allocation = asyncio.ensure_future(manager.allocate())
+            await asyncio.sleep(0.05)
+            reset = asyncio.ensure_future(manager.reset())
+            await asyncio.sleep(0)
+            assert not reset.done()
+            assert await allocation == 0
+            await reset
+            assert manager.next_nonce is None  # The reset applies after the allocation, not underneath it
+    asyncio.run(scenario())
+
+def test_allocations_are_consecutive_after_one_sync():
+    async def scenario():
+        async with serve() as (network, url):
+            manager = NonceManager(await connect(url), ADDRESS)
+            assert await asyncio.gather(*(manager.allocate() for _ in range(3))) == [0, 1, 2]
+            assert network.stats['eth_getTransactionCount'] == 1
+    asyncio.run(scenario())
+
+def test_release_returns_the_last_nonce_and_resyncs_on_a_gap():
+    async def scenario():
+        async with serve() as (network, url):
+            manager = NonceManager(await connect(url), ADDRESS)
+            first, second = await manager.allocate(), await manager.allocate()
+            await manager.release(second)
+            assert await manager.allocate() == second
+            await manager.release(first)  # Nonce 1 is still out, so nothing can be handed back
+            assert manager.next_nonce is None
+    asyncio.run(scenario())
+
+def test_send_resyncs_after_nonce_too_low():
+    async def scenario():
+        async with serve() as (network, url):
+            w3 = await connect(url)
+            await send_transaction(w3, transfer(), KEY)
+            manager = get_nonce_manager(w3, ADDRESS)
+            manager.next_nonce = 0  # Stale: nonce 0 is already mined
+            tx_hash = await send_transaction(w3, dict(transfer(), value=2), KEY)
+            assert (await w3.eth.get_transaction(tx_hash)).nonce == 1
+            assert manager.next_nonce == 2
+    asyncio.run(scenario())
+
+def test_refused_transaction_gives_its_nonce_back():
+    async def scenario():
+        async with serve() as (network, url):
+            w3 = await connect(url)
+            refused = dict(transfer(), maxFeePerGas=GWEI, maxPriorityFeePerGas=GWEI)  # Below the 50 gwei base fee
+            with pytest.raises(Exception, match="less than block base fee"):
+                await send_transaction(w3, refused, KEY)
+            tx_hash = await send_transaction(w3, transfer(), KEY)
+            assert (await w3.eth.get_transaction(tx_hash)).nonce == 0
+    asyncio.run(scenario())
@@ -0,0 +1,24 @@
+import asyncio
+import os
+import time
+from utils.process_supervisor import TIMEOUT_EXIT_CODE, ProcessSupervisor
+
+def write_script(directory, body: str) -> str:
+    path = os.path.join(directory, 'child.py')
+    with open(path, 'w') as f:
+        f.write(body)
+    return path
+
+def test_exit_code_is_returned(tmp_path):
+    script = write_script(tmp_path, "print('done')\nraise SystemExit(3)\n")
+    supervisor = ProcessSupervisor(timeout=30)
+    assert asyncio.run(supervisor.run(script)) == 3
+    assert supervisor.exit_codes == [('child.py', 3)]
+
+def test_child_that_closes_its_output_is_killed_at_the_timeout(tmp_path):
+    script = write_script(tmp_path, "import os, time\nos.close(1)\nos.close(2)\ntime.sleep(60)\n")
+    supervisor = ProcessSupervisor(timeout=1)
+    started = time.monotonic()
+    assert asyncio.run(supervisor.run(script)) == TIMEOUT_EXIT_CODE
+    assert time.monotonic() - started < 10
+    assert supervisor.running == {}
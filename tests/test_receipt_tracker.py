@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from web3.exceptions import TimeExhausted
+from bench.fake_chain import GWEI
+from utils.receipt_tracker import ReceiptTracker, tx_key
+from utils.tx_manager import send_transaction
+from tests.fake_network import KEY, connect, serve, transfer
+
+class SlowFeed:
+    """Subscription feed whose unsubscribe blocks until released"""
+
+    def __init__(self):
+        self.subscribed = 0
+        self.unsubscribing = asyncio.Event()
+        self.released = asyncio.Event()
+
+    async def subscribe(self, kind, *args, callback):
+        self.subscribed += 1
+        return kind, callback
+
+    async def unsubscribe(self, handle):
+        self.unsubscribing.set()
+        await self.released.wait()
+
+def test_waiter_arriving_while_the_last_run_unsubscribes_is_watched():
+    async def scenario():
+        async with serve() as (network, url):
+            w3 = await connect(url)
+            feed = w3.provider.subscriptions = SlowFeed()
+            tracker = ReceiptTracker(w3, poll_interval=0.05)
+            await tracker.wait(await send_transaction(w3, transfer(), KEY), timeout=5)
+            await asyncio.wait_for(feed.unsubscribing.wait(), 5)  # The run found nothing pending and is stopping
+
+            tx_hash = await send_transaction(w3, transfer(), KEY)
+            receipt = await tracker.wait(tx_hash, timeout=5)
+            assert tx_key(receipt.transactionHash) == tx_key(tx_hash)
+            assert feed.subscribed == 2
+            feed.released.set()
+    asyncio.run(scenario())
+
+def test_receipt_of_a_mined_transaction():
+    async def scenario():
+        async with serve() as (network, url):
+            w3 = await connect(url)
+            tracker = ReceiptTracker(w3, poll_interval=0.05)
+            tx_hash = await send_transaction(w3, transfer(), KEY)
+            receipt = await tracker.wait(tx_hash, timeout=5)
+            assert tx_key(receipt.transactionHash) == tx_key(tx_hash)
+            assert receipt.status == 1
+            assert tracker.pending == {} and tracker.waiters == {}
+    asyncio.run(scenario())
+
+def test_hash_stays_watched_until_its_last_waiter_leaves():
+    async def scenario():
+        # Tips below min_tip stay in the mempool until the test lowers it
+        async with serve(min_tip=10 * GWEI) as (network, url):
+            w3 = await connect(url)
+            tracker = ReceiptTracker(w3, poll_interval=0.05)
+            tx_hash = await send_transaction(w3, transfer(), KEY)
+            patient = asyncio.ensure_future(tracker.wait(tx_hash, timeout=5))
+            with pytest.raises(TimeExhausted):
+                await tracker.wait(tx_hash, timeout=0.2)
+            assert tracker.waiters == {tx_key(tx_hash): 1}
+
+            network.monad.min_tip = 0
+            network.monad.mine()
+            receipt = await patient
+            assert tx_key(receipt.transactionHash) == tx_key(tx_hash)
+            assert tracker.pending == {} and tracker.waiters == {}
+    asyncio.run(scenario())
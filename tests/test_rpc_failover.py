@@ -0,0 +1,92 @@
+import asyncio
+import json
+import aiohttp
+import pytest
+from aiohttp import web
+from web3 import AsyncWeb3
+from config import RPC_CONFIG
+from utils.endpoint_pool import EndpointPool
+from utils.rpc_client import PooledHTTPProvider, get_session
+from tests.fake_network import serve
+
+WALLET = '0x' + '22' * 20
+
+async def start_garbler(upstream: str) -> web.AppRunner:
+    """Endpoint answering health probes normally and everything else with half of the upstream's answer"""
+    session = aiohttp.ClientSession()
+
+    async def handle(request: web.Request) -> web.Response:
+        body = await request.read()
+        async with session.post(upstream, data=body, headers={'Content-Type': 'application/json'}) as response:
+            answer = await response.read()
+        payload = json.loads(body)
+        if not isinstance(payload, list) and payload.get('method') in ('eth_chainId', 'eth_blockNumber'):
+            return web.Response(body=answer, content_type='application/json')
+        return web.Response(body=answer[:len(answer) // 2], content_type='application/json')
+
+    app = web.Application()
+    app.router.add_post('/', handle)
+    app.on_cleanup.append(lambda app: session.close())
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+    return runner
+
+async def garbled_first(url: str, garbler: web.AppRunner) -> AsyncWeb3:
+    host, port = garbler.addresses[0][:2]
+    pool = EndpointPool([f"http://{host}:{port}", url], get_session)
+    await pool.probe_all()
+    # Rank the garbling endpoint first
+    pool.endpoints[0].latency, pool.endpoints[1].latency = 0.001, 0.5
+    return AsyncWeb3(PooledHTTPProvider(pool))
+
+def test_garbled_answer_fails_over_and_counts_against_endpoint():
+    async def scenario():
+        async with serve(balance=3 * 10**18) as (network, url):
+            garbler = await start_garbler(url)
+            try:
+                w3 = await garbled_first(url, garbler)
+                garbled = w3.provider.pool.endpoints[0]
+                failures = garbled.failures
+                assert await w3.eth.get_balance(WALLET) == 3 * 10**18
+                assert garbled.failures == failures + 1
+                assert garbled.error_rate > 0
+                assert not garbled.healthy
+            finally:
+                await garbler.cleanup()
+    asyncio.run(scenario())
+
+def test_garbled_batch_answer_fails_over():
+    async def scenario():
+        async with serve(balance=3 * 10**18) as (network, url):
+            garbler = await start_garbler(url)
+            try:
+                w3 = await garbled_first(url, garbler)
+                responses = await w3.provider.make_batch_request([('eth_getBalance', [WALLET, 'latest']), ('eth_chainId', [])])
+                assert [response['result'] for response in responses] == [hex(3 * 10**18), hex(10143)]
+                assert not w3.provider.pool.endpoints[0].healthy
+            finally:
+                await garbler.cleanup()
+    asyncio.run(scenario())
+
+def test_hedged_race_ignores_garbled_answer(monkeypatch):
+    monkeypatch.setitem(RPC_CONFIG, 'hedge', True)
+
+    async def scenario():
+        async with serve(balance=3 * 10**18) as (network, url):
+            garbler = await start_garbler(url)
+            try:
+                w3 = await garbled_first(url, garbler)
+                assert await w3.eth.get_balance(WALLET) == 3 * 10**18
+            finally:
+                await garbler.cleanup()
+    asyncio.run(scenario())
+
+def test_empty_pool_raises_connection_error():
+    async def scenario():
+        provider = PooledHTTPProvider(EndpointPool([], get_session))
+        with pytest.raises(ConnectionError, match="no healthy RPC endpoint"):
+            await provider.make_request('eth_blockNumber', [])
+        with pytest.raises(ConnectionError, match="no healthy RPC endpoint"):
+            await provider._race([], 'eth_blockNumber', b'{}', 0)
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import asyncio
+import multiprocessing
+import pytest
+from eth_account import Account
+from config import KEY_STORE_CONFIG
+import utils.key_store
+from utils.key_store import KeyStore
+from utils.signer import TransactionSigner
+from tests.fake_network import transfer
+
+STORED_KEYS = ['0x' + f"{index + 1:064x}" for index in range(4)]
+OTHER_KEY = '0x' + '99' * 32
+
+@pytest.fixture
+def key_store(tmp_path, monkeypatch):
+    path = tmp_path / 'pvkey.txt'
+    path.write_text('\n'.join(STORED_KEYS) + '\n')
+    monkeypatch.setitem(KEY_STORE_CONFIG, 'index_path', str(tmp_path / 'pvkey.index.json'))
+    store = KeyStore(str(path))
+    monkeypatch.setattr(utils.key_store, '_store', store)
+    return store
+
+def transaction(private_key: str, nonce: int) -> dict:
+    return dict(transfer(sender=Account.from_key(private_key).address), nonce=nonce)
+
+def expected(private_key: str, nonce: int) -> bytes:
+    return bytes(Account.from_key(private_key).sign_transaction(transaction(private_key, nonce)).raw_transaction)
+
+def signer_pool() -> str:
+    signer = TransactionSigner(workers=2)
+    signer.close()
+    return signer.pool
+
+def test_process_workers_get_key_indexes_not_keys(key_store):
+    sent = []
+
+    async def scenario():
+        signer = TransactionSigner(workers=2, pool='process')
+        submit = signer.executor.submit
+        signer.executor.submit = lambda function, items: sent.extend(items) or submit(function, items)
+        try:
+            signed = await asyncio.gather(*(
+                signer.sign(transaction(private_key, nonce), private_key) for nonce, private_key in enumerate(STORED_KEYS)
+            ))
+            outside = await signer.sign(transaction(OTHER_KEY, 9), OTHER_KEY)
+        finally:
+            signer.close()
+        assert [tx.raw_transaction for tx in signed] == [expected(key, nonce) for nonce, key in enumerate(STORED_KEYS)]
+        assert outside.raw_transaction == expected(OTHER_KEY, 9)
+    asyncio.run(scenario())
+    # The key missing from the store was signed in this process instead
+    assert sorted(key for _, key in sent) == list(range(len(STORED_KEYS)))
+
+def test_auto_pool_uses_threads_inside_a_shard_worker():
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        assert pool.apply(signer_pool) == 'thread'
@@ -0,0 +1,40 @@
+import asyncio
+from bench.fake_chain import GWEI
+from config import RPC_CONFIG
+from utils.fee_oracle import FeeData
+from utils.tx_manager import bump_fees, get_tx_manager, send_transaction, wait_for_receipt
+from tests.fake_network import ADDRESS, KEY, connect, serve, transfer
+
+def test_bump_multiplies_every_fee_field():
+    bumped = bump_fees(transfer(tip=2 * GWEI), None, 1.15)
+    assert bumped == {'maxFeePerGas': 117_300_000_000, 'maxPriorityFeePerGas': 2_300_000_000}
+    assert bump_fees({'gasPrice': 10 * GWEI}, None, 1.15) == {'gasPrice': 11_500_000_000}
+    assert bump_fees({'to': ADDRESS}, None, 1.15) == {}
+
+def test_bump_is_raised_to_the_current_network_fees():
+    fees = FeeData(block_number=1, base_fee=80 * GWEI, priority_fee=3 * GWEI, gas_price=83 * GWEI)
+    bumped = bump_fees(transfer(tip=2 * GWEI), fees, 1.15)
+    assert bumped == {'maxFeePerGas': 163 * GWEI, 'maxPriorityFeePerGas': 3 * GWEI}
+    assert bump_fees({'gasPrice': 10 * GWEI}, fees, 1.15) == {'gasPrice': 83 * GWEI}
+
+def test_stuck_transaction_is_replaced_with_bumped_fees(monkeypatch):
+    monkeypatch.setitem(RPC_CONFIG, 'priority_fee', 'node')
+    monkeypatch.setitem(RPC_CONFIG, 'receipt_poll_interval', 0.05)
+    monkeypatch.setitem(RPC_CONFIG, 'replace_after_blocks', 2)
+
+    async def scenario():
+        # A 2 gwei tip stays pending below min_tip; the first replacement's 2.3 gwei is enough
+        async with serve(block_time=0.1, min_tip=int(2.2 * GWEI)) as (network, url):
+            w3 = await connect(url)
+            original = transfer(tip=2 * GWEI)
+            tx_hash = await send_transaction(w3, original, KEY)
+            receipt = await wait_for_receipt(w3, tx_hash, ADDRESS, timeout=30)
+            manager = get_tx_manager(w3)
+            assert manager.stats == {'sent': 1, 'replaced': 1, 'landed_original': 0, 'landed_replacement': 1}
+            assert receipt['transactionHash'] != tx_hash
+            # The node dropped the original when it accepted the replacement for the same nonce
+            replacement = await w3.eth.get_transaction(receipt['transactionHash'])
+            assert replacement['nonce'] == 0
+            assert replacement['maxPriorityFeePerGas'] >= original['maxPriorityFeePerGas'] * 1.15
+            assert replacement['maxFeePerGas'] >= original['maxFeePerGas'] * 1.15
+    asyncio.run(scenario())
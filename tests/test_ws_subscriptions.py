@@ -0,0 +1,100 @@
+import asyncio
+import json
+import aiohttp
+from aiohttp import web
+from config import RPC_CONFIG
+from utils.ws_subscriptions import SubscriptionFeed
+
+LOG_FILTER = {'address': '0x' + '33' * 20, 'topics': []}
+
+class FlakyNode:
+    """WebSocket node answering eth_subscribe with a notification each, able to drop the socket and refuse handshakes"""
+
+    def __init__(self):
+        self.connections = 0
+        self.refusals = 0  # Handshakes still to refuse
+        self.subscribed = []  # eth_subscribe params, per connection
+        self.drop = asyncio.Event()  # Set to drop the current connection
+
+    async def handle(self, request: web.Request):
+        if self.refusals:
+            self.refusals -= 1
+            return web.Response(status=503)
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.connections += 1
+        connection, subscribed = self.connections, []
+        self.subscribed.append(subscribed)
+        dropping = asyncio.ensure_future(self.drop.wait())
+        while True:
+            receiving = asyncio.ensure_future(ws.receive())
+            await asyncio.wait([receiving, dropping], return_when=asyncio.FIRST_COMPLETED)
+            if dropping.done():
+                receiving.cancel()
+                break
+            message = receiving.result()
+            if message.type != aiohttp.WSMsgType.TEXT:
+                break
+            request_json = json.loads(message.data)
+            subscription_id = f"0x{connection:02x}{len(subscribed):02x}"
+            subscribed.append(request_json['params'])
+            await ws.send_str(json.dumps({'jsonrpc': '2.0', 'id': request_json['id'], 'result': subscription_id}))
+            await ws.send_str(json.dumps({
+                'jsonrpc': '2.0', 'method': 'eth_subscription',
+                'params': {'subscription': subscription_id, 'result': {'connection': connection}},
+            }))
+        dropping.cancel()
+        await ws.close()
+        return ws
+
+def test_dropped_socket_reconnects_with_backoff_and_resubscribes(monkeypatch):
+    monkeypatch.setitem(RPC_CONFIG, 'ws_max_backoff', 3)
+    delays = []
+    real_sleep = asyncio.sleep
+
+    async def fast_sleep(delay, *args, **kwargs):
+        delays.append(delay)
+        await real_sleep(0)
+    monkeypatch.setattr(asyncio, 'sleep', fast_sleep)
+
+    async def wait_for(condition):
+        for _ in range(500):
+            if condition():
+                return
+            await real_sleep(0.01)
+        raise AssertionError("condition not reached")
+
+    async def scenario():
+        node = FlakyNode()
+        app = web.Application()
+        app.router.add_get('/ws', node.handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', 0).start()
+        host, port = runner.addresses[0][:2]
+        session = aiohttp.ClientSession()
+        feed = SubscriptionFeed([f"ws://{host}:{port}/ws"], lambda: session)
+        heads, logs = [], []
+        try:
+            assert await feed.start(timeout=5)
+            await feed.subscribe('newHeads', callback=heads.append)
+            await feed.subscribe('logs', LOG_FILTER, callback=logs.append)
+            await wait_for(lambda: heads and logs)
+
+            # Drop the socket, then refuse the next three handshakes
+            node.refusals = 3
+            node.drop.set()
+            node.drop = asyncio.Event()
+            await wait_for(lambda: node.connections == 2)
+            await wait_for(lambda: len(heads) == 2 and len(logs) == 2)
+            backoff = list(delays)  # Before shutting down, which sleeps too
+        finally:
+            feed.stop()
+            await session.close()
+            await runner.cleanup()
+
+        assert backoff == [1, 2, 3, 3]  # Doubling from 1s, capped at ws_max_backoff
+        assert sorted(map(json.dumps, node.subscribed[1])) == sorted(map(json.dumps, [['newHeads'], ['logs', LOG_FILTER]]))
+        assert heads == [{'connection': 1}, {'connection': 2}]
+        assert logs == [{'connection': 1}, {'connection': 2}]
+    asyncio.run(scenario())
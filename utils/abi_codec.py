@@ -0,0 +1,85 @@
+"""
+ABI codec module turning ABI constants into precomputed selectors and argument encoders, built once at import
+"""
+from typing import Any, Callable, Dict, List, Sequence
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+
+def abi_type(abi_input: Dict[str, Any]) -> str:
+    """Canonical type string of an ABI input, with tuples spelled out as (type1,type2,...)"""
+    abi_input_type = abi_input['type']
+    if abi_input_type.startswith('tuple'):
+        components = ','.join(abi_type(component) for component in abi_input['components'])
+        return f"({components}){abi_input_type[len('tuple'):]}"
+    return abi_input_type
+
+def _normaliser(abi_input: Dict[str, Any]) -> Callable[[Any], Any]:
+    """Converter for one argument applying the conversions web3 does for us: hex strings to bytes, lists to tuples"""
+    abi_input_type = abi_input['type']
+    dimensions = abi_input_type.count('[')
+    base = abi_input_type.split('[')[0]
+    if base == 'tuple':
+        components = [_normaliser(component) for component in abi_input['components']]
+        convert = lambda value: tuple(component(item) for component, item in zip(components, value))
+    elif base.startswith('bytes'):
+        convert = lambda value: bytes(HexBytes(value)) if isinstance(value, str) else value
+    else:
+        return lambda value: value
+    for _ in range(dimensions):
+        convert = (lambda inner: lambda value: [inner(item) for item in value])(convert)
+    return convert
+
+class FunctionCodec:
+    """Selector and argument encoder for one ABI function"""
+
+    def __init__(self, abi_entry: Dict[str, Any]):
+        self.name = abi_entry['name']
+        inputs = abi_entry.get('inputs', [])
+        self.input_types = [abi_type(abi_input) for abi_input in inputs]
+        self.output_types = [abi_type(output) for output in abi_entry.get('outputs', [])]
+        self.signature = f"{self.name}({','.join(self.input_types)})"
+        self.selector = function_signature_to_4byte_selector(self.signature)
+        self.selector_hex = '0x' + self.selector.hex()
+        self.normalisers = [_normaliser(abi_input) for abi_input in inputs]
+
+    def encode(self, *args: Any) -> str:
+        """0x-prefixed calldata for a call with these arguments"""
+        if len(args) != len(self.input_types):
+            raise TypeError(f"{self.signature} takes {len(self.input_types)} arguments, got {len(args)}")
+        if not args:
+            return self.selector_hex
+        values = [normalise(value) for normalise, value in zip(self.normalisers, args)]
+        return self.selector_hex + encode(self.input_types, values).hex()
+
+    def decode(self, data: bytes) -> Any:
+        """Decode return data; a single return value is unwrapped"""
+        values = decode(self.output_types, bytes(data))
+        return values[0] if len(values) == 1 else values
+
+    async def call(self, w3: AsyncWeb3, to: str, *args: Any, block: Any = 'latest') -> Any:
+        """eth_call a view function and decode its result"""
+        return self.decode(await w3.eth.call({'to': to, 'data': self.encode(*args)}, block))
+
+class ContractCodec:
+    """Function codecs for every function in an ABI, by name"""
+
+    def __init__(self, abi: Sequence[Dict[str, Any]]):
+        self.functions: Dict[str, FunctionCodec] = {}
+        for entry in abi:
+            if entry.get('type', 'function') == 'function':
+                # Overloads are not used by the bots; the last definition wins
+                self.functions[entry['name']] = FunctionCodec(entry)
+
+    def __getattr__(self, name: str) -> FunctionCodec:
+        try:
+            return self.__dict__['functions'][name]
+        except KeyError:
+            raise AttributeError(f"ABI has no function {name}") from None
+
+    def encode(self, name: str, *args: Any) -> str:
+        return self.functions[name].encode(*args)
+
+    def selectors(self) -> List[str]:
+        return [function.selector_hex for function in self.functions.values()]
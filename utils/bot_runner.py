@@ -0,0 +1,96 @@
+"""
+Bot runner module for executing bot scripts in-process or as supervised subprocesses
+"""
+import importlib
+import os
+from types import ModuleType
+from typing import Dict, List, Optional, Tuple
+from web3 import AsyncWeb3
+from config import RPC_CONFIG, RUNNER_CONFIG
+from utils.logger import Logger
+from utils.key_store import get_key_store
+from utils.process_supervisor import ProcessSupervisor
+from utils.rpc_client import get_web3
+from utils.tracing import annotate, fail, span, traceparent, tracing_enabled
+
+class BotRunner:
+    def __init__(self):
+        self.modules: Dict[str, ModuleType] = {}
+        self.w3: Optional[AsyncWeb3] = None
+        self.supervisor = ProcessSupervisor(RUNNER_CONFIG['run_timeout'], RUNNER_CONFIG['concurrency'])
+
+    @staticmethod
+    def module_name(script_name: str) -> str:
+        """Convert a script path like script/owlto.py to an importable module name"""
+        return os.path.splitext(os.path.normpath(script_name))[0].replace(os.sep, '.')
+
+    @staticmethod
+    def bot_name(script_name: str) -> str:
+        """Short name of a bot script, e.g. owlto for script/owlto.py"""
+        return os.path.splitext(os.path.basename(script_name))[0]
+
+    def load_bot(self, script_name: str) -> ModuleType:
+        """Import a bot script once and reuse the module for every later run"""
+        module = self.modules.get(script_name)
+        if module is None:
+            module = importlib.import_module(self.module_name(script_name))
+            if not hasattr(module, 'run'):
+                raise AttributeError(f"{script_name} has no run() coroutine")
+            self.modules[script_name] = module
+        return module
+
+    def preload(self, bots: List[Tuple[str, str]]):
+        """Import every bot up front so the first run does not pay the import cost"""
+        for name, script in bots:
+            try:
+                self.load_bot(script)
+            except Exception as e:
+                Logger.warning(f"Could not preload {name}: {e}")
+        Logger.info(f"Preloaded {len(self.modules)}/{len(bots)} bots")
+
+    async def get_client(self) -> Optional[AsyncWeb3]:
+        """Get the shared AsyncWeb3 client, connecting on first use"""
+        if self.w3 is None:
+            self.w3 = await get_web3(RPC_CONFIG['urls'], RPC_CONFIG['chain_id'])
+            if self.w3 is None:
+                Logger.warning("Shared RPC client unavailable, bots will connect on their own")
+        return self.w3
+
+    @staticmethod
+    def wallet_of(private_key: str) -> Optional[str]:
+        """Wallet address for span attributes, not derived while tracing is off"""
+        if not tracing_enabled():
+            return None
+        try:
+            return get_key_store().address_of(private_key)
+        except ValueError:
+            return None
+
+    async def run_bot(self, script_name: str, private_key: str) -> bool:
+        """Run a bot's run() coroutine with the given key and the shared client"""
+        with span(f"bot {self.bot_name(script_name)}", bot=self.bot_name(script_name), wallet=self.wallet_of(private_key), mode='inprocess'):
+            try:
+                module = self.load_bot(script_name)
+                result = await module.run(private_key=private_key, w3=await self.get_client())
+            except Exception as e:
+                Logger.error(f"Bot {script_name} raised an exception: {e}")
+                fail(e)
+                return False
+            annotate(succeeded=bool(result))
+            return bool(result)
+
+    async def run_script(self, script_name: str, private_key: str, env: dict) -> bool:
+        """Run a bot script in its own process without blocking the event loop"""
+        prefix = f"{os.path.basename(script_name)} {private_key[:6]}...{private_key[-4:]}"
+        with span(f"bot {self.bot_name(script_name)}", bot=self.bot_name(script_name), wallet=self.wallet_of(private_key), mode='subprocess'):
+            parent = traceparent()
+            if parent is not None:
+                # The bot's own spans join this trace
+                env = dict(env, TRACEPARENT=parent)
+            exit_code = await self.supervisor.run(script_name, env, prefix)
+            annotate(exit_code=exit_code, succeeded=exit_code == 0)
+            if exit_code != 0:
+                Logger.error(f"Bot execution failed with exit code {exit_code}")
+                fail(f"exit code {exit_code}")
+                return False
+            return True
@@ -0,0 +1,138 @@
+"""
+Cassette module recording RPC and HTTP API traffic to a file and replaying it offline
+"""
+import asyncio
+import atexit
+import collections
+import copy
+import glob
+import gzip
+import json
+import os
+import time
+from typing import Any, Deque, Dict, List, Optional
+from config import CASSETTE_CONFIG
+from utils.logger import Logger
+
+def _jsonable(value: Any) -> Any:
+    # Raw transactions and other byte params are stored the way they go over the wire
+    if isinstance(value, (bytes, bytearray)):
+        return '0x' + bytes(value).hex()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def part_paths(path: str) -> List[str]:
+    """Files recorded next to path by shard workers and bot subprocesses, <path>.<pid>"""
+    return sorted(part for part in glob.glob(glob.escape(path) + '.*') if part.rsplit('.', 1)[1].isdigit())
+
+def request_key(kind: str, scope: str, name: str, request: Any) -> str:
+    return f"{kind} {scope} {name} {json.dumps(request, sort_keys=True, separators=(',', ':'), default=_jsonable)}"
+
+class Cassette:
+    """Request/response pairs with their latency, one JSON line each
+
+    The first process to record owns the session: it truncates path and deletes the part files left
+    by the previous recording, then every process it starts (shard workers, bot subprocesses) writes
+    its own <path>.<pid>, so concurrent writers never share a gzip stream. Replay reads path and its
+    parts together, ordered by recording time.
+
+    Replay serves the response recorded for an identical request, in recorded order. A request
+    never seen (random amounts, fresh signatures) gets the next unused response recorded for the
+    same method or URL, and once those run out the last one again, so a replay never hits the network.
+    """
+
+    def __init__(self, path: str, mode: str, latency_scale: float = 0.0):
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.file = None
+        self.exact: Dict[str, Deque[dict]] = collections.defaultdict(collections.deque)
+        self.by_name: Dict[str, Deque[dict]] = collections.defaultdict(collections.deque)
+        self.last: Dict[str, dict] = {}
+        self.misses = 0
+        if mode == 'record':
+            if os.environ.get('CASSETTE_RECORDER') is None:
+                # Children inherit the variable and record to part files instead
+                os.environ['CASSETTE_RECORDER'] = str(os.getpid())
+                for part in part_paths(path):
+                    os.remove(part)
+                self.file = gzip.open(path, 'wt', encoding='utf-8')
+            else:
+                self.file = gzip.open(f"{path}.{os.getpid()}", 'wt', encoding='utf-8')
+        elif mode == 'replay':
+            self.load()
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == 'replay'
+
+    def load(self):
+        if not os.path.exists(self.path):
+            Logger.error(f"Cassette {self.path} not found, every request will miss")
+            return
+        entries = []
+        for path in [self.path] + part_paths(self.path):
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            entries.append(json.loads(line))
+            except (OSError, EOFError, ValueError) as e:
+                # A recording cut short by a crash still replays up to the damaged tail
+                Logger.warning(f"Cassette {path} is damaged ({e}), replaying what could be read")
+        entries.sort(key=lambda entry: entry['at'])  # Interleave the processes back into recorded order
+        for entry in entries:
+            entry['used'] = False
+            self.exact[entry['key']].append(entry)
+            self.by_name[' '.join(entry['key'].split(' ', 3)[:3])].append(entry)
+        Logger.info(f"Replaying {len(entries)} recorded requests from {self.path}")
+
+    def record(self, kind: str, scope: str, name: str, request: Any, response: Any, seconds: float):
+        if self.file is None:
+            return
+        entry = {
+            'key': request_key(kind, scope, name, request),
+            'at': round(time.time(), 6),
+            'seconds': round(seconds, 6),
+            'response': response,
+        }
+        self.file.write(json.dumps(entry, separators=(',', ':'), default=_jsonable) + '\n')
+
+    @staticmethod
+    def _next(queue: Deque[dict]) -> Optional[dict]:
+        while queue:
+            entry = queue.popleft()
+            if not entry['used']:
+                return entry
+        return None
+
+    async def replay(self, kind: str, scope: str, name: str, request: Any) -> Optional[Any]:
+        """Recorded response for a request, after the scaled recorded delay; None when nothing was recorded for it"""
+        name_key = f"{kind} {scope} {name}"
+        entry = self._next(self.exact[request_key(kind, scope, name, request)]) or self._next(self.by_name[name_key])
+        if entry is None:
+            entry = self.last.get(name_key)
+            if entry is None:
+                self.misses += 1
+                return None
+        entry['used'] = True
+        self.last[name_key] = entry
+        if self.latency_scale:
+            await asyncio.sleep(entry['seconds'] * self.latency_scale)
+        return copy.deepcopy(entry['response'])  # Callers may modify what they get
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if self.misses:
+            Logger.warning(f"{self.misses} replayed requests were not in cassette {self.path}")
+
+_cassette: Optional[Cassette] = None
+
+def get_cassette() -> Optional[Cassette]:
+    """The process-wide cassette, or None when CASSETTE_CONFIG['mode'] is off"""
+    global _cassette
+    if _cassette is None and CASSETTE_CONFIG['mode'] in ('record', 'replay'):
+        _cassette = Cassette(CASSETTE_CONFIG['path'], CASSETTE_CONFIG['mode'], CASSETTE_CONFIG['latency_scale'])
+        atexit.register(_cassette.close)
+    return _cassette
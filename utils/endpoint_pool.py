@@ -0,0 +1,143 @@
+"""
+Endpoint pool module for ranking RPC endpoints by latency, errors and head-block lag
+"""
+import asyncio
+import collections
+import json
+import time
+from typing import Any, Callable, Deque, List, Optional
+import aiohttp
+from config import RPC_CONFIG
+from utils.logger import Logger
+
+PROBE_HEADERS = {'Content-Type': 'application/json', 'Accept': 'application/json'}
+
+class Endpoint:
+    def __init__(self, url: str, alpha: float):
+        self.url = url
+        self.alpha = alpha
+        self.latency: Optional[float] = None  # EWMA latency in seconds
+        self.error_rate = 0.0  # EWMA of failed requests (0.0 - 1.0)
+        self.head_block = 0
+        self.chain_id: Optional[int] = None
+        self.healthy = False
+        self.batch_supported = True
+        self.samples: Deque[float] = collections.deque(maxlen=200)
+        self.requests = 0
+        self.failures = 0
+
+    def record_success(self, latency: float):
+        """Fold a successful request into the latency and error averages"""
+        self.requests += 1
+        self.samples.append(latency)
+        self.latency = latency if self.latency is None else self.alpha * latency + (1 - self.alpha) * self.latency
+        self.error_rate = (1 - self.alpha) * self.error_rate
+
+    def record_failure(self):
+        """Fold a failed request into the error average"""
+        self.requests += 1
+        self.failures += 1
+        self.error_rate = self.alpha + (1 - self.alpha) * self.error_rate
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Latency percentile over the most recent samples"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+    def __repr__(self) -> str:
+        latency = f"{self.latency * 1000:.0f}ms" if self.latency is not None else "n/a"
+        return f"<Endpoint {self.url} {latency} err={self.error_rate:.2f} head={self.head_block}>"
+
+class EndpointPool:
+    def __init__(self, urls: List[str], get_session: Callable[[], aiohttp.ClientSession], chain_id: Optional[int] = None):
+        alpha = RPC_CONFIG['ewma_alpha']
+        self.endpoints = [Endpoint(url, alpha) for url in urls]
+        self.get_session = get_session
+        self.chain_id = chain_id
+        self.interval = RPC_CONFIG['probe_interval']
+        self.max_head_lag = RPC_CONFIG['max_head_lag']
+        self.probe_task: Optional[asyncio.Task] = None
+
+    @property
+    def head_block(self) -> int:
+        """Highest block seen on any endpoint"""
+        return max((endpoint.head_block for endpoint in self.endpoints), default=0)
+
+    def lag(self, endpoint: Endpoint) -> int:
+        """Blocks the endpoint is behind the best head seen across the pool"""
+        return max(0, self.head_block - endpoint.head_block)
+
+    def score(self, endpoint: Endpoint) -> float:
+        """Lower is better: latency inflated by recent errors and head-block lag"""
+        latency = endpoint.latency if endpoint.latency is not None else RPC_CONFIG['timeout']
+        return latency * (1 + 4 * endpoint.error_rate) * (1 + self.lag(endpoint))
+
+    def ranked(self) -> List[Endpoint]:
+        """Endpoints best first; unhealthy ones are kept at the end as a last resort"""
+        return sorted(self.endpoints, key=lambda endpoint: (not endpoint.healthy, self.score(endpoint)))
+
+    def healthy(self) -> List[Endpoint]:
+        """Healthy endpoints, best first"""
+        return [endpoint for endpoint in self.ranked() if endpoint.healthy]
+
+    async def _call(self, endpoint: Endpoint, method: str) -> Any:
+        payload = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': method, 'params': []})
+        async with self.get_session().post(endpoint.url, data=payload, headers=PROBE_HEADERS) as response:
+            response.raise_for_status()
+            body = await response.json(content_type=None)
+        if 'error' in body:
+            raise ValueError(body['error'])
+        return body['result']
+
+    async def probe(self, endpoint: Endpoint):
+        """Measure one endpoint with eth_blockNumber, checking its chain id on first contact"""
+        first_contact = endpoint.chain_id is None
+        try:
+            if first_contact:
+                endpoint.chain_id = int(await self._call(endpoint, 'eth_chainId'), 16)
+            started = time.perf_counter()
+            head_block = int(await self._call(endpoint, 'eth_blockNumber'), 16)
+        except Exception as e:
+            endpoint.record_failure()
+            if endpoint.healthy:
+                Logger.warning(f"RPC {endpoint.url} failed health probe: {e}")
+            endpoint.healthy = False
+            return
+
+        endpoint.record_success(time.perf_counter() - started)
+        endpoint.head_block = max(endpoint.head_block, head_block)
+        if self.chain_id is not None and endpoint.chain_id != self.chain_id:
+            if endpoint.healthy or first_contact:
+                Logger.warning(f"Wrong network on {endpoint.url} (chain {endpoint.chain_id}, expected {self.chain_id})")
+            endpoint.healthy = False
+            return
+        endpoint.healthy = True
+
+    async def probe_all(self):
+        """Probe every endpoint at once, then mark endpoints too far behind the head"""
+        await asyncio.gather(*(self.probe(endpoint) for endpoint in self.endpoints))
+        for endpoint in self.endpoints:
+            if endpoint.healthy and self.lag(endpoint) > self.max_head_lag:
+                Logger.warning(f"RPC {endpoint.url} is {self.lag(endpoint)} blocks behind")
+                endpoint.healthy = False
+
+    async def _probe_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.probe_all()
+            except Exception as e:
+                Logger.warning(f"RPC health probe failed: {e}")
+
+    def start(self):
+        """Keep probing in the background on the running event loop"""
+        if self.probe_task is None or self.probe_task.done():
+            self.probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    def stop(self):
+        """Stop background probing"""
+        if self.probe_task is not None:
+            self.probe_task.cancel()
+            self.probe_task = None
@@ -0,0 +1,117 @@
+"""
+Fee controller module choosing the cheapest priority fee that still meets a target inclusion latency
+"""
+import statistics
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+from config import RPC_CONFIG
+from utils.logger import Logger
+from utils.metrics import get_metrics
+
+class FeeController:
+    """Feedback controller over eth_feeHistory tip percentiles
+
+    Starts at the median tip. It moves one percentile up as soon as the last few transactions
+    sent at the current level took longer than the target number of blocks to be included,
+    and one percentile down after a run of on-target inclusions, to check whether a cheaper
+    tip still does the job.
+    """
+
+    def __init__(self, percentiles: Optional[Sequence[int]] = None, target_blocks: Optional[int] = None):
+        self.percentiles = list(percentiles or RPC_CONFIG['fee_percentiles'])
+        self.target_blocks = target_blocks or RPC_CONFIG['fee_target_blocks']
+        self.level = len(self.percentiles) // 2
+        self.tips: List[Optional[int]] = [None] * len(self.percentiles)  # Median recent reward per percentile
+        # Blocks-to-inclusion per level: a long window for metrics, a short one for control
+        self.samples: List[Deque[int]] = [deque(maxlen=RPC_CONFIG['fee_window']) for _ in self.percentiles]
+        self.recent: Deque[int] = deque(maxlen=3)
+        self.on_target = 0
+
+    def history_request(self) -> Tuple[str, List[Any]]:
+        """The eth_feeHistory call to add to the fee oracle's batch"""
+        return ('eth_feeHistory', [hex(RPC_CONFIG['fee_history_blocks']), 'latest', self.percentiles])
+
+    def update_history(self, history: Dict[str, Any]):
+        """Take the median reward at each percentile over the non-empty blocks of an eth_feeHistory result"""
+        ratios = history.get('gasUsedRatio') or []
+        rewards = [
+            [int(reward, 16) for reward in block]
+            for index, block in enumerate(history.get('reward') or [])
+            if block and (index >= len(ratios) or ratios[index] > 0)  # Empty blocks report zero rewards
+        ]
+        for index in range(len(self.percentiles)):
+            values = [block[index] for block in rewards if len(block) > index]
+            self.tips[index] = int(statistics.median(values)) if values else None
+
+    def priority_fee(self, fallback: Optional[int]) -> Optional[int]:
+        """Tip for the current level, or `fallback` (the node's suggestion) while there is no usable history"""
+        tip = self.tips[self.level] or fallback
+        get_metrics().fee_level(self.percentiles[self.level], tip)
+        return tip
+
+    def level_for(self, priority_fee: int) -> int:
+        """The highest level whose tip the given priority fee covers"""
+        if all(tip is None for tip in self.tips):
+            return self.level
+        level = 0
+        for index, tip in enumerate(self.tips):
+            if tip is not None and tip <= priority_fee:
+                level = index
+        return level
+
+    def _move(self, step: int, reason: str):
+        self.level += step
+        self.recent.clear()
+        self.on_target = 0
+        Logger.info(f"Priority fee moved to p{self.percentiles[self.level]}: {reason}")
+
+    def record_inclusion(self, priority_fee: int, blocks: int):
+        """Feed back how many blocks a transaction paying `priority_fee` took from broadcast to inclusion"""
+        level = self.level_for(priority_fee)
+        self.samples[level].append(blocks)
+        get_metrics().inclusion(self.percentiles[level], blocks)
+        if level != self.level:
+            return  # Sent before the last move or with a boosted strategy: metrics only
+        self.recent.append(blocks)
+        if statistics.mean(self.recent) > self.target_blocks:
+            if self.level < len(self.percentiles) - 1:
+                self._move(1, f"inclusion took {statistics.mean(self.recent):.1f} blocks, target {self.target_blocks}")
+            self.on_target = 0
+            return
+        self.on_target += 1
+        if self.level == 0:
+            return
+        required = RPC_CONFIG['fee_step_down_after']
+        lower = self.samples[self.level - 1]
+        if lower and lower[-1] > self.target_blocks:
+            required *= 3  # The cheaper tip missed the target last time, so probe it less often
+        if self.on_target >= required:
+            self._move(-1, f"{self.on_target} transactions in a row within {self.target_blocks} blocks")
+
+    def metrics(self) -> List[Dict[str, Any]]:
+        """Latency/fee tradeoff per percentile level: tip, sample count, mean and p90 blocks, share on target"""
+        rows = []
+        for index, percentile in enumerate(self.percentiles):
+            samples = sorted(self.samples[index])
+            rows.append({
+                'percentile': percentile,
+                'tip': self.tips[index],
+                'active': index == self.level,
+                'samples': len(samples),
+                'mean_blocks': statistics.mean(samples) if samples else None,
+                'p90_blocks': samples[int(0.9 * (len(samples) - 1))] if samples else None,
+                'on_target': sum(blocks <= self.target_blocks for blocks in samples) / len(samples) if samples else None,
+            })
+        return rows
+
+    def log_summary(self):
+        """Log the current level and the measured tradeoff of every level with samples"""
+        Logger.info(f"Priority fee: p{self.percentiles[self.level]} of recent blocks, target {self.target_blocks} blocks to inclusion")
+        for row in self.metrics():
+            if not row['samples']:
+                continue
+            tip = f"{row['tip'] / 10**9:.3f} gwei" if row['tip'] is not None else "unknown"
+            Logger.info(
+                f"  p{row['percentile']}{' (active)' if row['active'] else ''}: tip {tip}, {row['samples']} txs, "
+                f"mean {row['mean_blocks']:.1f} / p90 {row['p90_blocks']} blocks, {row['on_target']:.0%} on target"
+            )
@@ -0,0 +1,148 @@
+"""
+Fee oracle module serving block-scoped gas fee data from memory to every bot
+"""
+import asyncio
+import time
+import weakref
+from typing import Any, Callable, Dict, NamedTuple, Optional
+from web3 import AsyncWeb3
+from config import RPC_CONFIG
+from utils.fee_controller import FeeController
+from utils.logger import Logger
+
+class FeeData(NamedTuple):
+    block_number: int
+    base_fee: Optional[int]  # None on chains without EIP-1559
+    priority_fee: Optional[int]
+    gas_price: int
+
+def eip1559(base_multiplier: float = 1, tip_multiplier: float = 1, fee_multiplier: float = 1) -> Callable[[Any], Dict[str, int]]:
+    """Strategy: maxFee = (base * base_multiplier + tip * tip_multiplier) * fee_multiplier"""
+    def strategy(fees) -> Dict[str, int]:
+        priority_fee = int(fees.priority_fee * tip_multiplier)
+        return {
+            'maxFeePerGas': int((fees.base_fee * base_multiplier + priority_fee) * fee_multiplier),
+            'maxPriorityFeePerGas': priority_fee,
+        }
+    return strategy
+
+def legacy(multiplier: float = 1.1) -> Callable[[Any], Dict[str, int]]:
+    """Strategy: gasPrice = node gas price * multiplier"""
+    def strategy(fees) -> Dict[str, int]:
+        return {'gasPrice': int(fees.gas_price * multiplier)}
+    return strategy
+
+# Fee strategies the bots can pick by name
+FEE_STRATEGIES: Dict[str, Callable[[Any], Dict[str, int]]] = {
+    'eip1559': eip1559(),  # base fee + tip
+    'eip1559_2x': eip1559(base_multiplier=2),  # room for the base fee to double
+    'eip1559_boost': eip1559(tip_multiplier=1.5, fee_multiplier=1.5),  # 1.5x tip and 1.5x max fee
+    'legacy': legacy(1.1),  # gas price + 10%
+}
+
+def fee_params(fees, strategy: str = 'eip1559') -> Dict[str, int]:
+    """Transaction fee fields for a strategy, from FeeData or anything with the same fields
+
+    EIP-1559 strategies fall back to legacy pricing when the chain reports no base fee.
+    """
+    if strategy != 'legacy' and (fees.base_fee is None or fees.priority_fee is None):
+        return FEE_STRATEGIES['legacy'](fees)
+    return FEE_STRATEGIES[strategy](fees)
+
+class FeeOracle:
+    def __init__(self, w3: AsyncWeb3, max_age: Optional[float] = None):
+        self.client = weakref.ref(w3)
+        self.max_age = max_age if max_age is not None else RPC_CONFIG['fee_max_age']
+        self.fees: Optional[FeeData] = None
+        self.updated = 0.0
+        self.refreshing: Optional[asyncio.Task] = None
+        # Picks the tip from fee history when RPC_CONFIG['priority_fee'] is 'adaptive'
+        self.controller = FeeController()
+
+    @property
+    def w3(self) -> AsyncWeb3:
+        # Held weakly, as in the nonce, receipt and transaction managers: each is stored under its
+        # client in a WeakKeyDictionary, which a strong reference back would keep alive forever
+        w3 = self.client()
+        if w3 is None:
+            raise RuntimeError("The AsyncWeb3 client is gone")
+        return w3
+
+    async def _fetch(self) -> FeeData:
+        adaptive = RPC_CONFIG['priority_fee'] == 'adaptive'
+        requests = [
+            ('eth_getBlockByNumber', ['latest', False]),
+            ('eth_maxPriorityFeePerGas', []),
+            ('eth_gasPrice', []),
+        ]
+        if adaptive:
+            requests.append(self.controller.history_request())
+        block, priority_fee, gas_price, *history = await self.w3.provider.make_batch_request(requests)
+        if block.get('result') is None or gas_price.get('result') is None:
+            raise ValueError(f"Fee data unavailable: {block.get('error') or gas_price.get('error')}")
+        base_fee = block['result'].get('baseFeePerGas')
+        priority_fee = int(priority_fee['result'], 16) if priority_fee.get('result') is not None else None
+        if adaptive:
+            if history and history[0].get('result'):
+                self.controller.update_history(history[0]['result'])
+            priority_fee = self.controller.priority_fee(priority_fee)
+        fees = FeeData(
+            block_number=int(block['result']['number'], 16),
+            base_fee=int(base_fee, 16) if base_fee is not None else None,
+            priority_fee=priority_fee,
+            gas_price=int(gas_price['result'], 16),
+        )
+        self._store(fees)
+        return fees
+
+    def _store(self, fees: FeeData):
+        if self.fees is None or fees.block_number >= self.fees.block_number:
+            self.fees = fees
+            self.updated = time.monotonic()
+
+    async def refresh(self) -> FeeData:
+        """Fetch fee data for the latest block; concurrent callers share one request"""
+        if self.refreshing is None or self.refreshing.done():
+            self.refreshing = asyncio.ensure_future(self._fetch())
+        return await asyncio.shield(self.refreshing)
+
+    async def get_fee_data(self) -> FeeData:
+        """Fee data for the current block, from memory unless it is older than max_age"""
+        if self.fees is not None and time.monotonic() - self.updated < self.max_age:
+            return self.fees
+        return await self.refresh()
+
+    def on_new_head(self, head: Dict[str, Any]):
+        """Take the base fee from a new block header without another request
+
+        The tip and gas price are carried over from the last fetch; they move far
+        less from block to block than the base fee.
+        """
+        number = head['number'] if isinstance(head['number'], int) else int(head['number'], 16)
+        base_fee = head.get('baseFeePerGas')
+        if isinstance(base_fee, str):
+            base_fee = int(base_fee, 16)
+        if self.fees is None or number <= self.fees.block_number:
+            return
+        self._store(self.fees._replace(block_number=number, base_fee=base_fee))
+
+    async def gas_params(self, strategy: str = 'eip1559') -> Dict[str, int]:
+        """Transaction fee fields for the current block using a named strategy"""
+        return fee_params(await self.get_fee_data(), strategy)
+
+_oracles: 'weakref.WeakKeyDictionary[AsyncWeb3, FeeOracle]' = weakref.WeakKeyDictionary()
+
+def get_fee_oracle(w3: AsyncWeb3) -> FeeOracle:
+    """The fee oracle shared by every bot using this client"""
+    oracle = _oracles.get(w3)
+    if oracle is None:
+        oracle = _oracles[w3] = FeeOracle(w3)
+    return oracle
+
+async def get_gas_params(w3: AsyncWeb3, strategy: str = 'eip1559') -> Optional[Dict[str, int]]:
+    """Fee fields for the next transaction, or None if fee data could not be fetched"""
+    try:
+        return await get_fee_oracle(w3).gas_params(strategy)
+    except Exception as e:
+        Logger.warning(f"Error getting gas params: {e}")
+        return None
@@ -0,0 +1,129 @@
+"""
+Gas profile module learning gas limits per contract call from receipts, kept on disk between runs
+"""
+import atexit
+import json
+import math
+import os
+import time
+from typing import Any, Dict, Optional
+from eth_utils import keccak
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+from config import GAS_PROFILE_CONFIG, RPC_CONFIG
+from utils.logger import Logger
+
+def profile_key(transaction: Dict[str, Any]) -> str:
+    """Key for a call: chain, target and 4-byte selector, or the initcode hash for a deployment"""
+    chain_id = transaction.get('chainId') or RPC_CONFIG['chain_id']
+    data = bytes(HexBytes(transaction.get('data') or transaction.get('input') or b''))
+    if not transaction.get('to'):
+        return f"{chain_id}:create:{keccak(data).hex()[:16]}"
+    selector = '0x' + data[:4].hex() if data else 'transfer'
+    return f"{chain_id}:{str(transaction['to']).lower()}:{selector}"
+
+class GasProfile:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or GAS_PROFILE_CONFIG['path']
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self.dirty = False
+        self.saved_at = 0.0
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            Logger.warning(f"Could not read gas profile {self.path}, starting empty: {e}")
+            self.entries = {}
+
+    def save(self):
+        """Write the profile atomically; with several processes the last writer wins"""
+        if not self.dirty:
+            return
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(self.entries, f)
+            os.replace(temp_path, self.path)
+        except OSError as e:
+            Logger.warning(f"Could not write gas profile {self.path}: {e}")
+            return
+        self.dirty = False
+        self.saved_at = time.time()
+
+    def _changed(self):
+        self.dirty = True
+        if time.time() - self.saved_at >= GAS_PROFILE_CONFIG['save_interval']:
+            self.save()
+
+    @staticmethod
+    def _p99(samples) -> int:
+        ordered = sorted(samples)
+        return ordered[max(math.ceil(0.99 * len(ordered)) - 1, 0)]
+
+    def learned_limit(self, transaction: Dict[str, Any]) -> Optional[int]:
+        """Learned limit (p99 of gasUsed plus margin) however long ago the node was last asked, None before min_samples receipts"""
+        entry = self.entries.get(profile_key(transaction))
+        if entry is None or len(entry['samples']) < GAS_PROFILE_CONFIG['min_samples']:
+            return None
+        return int(self._p99(entry['samples']) * GAS_PROFILE_CONFIG['margin'])
+
+    def estimate(self, transaction: Dict[str, Any]) -> Optional[int]:
+        """Learned limit, or None when the node should be asked instead"""
+        entry = self.entries.get(profile_key(transaction))
+        if entry is None or time.time() - entry.get('estimated_at', 0) > GAS_PROFILE_CONFIG['reestimate']:
+            return None
+        return self.learned_limit(transaction)
+
+    def record_estimate(self, transaction: Dict[str, Any], estimate: int):
+        """Note a node estimate; one far above what was learned means the contract changed"""
+        entry = self.entries.setdefault(profile_key(transaction), {'samples': []})
+        if entry['samples'] and estimate > self._p99(entry['samples']) * GAS_PROFILE_CONFIG['margin'] * 1.2:
+            Logger.info(f"Gas estimate for {profile_key(transaction)} rose to {estimate}, relearning its limit")
+            entry['samples'] = []
+        entry['estimate'] = estimate
+        entry['estimated_at'] = time.time()
+        self._changed()
+
+    def record_receipt(self, transaction: Dict[str, Any], receipt: Any):
+        """Learn from a mined transaction; running out of gas discards what was learned"""
+        entry = self.entries.setdefault(profile_key(transaction), {'samples': []})
+        gas_limit = transaction.get('gas')
+        if receipt['status'] != 1:
+            if gas_limit and receipt['gasUsed'] >= gas_limit * 0.97:
+                entry['samples'] = []
+                entry['estimated_at'] = 0
+                self._changed()
+            return
+        entry['samples'] = (entry['samples'] + [receipt['gasUsed']])[-GAS_PROFILE_CONFIG['max_samples']:]
+        self._changed()
+
+_profile: Optional[GasProfile] = None
+
+def get_gas_profile() -> Optional[GasProfile]:
+    """The process-wide gas profile, or None when disabled in GAS_PROFILE_CONFIG"""
+    global _profile
+    if not GAS_PROFILE_CONFIG['enabled']:
+        return None
+    if _profile is None:
+        _profile = GasProfile()
+        atexit.register(_profile.save)
+    return _profile
+
+async def estimate_gas(w3: AsyncWeb3, transaction: Dict[str, Any]) -> int:
+    """Gas limit for a transaction from the profile, or from eth_estimateGas when nothing is learned yet
+
+    Raises like eth_estimateGas when the node has to be asked and the call reverts.
+    """
+    profile = get_gas_profile()
+    learned = profile.estimate(transaction) if profile is not None else None
+    if learned is not None:
+        return learned
+    estimate = await w3.eth.estimate_gas({field: value for field, value in transaction.items() if field != 'gas'})
+    if profile is not None:
+        profile.record_estimate(transaction, estimate)
+    return estimate
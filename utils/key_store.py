@@ -0,0 +1,195 @@
+"""
+Key store module parsing pvkey.txt once and keeping keys and their addresses in flat byte arrays
+"""
+import concurrent.futures
+import hashlib
+import json
+import os
+from typing import Dict, Iterator, List, Optional, Tuple
+from eth_keys import keys
+from eth_utils import to_checksum_address
+from config import KEY_STORE_CONFIG
+from utils.logger import Logger
+
+SECP256K1_N = 0xFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFFEBAAEDCE6AF48A03BBFD25E8CD0364141
+KEY_SIZE = 32
+ADDRESS_SIZE = 20
+
+def parse_key(line: str) -> Optional[bytes]:
+    """32-byte key from a pvkey.txt line (0x prefix optional), or None when it is not a valid secp256k1 key"""
+    text = line.strip()
+    if text[:2].lower() == '0x':
+        text = text[2:]
+    if len(text) != 2 * KEY_SIZE:
+        return None
+    try:
+        key = bytes.fromhex(text)
+    except ValueError:
+        return None
+    return key if 0 < int.from_bytes(key, 'big') < SECP256K1_N else None
+
+def derive_addresses(packed_keys: bytes) -> bytes:
+    """Addresses of concatenated 32-byte keys, concatenated the same way; runs inside a pool worker"""
+    return b''.join(
+        keys.PrivateKey(packed_keys[start:start + KEY_SIZE]).public_key.to_canonical_address()
+        for start in range(0, len(packed_keys), KEY_SIZE)
+    )
+
+def _fingerprint(key: bytes) -> str:
+    # Identifies a key in the sidecar without storing anything it could be recovered from
+    return hashlib.sha256(key).hexdigest()[:16]
+
+def _read_text(path: str) -> str:
+    with open(path, 'rb') as f:
+        data = f.read()
+    if data[:2] in (b'\xff\xfe', b'\xfe\xff'):
+        return data.decode('utf-16')
+    try:
+        return data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return data.decode('latin-1')
+
+class KeyStore:
+    """Keys in file order as one bytearray of 32-byte keys, with a parallel bytearray of 20-byte addresses
+
+    Indexing and iterating yield 0x-prefixed key strings, so the store can stand in for a list of keys.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or KEY_STORE_CONFIG['path']
+        self.index_path = KEY_STORE_CONFIG['index_path']
+        self.keys = bytearray()
+        self.addresses = bytearray()
+        self.positions: Optional[Dict[bytes, int]] = None  # Key -> index, built on first lookup
+        self.by_key: Dict[bytes, str] = {}  # Key -> checksummed address, for file keys and derived ones alike
+        self.load()
+
+    def load(self):
+        """Parse and validate the key file, then fill in addresses from the sidecar or by deriving them"""
+        try:
+            text = _read_text(self.path)
+        except FileNotFoundError:
+            Logger.error(f"{self.path} not found!")
+            return
+        seen: Dict[bytes, int] = {}  # Key -> line it first appeared on
+        for number, line in enumerate(text.splitlines(), 1):
+            if not line.strip() or line.strip().startswith('#'):
+                continue
+            key = parse_key(line)
+            if key is None:
+                Logger.warning(f"{self.path} line {number}: not a valid private key, skipped")
+                continue
+            if key in seen:
+                Logger.warning(f"{self.path} line {number}: duplicate of the key on line {seen[key]}, skipped")
+                continue
+            seen[key] = number
+            self.keys += key
+        self.addresses = bytearray(ADDRESS_SIZE * len(self))
+        cached = self._load_index()
+        missing = []
+        for index in range(len(self)):
+            address = cached.get(_fingerprint(self.key_bytes(index)))
+            if address is None:
+                missing.append(index)
+            else:
+                self.addresses[index * ADDRESS_SIZE:(index + 1) * ADDRESS_SIZE] = address
+        if missing:
+            self._derive(missing)
+            self._save_index()
+        Logger.info(f"Loaded {len(self)} private keys from {self.path} ({len(missing)} addresses derived)")
+
+    def _derive(self, indexes: List[int]):
+        packed = b''.join(self.key_bytes(index) for index in indexes)
+        workers = KEY_STORE_CONFIG['derive_workers'] or os.cpu_count() or 1
+        if workers == 1 or len(indexes) < KEY_STORE_CONFIG['parallel_threshold']:
+            derived = derive_addresses(packed)
+        else:
+            # Pure-Python point multiplication holds the GIL, so spread it over processes
+            size = -(-len(indexes) // workers)
+            chunks = [packed[start * KEY_SIZE:(start + size) * KEY_SIZE] for start in range(0, len(indexes), size)]
+            with concurrent.futures.ProcessPoolExecutor(min(workers, len(chunks))) as executor:
+                derived = b''.join(executor.map(derive_addresses, chunks))
+        for position, index in enumerate(indexes):
+            self.addresses[index * ADDRESS_SIZE:(index + 1) * ADDRESS_SIZE] = derived[position * ADDRESS_SIZE:(position + 1) * ADDRESS_SIZE]
+
+    def _load_index(self) -> Dict[str, bytes]:
+        """Fingerprint -> address from the sidecar; anything unreadable just means deriving again"""
+        try:
+            with open(self.index_path, 'r') as f:
+                index = json.load(f)
+            return {fingerprint: bytes.fromhex(address) for fingerprint, address in index['addresses'].items()}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            Logger.warning(f"Ignoring unreadable address index {self.index_path}: {e}")
+            return {}
+
+    def _save_index(self):
+        index = {'addresses': {_fingerprint(self.key_bytes(i)): self.address_bytes(i).hex() for i in range(len(self))}}
+        temp_path = f"{self.index_path}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(index, f)
+            os.replace(temp_path, self.index_path)
+        except OSError as e:
+            Logger.warning(f"Could not write address index {self.index_path}: {e}")
+
+    def __len__(self) -> int:
+        return len(self.keys) // KEY_SIZE
+
+    def key_bytes(self, index: int) -> bytes:
+        return bytes(self.keys[index * KEY_SIZE:(index + 1) * KEY_SIZE])
+
+    def address_bytes(self, index: int) -> bytes:
+        return bytes(self.addresses[index * ADDRESS_SIZE:(index + 1) * ADDRESS_SIZE])
+
+    def __getitem__(self, index: int) -> str:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("key index out of range")
+        return '0x' + self.key_bytes(index).hex()
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def address(self, index: int) -> str:
+        """Checksummed address of the key at an index"""
+        return to_checksum_address(self.address_bytes(index))
+
+    def items(self) -> Iterator[Tuple[str, str]]:
+        """(private key, address) pairs in file order"""
+        for index in range(len(self)):
+            yield self[index], self.address(index)
+
+    def index_of(self, private_key: str) -> Optional[int]:
+        if self.positions is None:
+            self.positions = {self.key_bytes(index): index for index in range(len(self))}
+        key = parse_key(private_key)
+        return self.positions.get(key) if key is not None else None
+
+    def address_of(self, private_key: str) -> str:
+        """Address of a key; keys not in the file (e.g. passed in PRIVATE_KEY) are derived on first use"""
+        key = parse_key(private_key)
+        if key is None:
+            raise ValueError("Invalid private key")
+        address = self.by_key.get(key)
+        if address is None:
+            index = self.index_of(private_key)
+            address = self.address(index) if index is not None else to_checksum_address(derive_addresses(key))
+            self.by_key[key] = address
+        return address
+
+    def first(self) -> Optional[str]:
+        """First valid key in the file, what the bots use when run on their own"""
+        return self[0] if len(self) else None
+
+_store: Optional[KeyStore] = None
+
+def get_key_store() -> KeyStore:
+    """The process-wide key store, loaded on first use; empty when the key file is missing"""
+    global _store
+    if _store is None:
+        _store = KeyStore()
+    return _store
@@ -76,6 +76,11 @@ class Logger:
         for line in lines:
             print(f"{Colors.BRIGHT_BLACK}  │ {line}{Colors.RESET}")
     
+    @staticmethod
+    def stream(prefix, line):
+        """Log a line of output from a child process"""
+        print(f"{Colors.BRIGHT_BLACK}[{prefix}]{Colors.RESET} {line}")
+
     @staticmethod
     def status(status, message):
         """Log a status update with custom status tag"""
@@ -0,0 +1,299 @@
+"""
+Metrics module keeping per-(endpoint, method) latency histograms and counters for RPC and HTTP API calls,
+plus the fee controller's inclusion latency per tip level, served as Prometheus text and summarized after each cycle
+"""
+import asyncio
+import collections
+from typing import Dict, NamedTuple, Optional, Tuple
+import aiohttp
+from aiohttp import web
+from config import METRICS_CONFIG
+from utils.logger import Logger
+
+SUB_BUCKET_BITS = 7  # 128 sub-buckets per power of two: under 1% relative error
+SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+INCLUSION_BUCKETS = (1, 2, 3, 5, 8, 13, 21)  # Blocks from broadcast to inclusion
+
+def bucket_index(micros: int) -> int:
+    """HDR-style log-linear bucket of a latency in microseconds"""
+    if micros < SUB_BUCKETS:
+        return max(micros, 0)
+    shift = micros.bit_length() - 1 - SUB_BUCKET_BITS
+    return (shift + 1) * SUB_BUCKETS + (micros >> shift) - SUB_BUCKETS
+
+def bucket_value(index: int) -> float:
+    """Midpoint of a bucket, in microseconds"""
+    if index < SUB_BUCKETS:
+        return float(index)
+    shift = index // SUB_BUCKETS - 1
+    lower = (SUB_BUCKETS + index % SUB_BUCKETS) << shift
+    return lower + (1 << shift) / 2
+
+class LatencyHistogram:
+    """Sparse log-linear histogram of latencies; merges exactly, so shard workers can ship theirs home"""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = collections.Counter()
+        self.count = 0
+        self.total = 0.0  # Seconds
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        self.counts[bucket_index(int(seconds * 1e6))] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Latency in seconds below which a share q of the samples fall"""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(bucket_value(index) / 1e6, self.max)
+        return self.max
+
+    def merge(self, other: 'LatencyHistogram'):
+        self.counts.update(other.counts)
+        self.count += other.count
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+class CallStats:
+    def __init__(self):
+        self.latency = LatencyHistogram()
+        self.requests = 0
+        self.errors: Dict[str, int] = collections.Counter()  # Error class -> count
+        self.sent_bytes = 0
+        self.received_bytes = 0
+        self.retries = 0
+
+    def merge(self, other: 'CallStats'):
+        self.latency.merge(other.latency)
+        self.requests += other.requests
+        self.errors.update(other.errors)
+        self.sent_bytes += other.sent_bytes
+        self.received_bytes += other.received_bytes
+        self.retries += other.retries
+
+class InclusionStats:
+    """Blocks to inclusion of transactions whose tip matched one fee history percentile"""
+
+    def __init__(self):
+        self.buckets = [0] * len(INCLUSION_BUCKETS)  # Samples at or below each bound, not cumulative
+        self.count = 0
+        self.total = 0
+
+    def record(self, blocks: int):
+        for index, bound in enumerate(INCLUSION_BUCKETS):
+            if blocks <= bound:
+                self.buckets[index] += 1
+                break
+        self.count += 1
+        self.total += blocks
+
+    def merge(self, other: 'InclusionStats'):
+        self.buckets = [mine + theirs for mine, theirs in zip(self.buckets, other.buckets)]
+        self.count += other.count
+        self.total += other.total
+
+class PriorityFee(NamedTuple):
+    percentile: int  # Fee history percentile the controller is at
+    tip: Optional[int]  # Wei; None before any fee history or node suggestion
+
+class FeeCycle(NamedTuple):
+    inclusions: Dict[int, InclusionStats]  # Percentile -> inclusions since the last take_fee_cycle()
+    priority_fee: Optional[PriorityFee]
+
+def error_class(error: BaseException) -> str:
+    """Coarse class of a failed request, used as the error counter label"""
+    if isinstance(error, asyncio.TimeoutError):
+        return 'timeout'
+    if isinstance(error, aiohttp.ClientResponseError):
+        return 'http_429' if error.status == 429 else f"http_{error.status // 100}xx"
+    if isinstance(error, (aiohttp.ClientPayloadError, aiohttp.ServerDisconnectedError)):
+        return 'truncated'
+    if isinstance(error, aiohttp.ClientConnectionError):
+        return 'connection'
+    if isinstance(error, ValueError):
+        return 'decode'
+    return type(error).__name__
+
+def _label(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics:
+    """Stats per (endpoint, method) since start, plus a second set since the last cycle summary"""
+
+    def __init__(self):
+        self.total: Dict[Tuple[str, str], CallStats] = collections.defaultdict(CallStats)
+        self.cycle: Dict[Tuple[str, str], CallStats] = collections.defaultdict(CallStats)
+        self.inclusions: Dict[int, InclusionStats] = collections.defaultdict(InclusionStats)
+        self.inclusion_cycle: Dict[int, InclusionStats] = collections.defaultdict(InclusionStats)
+        self.priority_fee: Optional[PriorityFee] = None
+        self.runner: Optional[web.AppRunner] = None
+
+    def _both(self, endpoint: str, method: str):
+        return self.total[(endpoint, method)], self.cycle[(endpoint, method)]
+
+    def observe(self, endpoint: str, method: str, seconds: float, sent_bytes: int, received_bytes: int):
+        """A request that got an answer"""
+        for stats in self._both(endpoint, method):
+            stats.requests += 1
+            stats.latency.record(seconds)
+            stats.sent_bytes += sent_bytes
+            stats.received_bytes += received_bytes
+
+    def error(self, endpoint: str, method: str, kind: str, sent_bytes: int = 0, answered: bool = False):
+        """A failed request; answered=True for an answer carrying an error, already counted by observe()"""
+        for stats in self._both(endpoint, method):
+            if not answered:
+                stats.requests += 1
+                stats.sent_bytes += sent_bytes
+            stats.errors[kind] += 1
+
+    def retry(self, endpoint: str, method: str):
+        """A request sent to this endpoint after failing on another"""
+        for stats in self._both(endpoint, method):
+            stats.retries += 1
+
+    def inclusion(self, percentile: int, blocks: int):
+        """A transaction paying the tip of this percentile was included `blocks` after its first broadcast"""
+        for stats in (self.inclusions[percentile], self.inclusion_cycle[percentile]):
+            stats.record(blocks)
+
+    def fee_level(self, percentile: int, tip: Optional[int]):
+        """The priority fee the controller currently chooses"""
+        self.priority_fee = PriorityFee(percentile, tip)
+
+    def take_fee_cycle(self) -> FeeCycle:
+        """Inclusions since the last call and the current priority fee, for a shard worker to ship home"""
+        cycle, self.inclusion_cycle = self.inclusion_cycle, collections.defaultdict(InclusionStats)
+        return FeeCycle(dict(cycle), self.priority_fee)
+
+    def merge_fees(self, fees: FeeCycle):
+        """Fold in the fee cycle of a shard worker process"""
+        for percentile, other in fees.inclusions.items():
+            self.inclusions[percentile].merge(other)
+            self.inclusion_cycle[percentile].merge(other)
+        if fees.priority_fee is not None:
+            self.priority_fee = fees.priority_fee
+
+    def take_cycle(self) -> Dict[Tuple[str, str], CallStats]:
+        """Stats since the last call, starting a new cycle"""
+        cycle, self.cycle = self.cycle, collections.defaultdict(CallStats)
+        return dict(cycle)
+
+    def merge(self, stats: Dict[Tuple[str, str], CallStats]):
+        """Fold in the cycle stats of a shard worker process"""
+        for key, other in stats.items():
+            self.total[key].merge(other)
+            self.cycle[key].merge(other)
+
+    def prometheus(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        lines = [
+            "# HELP monad_bot_request_duration_seconds Latency of answered RPC and HTTP API requests",
+            "# TYPE monad_bot_request_duration_seconds summary",
+        ]
+        items = sorted(self.total.items())
+        for (endpoint, method), stats in items:
+            labels = f'endpoint="{_label(endpoint)}",method="{_label(method)}"'
+            for q in QUANTILES:
+                value = stats.latency.quantile(q)
+                if value is not None:
+                    lines.append(f'monad_bot_request_duration_seconds{{{labels},quantile="{q}"}} {value:.6f}')
+            lines.append(f"monad_bot_request_duration_seconds_sum{{{labels}}} {stats.latency.total:.6f}")
+            lines.append(f"monad_bot_request_duration_seconds_count{{{labels}}} {stats.latency.count}")
+        counters = (
+            ('requests', "Requests sent", lambda stats: stats.requests),
+            ('sent_bytes', "Request body bytes sent", lambda stats: stats.sent_bytes),
+            ('received_bytes', "Response body bytes received", lambda stats: stats.received_bytes),
+            ('retries', "Requests sent to this endpoint after failing on another", lambda stats: stats.retries),
+        )
+        for name, description, value in counters:
+            lines += [f"# HELP monad_bot_{name}_total {description}", f"# TYPE monad_bot_{name}_total counter"]
+            for (endpoint, method), stats in items:
+                lines.append(f'monad_bot_{name}_total{{endpoint="{_label(endpoint)}",method="{_label(method)}"}} {value(stats)}')
+        lines += ["# HELP monad_bot_errors_total Failed requests by error class", "# TYPE monad_bot_errors_total counter"]
+        for (endpoint, method), stats in items:
+            for kind, count in sorted(stats.errors.items()):
+                lines.append(f'monad_bot_errors_total{{endpoint="{_label(endpoint)}",method="{_label(method)}",class="{_label(kind)}"}} {count}')
+        lines += [
+            "# HELP monad_bot_inclusion_blocks Blocks from first broadcast to inclusion, by the fee history percentile the tip matched",
+            "# TYPE monad_bot_inclusion_blocks histogram",
+        ]
+        for percentile, stats in sorted(self.inclusions.items()):
+            cumulative = 0
+            for bound, count in zip(INCLUSION_BUCKETS, stats.buckets):
+                cumulative += count
+                lines.append(f'monad_bot_inclusion_blocks_bucket{{percentile="{percentile}",le="{bound}"}} {cumulative}')
+            lines.append(f'monad_bot_inclusion_blocks_bucket{{percentile="{percentile}",le="+Inf"}} {stats.count}')
+            lines.append(f'monad_bot_inclusion_blocks_sum{{percentile="{percentile}"}} {stats.total}')
+            lines.append(f'monad_bot_inclusion_blocks_count{{percentile="{percentile}"}} {stats.count}')
+        if self.priority_fee is not None and self.priority_fee.tip is not None:
+            lines += [
+                "# HELP monad_bot_priority_fee_wei Priority fee chosen by the fee controller, labelled with its fee history percentile",
+                "# TYPE monad_bot_priority_fee_wei gauge",
+                f'monad_bot_priority_fee_wei{{percentile="{self.priority_fee.percentile}"}} {self.priority_fee.tip}',
+            ]
+        return '\n'.join(lines) + '\n'
+
+    def log_cycle_summary(self):
+        """Log a table of the calls made since the previous summary, slowest total time first"""
+        cycle = self.take_cycle()
+        if not cycle:
+            return
+        Logger.info(f"{'endpoint':<34} {'method':<26} {'calls':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'errors':>7} {'retries':>7} {'KB out':>8} {'KB in':>8}")
+        for (endpoint, method), stats in sorted(cycle.items(), key=lambda item: -item[1].latency.total):
+            p50 = stats.latency.quantile(0.5)
+            p99 = stats.latency.quantile(0.99)
+            Logger.info(
+                f"{endpoint[-34:]:<34} {method[:26]:<26} {stats.requests:>6} "
+                f"{p50 * 1000 if p50 is not None else 0:>8.1f} {p99 * 1000 if p99 is not None else 0:>8.1f} {stats.latency.max * 1000:>8.1f} "
+                f"{sum(stats.errors.values()):>7} {stats.retries:>7} {stats.sent_bytes / 1024:>8.1f} {stats.received_bytes / 1024:>8.1f}"
+            )
+            if stats.errors:
+                Logger.info(f"{'':<34} {'':<26} errors: {', '.join(f'{kind} {count}' for kind, count in sorted(stats.errors.items()))}")
+
+    async def serve(self, host: str, port: int):
+        """Serve GET /metrics on host:port until stop()"""
+        async def handle(request: web.Request) -> web.Response:
+            return web.Response(text=self.prometheus(), content_type='text/plain', charset='utf-8', headers={'X-Content-Type-Options': 'nosniff'})
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, host, port).start()
+        except OSError as e:
+            Logger.warning(f"Metrics endpoint not started on {host}:{port}: {e}")
+            await self.stop()
+            return
+        Logger.info(f"Metrics at http://{host}:{port}/metrics")
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+_metrics: Optional[Metrics] = None
+
+def get_metrics() -> Metrics:
+    """The process-wide metrics registry"""
+    global _metrics
+    if _metrics is None:
+        _metrics = Metrics()
+    return _metrics
+
+async def start_metrics_server() -> Metrics:
+    """Start the Prometheus endpoint if METRICS_CONFIG enables it"""
+    metrics = get_metrics()
+    if METRICS_CONFIG['enabled'] and metrics.runner is None:
+        await metrics.serve(METRICS_CONFIG['host'], METRICS_CONFIG['port'])
+    return metrics
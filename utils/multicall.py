@@ -0,0 +1,99 @@
+"""
+Multicall module for aggregating many view calls into a few Multicall3 aggregate3 calls
+"""
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+from eth_abi import decode, encode
+from eth_utils import function_signature_to_4byte_selector, to_checksum_address
+from web3 import AsyncWeb3
+from config import RPC_CONFIG
+from utils.logger import Logger
+
+AGGREGATE3_SELECTOR = function_signature_to_4byte_selector('aggregate3((address,bool,bytes)[])')
+
+class Call(NamedTuple):
+    target: str
+    data: bytes
+    output_types: Tuple[str, ...] = ()  # Decode the return data with these ABI types if given
+
+class CallResult(NamedTuple):
+    success: bool
+    data: bytes
+    value: Any = None  # Decoded return value (a single value or a tuple), None if not decoded
+
+def encode_call(signature: str, arg_types: Sequence[str] = (), args: Sequence[Any] = ()) -> bytes:
+    """Encode calldata for a function signature like 'balanceOf(address)'"""
+    return function_signature_to_4byte_selector(signature) + encode(list(arg_types), list(args))
+
+class MulticallReader:
+    def __init__(self, w3: AsyncWeb3, address: Optional[str] = None, chunk_size: Optional[int] = None):
+        self.w3 = w3
+        self.address = to_checksum_address(address or RPC_CONFIG['multicall_address'])
+        self.chunk_size = chunk_size or RPC_CONFIG['multicall_chunk_size']
+
+    def _request(self, calls: Sequence[Call]) -> Tuple[str, Any]:
+        calldata = AGGREGATE3_SELECTOR + encode(
+            ['(address,bool,bytes)[]'],
+            [[(call.target, True, call.data) for call in calls]],
+        )
+        return ('eth_call', [{'to': self.address, 'data': '0x' + calldata.hex()}, 'latest'])
+
+    @staticmethod
+    def _decode(call: Call, success: bool, data: bytes) -> CallResult:
+        if not success or not call.output_types:
+            return CallResult(success, data)
+        try:
+            values = decode(list(call.output_types), data)
+        except Exception:
+            return CallResult(False, data)
+        return CallResult(True, data, values[0] if len(values) == 1 else values)
+
+    async def _run_chunks(self, chunks: List[Sequence[Call]]) -> List[List[CallResult]]:
+        responses = await self.w3.provider.make_batch_request([self._request(chunk) for chunk in chunks])
+        results = []
+        for chunk, response in zip(chunks, responses):
+            if response.get('result') == '0x':
+                raise ValueError(f"No Multicall3 contract at {self.address}")
+            if 'error' in response or not response.get('result'):
+                # The whole aggregate reverted or was too large: retry in halves until single calls
+                if len(chunk) == 1:
+                    results.append([CallResult(False, b'')])
+                    continue
+                middle = len(chunk) // 2
+                halves = await self._run_chunks([chunk[:middle], chunk[middle:]])
+                results.append(halves[0] + halves[1])
+                continue
+            (returned,) = decode(['(bool,bytes)[]'], bytes.fromhex(response['result'][2:]))
+            results.append([self._decode(call, success, data) for call, (success, data) in zip(chunk, returned)])
+        return results
+
+    async def aggregate(self, calls: Sequence[Call]) -> List[CallResult]:
+        """Run every call through aggregate3, chunked and sent as one batch request
+
+        Each call may fail on its own without affecting the others.
+        """
+        if not calls:
+            return []
+        chunks = [calls[i:i + self.chunk_size] for i in range(0, len(calls), self.chunk_size)]
+        return [result for chunk_results in await self._run_chunks(chunks) for result in chunk_results]
+
+    async def eth_balances(self, addresses: Sequence[str]) -> Dict[str, Optional[int]]:
+        """Native balance of every address (None where the call failed)"""
+        calls = [Call(self.address, encode_call('getEthBalance(address)', ['address'], [address]), ('uint256',)) for address in addresses]
+        return {address: result.value for address, result in zip(addresses, await self.aggregate(calls))}
+
+    async def token_balances(self, token: str, addresses: Sequence[str]) -> Dict[str, Optional[int]]:
+        """ERC-20/721 balanceOf for every address (None where the call failed)"""
+        token = to_checksum_address(token)
+        calls = [Call(token, encode_call('balanceOf(address)', ['address'], [address]), ('uint256',)) for address in addresses]
+        return {address: result.value for address, result in zip(addresses, await self.aggregate(calls))}
+
+async def balance_snapshot(w3: AsyncWeb3, addresses: Sequence[str], min_balance: float = 0) -> Dict[str, Optional[int]]:
+    """Read the native balance of every wallet in one pass and log a summary"""
+    balances = await MulticallReader(w3).eth_balances(addresses)
+    known = [balance for balance in balances.values() if balance is not None]
+    low = [address for address, balance in balances.items() if balance is not None and balance < w3.to_wei(min_balance, 'ether')]
+    Logger.info(
+        f"Balance snapshot: {len(addresses)} wallets, total {w3.from_wei(sum(known), 'ether'):.4f} MON"
+        f", {len(low)} below {min_balance} MON, {len(addresses) - len(known)} unreadable"
+    )
+    return balances
@@ -0,0 +1,77 @@
+"""
+Nonce manager module for handing out transaction nonces locally so one wallet can pipeline transactions
+"""
+import asyncio
+import weakref
+from typing import Dict, Optional
+from web3 import AsyncWeb3
+from web3.exceptions import Web3RPCError
+
+# Node errors meaning our local nonce no longer matches the chain
+NONCE_ERRORS = ('nonce too low', 'nonce is too low', 'invalid nonce', 'nonce too high', 'replacement transaction underpriced')
+# Node errors meaning this exact transaction was already accepted (e.g. through another endpoint)
+KNOWN_ERRORS = ('already known', 'known transaction', 'already imported')
+
+def error_text(error: Exception) -> str:
+    """Lower-cased message of a node error, whichever form web3 raised it in"""
+    if isinstance(error, Web3RPCError) and error.rpc_response:
+        return str(error.rpc_response.get('error', {}).get('message', error)).lower()
+    message = error.args[0] if error.args else error
+    if isinstance(message, dict):
+        message = message.get('message', message)
+    return str(message).lower()
+
+class NonceManager:
+    def __init__(self, w3: AsyncWeb3, address: str):
+        self.client = weakref.ref(w3)
+        self.address = address
+        self.lock = asyncio.Lock()
+        self.next_nonce: Optional[int] = None
+
+    @property
+    def w3(self) -> AsyncWeb3:
+        w3 = self.client()
+        if w3 is None:
+            raise RuntimeError("The AsyncWeb3 client is gone")
+        return w3
+
+    async def sync(self) -> int:
+        """Reload the next nonce from the node's pending transaction count"""
+        self.next_nonce = await self.w3.eth.get_transaction_count(self.address, 'pending')
+        return self.next_nonce
+
+    async def allocate(self) -> int:
+        """Hand out the next nonce, syncing from the node only when nothing is cached"""
+        async with self.lock:
+            if self.next_nonce is None:
+                await self.sync()
+            nonce = self.next_nonce
+            self.next_nonce += 1
+            return nonce
+
+    async def release(self, nonce: int):
+        """Give back a nonce whose transaction never reached the node"""
+        async with self.lock:
+            if self.next_nonce is not None and nonce == self.next_nonce - 1:
+                self.next_nonce = nonce
+            else:
+                # Later nonces are already out; resync rather than leave a gap that stalls them
+                self.next_nonce = None
+
+    async def reset(self):
+        """Forget the cached nonce so the next allocation resyncs, e.g. after a dropped transaction
+
+        Waits for an allocation in progress, so the nonce it hands out is not forgotten halfway.
+        """
+        async with self.lock:
+            self.next_nonce = None
+
+_managers: 'weakref.WeakKeyDictionary[AsyncWeb3, Dict[str, NonceManager]]' = weakref.WeakKeyDictionary()
+
+def get_nonce_manager(w3: AsyncWeb3, address: str) -> NonceManager:
+    """The nonce manager shared by every bot sending from this wallet on this client"""
+    managers = _managers.setdefault(w3, {})
+    manager = managers.get(address.lower())
+    if manager is None:
+        manager = managers[address.lower()] = NonceManager(w3, address)
+    return manager
@@ -0,0 +1,76 @@
+"""
+Preflight module for fetching everything needed to build a transaction in one batched round trip
+"""
+import asyncio
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from web3 import AsyncWeb3
+from utils.fee_oracle import get_fee_oracle
+from utils.gas_profile import get_gas_profile
+
+# Transaction fields sent to the node as hex quantities
+QUANTITY_FIELDS = ('value', 'gas', 'gasPrice', 'maxFeePerGas', 'maxPriorityFeePerGas', 'nonce')
+
+class Preflight(NamedTuple):
+    block_number: int
+    base_fee: Optional[int]  # None on chains without EIP-1559
+    priority_fee: Optional[int]
+    gas_price: int
+    balance: int
+    gas_estimate: Optional[int]  # None if no transaction was given or estimation failed
+    estimate_error: Optional[str]
+
+def to_rpc_transaction(transaction: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert a transaction dict to the JSON-RPC call object used by eth_estimateGas"""
+    call = {}
+    for field in ('from', 'to', 'data', 'value'):
+        if transaction.get(field) is not None:
+            value = transaction[field]
+            call[field] = hex(value) if field in QUANTITY_FIELDS else value
+    return call
+
+def _quantity(response: Dict[str, Any]) -> Optional[int]:
+    result = response.get('result')
+    return int(result, 16) if isinstance(result, str) else None
+
+def _error(response: Dict[str, Any]) -> Optional[str]:
+    error = response.get('error')
+    if error is None:
+        return None
+    return error.get('message', str(error)) if isinstance(error, dict) else str(error)
+
+async def preflight(w3: AsyncWeb3, address: str, transaction: Optional[Dict[str, Any]] = None) -> Preflight:
+    """Fetch balance and optionally a gas estimate in a single batch request, with fees from the fee oracle
+
+    Nonces are not part of the preflight; utils.nonce_manager hands them out when the transaction is sent.
+    Fee fields are left out of the estimate so it does not depend on the fees being computed here.
+    Calls with a limit learned in the gas profile skip eth_estimateGas altogether.
+    Raises ValueError if the balance read fails; a failed estimate is reported in
+    estimate_error instead so callers can fall back to a default gas limit.
+    """
+    profile = get_gas_profile()
+    learned = profile.estimate(transaction) if profile is not None and transaction is not None else None
+    requests: List[Tuple[str, Any]] = [('eth_getBalance', [address, 'latest'])]
+    if transaction is not None and learned is None:
+        requests.append(('eth_estimateGas', [to_rpc_transaction(transaction)]))
+
+    fees, responses = await asyncio.gather(
+        get_fee_oracle(w3).get_fee_data(),
+        w3.provider.make_batch_request(requests),
+    )
+    if responses[0].get('result') is None:
+        raise ValueError(f"eth_getBalance failed: {_error(responses[0]) or 'empty result'}")
+
+    estimate = responses[1] if len(responses) > 1 else {}
+    if learned is not None:
+        estimate = {'result': hex(learned)}
+    elif profile is not None and _quantity(estimate) is not None:
+        profile.record_estimate(transaction, _quantity(estimate))
+    return Preflight(
+        block_number=fees.block_number,
+        base_fee=fees.base_fee,
+        priority_fee=fees.priority_fee,
+        gas_price=fees.gas_price,
+        balance=_quantity(responses[0]),
+        gas_estimate=_quantity(estimate),
+        estimate_error=_error(estimate),
+    )
@@ -0,0 +1,74 @@
+"""
+Process supervisor module for running bot scripts as non-blocking subprocesses
+"""
+import asyncio
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+from utils.logger import Logger
+
+# Exit code reported for runs that were killed after hitting the timeout
+TIMEOUT_EXIT_CODE = -9
+
+class ProcessSupervisor:
+    def __init__(self, timeout: Optional[float] = None, max_processes: Optional[int] = None):
+        self.timeout = timeout or None
+        self.semaphore = asyncio.Semaphore(max_processes) if max_processes else None
+        self.running: Dict[int, str] = {}
+        self.exit_codes: List[Tuple[str, int]] = []
+
+    async def _stream_output(self, process: asyncio.subprocess.Process, prefix: str):
+        """Forward the child's output line by line with a prefix"""
+        while True:
+            try:
+                line = await process.stdout.readline()
+            except ValueError:
+                # Line longer than the stream limit, forward what is buffered
+                line = await process.stdout.read(64 * 1024)
+            if not line:
+                break
+            Logger.stream(prefix, line.decode(errors='replace').rstrip())
+
+    async def _supervise(self, process: asyncio.subprocess.Process, prefix: str) -> int:
+        """Forward the child's output until it closes, then wait for it to exit"""
+        await self._stream_output(process, prefix)
+        return await process.wait()
+
+    async def _run(self, script_name: str, env: Optional[dict], prefix: str) -> int:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, '-u', script_name,
+            env=env,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT,
+            limit=1024 * 1024,
+        )
+        self.running[process.pid] = prefix
+        try:
+            # A child that closes its output but keeps running counts against the timeout too
+            return await asyncio.wait_for(self._supervise(process, prefix), self.timeout)
+        except asyncio.TimeoutError:
+            Logger.error(f"[{prefix}] Timed out after {self.timeout} seconds, killing process {process.pid}")
+            process.kill()
+            await process.wait()
+            return TIMEOUT_EXIT_CODE
+        except asyncio.CancelledError:
+            process.kill()
+            await process.wait()
+            raise
+        finally:
+            self.running.pop(process.pid, None)
+
+    async def run(self, script_name: str, env: Optional[dict] = None, prefix: Optional[str] = None) -> int:
+        """Run a script in a child process and return its exit code"""
+        prefix = prefix or os.path.basename(script_name)
+        if self.semaphore is None:
+            exit_code = await self._run(script_name, env, prefix)
+        else:
+            async with self.semaphore:
+                exit_code = await self._run(script_name, env, prefix)
+        self.exit_codes.append((prefix, exit_code))
+        return exit_code
+
+    async def run_many(self, runs: List[Tuple[str, Optional[dict], str]]) -> List[int]:
+        """Run several (script, env, prefix) jobs at once and collect their exit codes"""
+        return await asyncio.gather(*(self.run(script, env, prefix) for script, env, prefix in runs))
@@ -0,0 +1,166 @@
+"""
+Receipt tracker module watching new blocks once on behalf of every pending transaction
+"""
+import asyncio
+import time
+import weakref
+from typing import Any, Dict, Iterable, Optional, Set
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+from web3._utils.method_formatters import receipt_formatter
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted
+from config import RPC_CONFIG
+from utils.fee_oracle import get_fee_oracle
+from utils.logger import Logger
+
+def tx_key(tx_hash: Any) -> str:
+    """Normalised 0x-prefixed lower-case form of a transaction hash"""
+    return '0x' + bytes(HexBytes(tx_hash)).hex()
+
+class ReceiptTracker:
+    def __init__(self, w3: AsyncWeb3, poll_interval: Optional[float] = None, max_block_scan: Optional[int] = None):
+        self.client = weakref.ref(w3)
+        self.poll_interval = poll_interval or RPC_CONFIG['receipt_poll_interval']
+        self.max_block_scan = max_block_scan or RPC_CONFIG['receipt_max_block_scan']
+        self.pending: Dict[str, asyncio.Future] = {}
+        self.waiters: Dict[str, int] = {}  # Number of callers waiting on each pending hash
+        self.unchecked: Set[str] = set()  # Registered since the last poll, possibly mined already
+        self.last_block: Optional[int] = None
+        self.last_recheck = 0.0
+        self.pushed_head: Optional[int] = None  # Newest head pushed by the WebSocket feed since the last poll
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def w3(self) -> AsyncWeb3:
+        w3 = self.client()
+        if w3 is None:
+            raise RuntimeError("The AsyncWeb3 client is gone")
+        return w3
+
+    def on_new_head(self, head: Dict[str, Any]):
+        """Poll right away for a block pushed by the WebSocket feed, without asking for the head number"""
+        number = head['number'] if isinstance(head['number'], int) else int(head['number'], 16)
+        if self.pushed_head is None or number > self.pushed_head:
+            self.pushed_head = number
+        self.wakeup.set()
+
+    def _resolve(self, key: str, receipt: AttributeDict):
+        future = self.pending.pop(key, None)
+        if future is not None and not future.done():
+            future.set_result(receipt)
+
+    async def _fetch_receipts(self, keys: Iterable[str]) -> Set[str]:
+        """Fetch receipts in one batch, resolving waiters; returns the hashes that have no receipt yet"""
+        keys = sorted(keys)
+        responses = await self.w3.provider.make_batch_request([('eth_getTransactionReceipt', [key]) for key in keys])
+        missing = set()
+        for key, response in zip(keys, responses):
+            result = response.get('result')
+            if result:
+                self._resolve(key, AttributeDict.recursive(receipt_formatter(result)))
+            else:
+                missing.add(key)
+        return missing
+
+    async def _mined_in(self, first: int, head: int) -> Set[str]:
+        """Pending hashes included in blocks first..head, read as one batch of transaction hash lists"""
+        responses = await self.w3.provider.make_batch_request(
+            [('eth_getBlockByNumber', [hex(number), False]) for number in range(first, head + 1)]
+        )
+        mined = set()
+        for response in responses:
+            block = response.get('result')
+            if block is None:
+                # Block not served yet by this endpoint: fall back to asking for every receipt
+                return set(self.pending)
+            mined.update(tx.lower() for tx in block['transactions'] if isinstance(tx, str))
+        # The newest header also carries the base fee for the next transactions
+        get_fee_oracle(self.w3).on_new_head(block)
+        return mined & set(self.pending)
+
+    async def poll(self):
+        """Check blocks mined since the last poll against the pending hashes"""
+        head, self.pushed_head = self.pushed_head, None
+        if head is None:
+            head = await self.w3.eth.block_number
+        unchecked, self.unchecked = self.unchecked, set()
+        mined: Set[str] = set()
+        if self.last_block is not None and head > self.last_block:
+            if head - self.last_block > self.max_block_scan:
+                mined = set(self.pending)  # Too far behind to walk every block
+            else:
+                mined = await self._mined_in(self.last_block + 1, head)
+        if self.last_block is None or head > self.last_block:
+            self.last_block = head
+        if time.monotonic() - self.last_recheck > RPC_CONFIG['receipt_recheck']:
+            # Safety net for reorgs and blocks an endpoint skipped
+            mined = set(self.pending)
+            self.last_recheck = time.monotonic()
+
+        candidates = (unchecked | mined) & set(self.pending)
+        if candidates:
+            missing = await self._fetch_receipts(candidates)
+            # Mined but the receipt is not indexed yet: ask again on the next poll
+            self.unchecked.update(missing & mined)
+
+    async def _run(self):
+        feed = getattr(self.w3.provider, 'subscriptions', None)
+        handle = None
+        try:
+            if feed is not None:
+                handle = await feed.subscribe('newHeads', callback=self.on_new_head)
+            while self.pending:
+                self.wakeup.clear()
+                try:
+                    await self.poll()
+                except Exception as e:
+                    Logger.warning(f"Receipt tracker poll failed: {e}")
+                # A pushed head ends the wait early; without one this is a plain polling interval
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            # Blocks are not watched while nothing is pending; the next waiter starts from a fresh head.
+            # Cleared before unsubscribing, so a waiter arriving meanwhile starts its own run.
+            self.last_block = None
+            self.task = None
+            if handle is not None:
+                await feed.unsubscribe(handle)
+
+    async def wait(self, tx_hash: Any, timeout: float = 300) -> AttributeDict:
+        """Wait until the transaction is mined and return its receipt
+
+        Raises web3's TimeExhausted after `timeout` seconds, like wait_for_transaction_receipt.
+        """
+        key = tx_key(tx_hash)
+        future = self.pending.get(key)
+        if future is None:
+            future = self.pending[key] = asyncio.get_running_loop().create_future()
+            self.unchecked.add(key)
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            raise TimeExhausted(f"Transaction {key} is not in the chain after {timeout} seconds")
+        finally:
+            # Stop watching a hash once its last waiter timed out or was cancelled
+            self.waiters[key] -= 1
+            if not self.waiters[key]:
+                del self.waiters[key]
+                if not future.done() and self.pending.get(key) is future:
+                    del self.pending[key]
+                    self.unchecked.discard(key)
+
+_trackers: 'weakref.WeakKeyDictionary[AsyncWeb3, ReceiptTracker]' = weakref.WeakKeyDictionary()
+
+def get_receipt_tracker(w3: AsyncWeb3) -> ReceiptTracker:
+    """The receipt tracker shared by every bot using this client"""
+    tracker = _trackers.get(w3)
+    if tracker is None:
+        tracker = _trackers[w3] = ReceiptTracker(w3)
+    return tracker
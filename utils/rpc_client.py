@@ -0,0 +1,371 @@
+"""
+RPC client module providing shared AsyncWeb3 clients over one pooled aiohttp session
+"""
+import asyncio
+import json
+import ssl
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
+import aiohttp
+from web3 import AsyncWeb3
+from web3.providers.async_base import AsyncJSONBaseProvider
+from web3.types import RPCEndpoint, RPCResponse
+from config import RPC_CONFIG
+from utils.cassette import get_cassette
+from utils.endpoint_pool import Endpoint, EndpointPool
+from utils.fee_oracle import get_fee_oracle
+from utils.logger import Logger
+from utils.metrics import error_class, get_metrics
+from utils.timings import timed
+from utils.tracing import annotate, fail
+from utils.ws_subscriptions import SubscriptionFeed
+
+REQUEST_HEADERS = {
+    'Content-Type': 'application/json',
+    'Accept': 'application/json',
+    'User-Agent': 'Mozilla/5.0',
+}
+
+# Reads that give the same answer from any endpoint, safe to send twice when hedging
+HEDGED_METHODS = {
+    'eth_blockNumber', 'eth_chainId', 'eth_gasPrice', 'eth_maxPriorityFeePerGas', 'eth_feeHistory',
+    'eth_getBlockByNumber', 'eth_getBalance', 'eth_getTransactionCount', 'eth_getCode',
+    'eth_call', 'eth_estimateGas', 'eth_getTransactionReceipt',
+}
+# Writes broadcast to every healthy endpoint at once when hedging
+BROADCAST_METHODS = {'eth_sendRawTransaction'}
+
+TRANSPORT_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError)
+# A garbled or truncated answer (json/unicode decode errors are ValueErrors) fails the endpoint like a dropped connection
+ENDPOINT_ERRORS = TRANSPORT_ERRORS + (ValueError,)
+
+_session: Optional[aiohttp.ClientSession] = None
+_session_loop: Optional[asyncio.AbstractEventLoop] = None
+_ssl_context: Optional[ssl.SSLContext] = None
+_clients: Dict[Tuple[Tuple[str, ...], Optional[int]], AsyncWeb3] = {}
+_feeds: Dict[Tuple[str, ...], SubscriptionFeed] = {}
+
+def get_ssl_context() -> ssl.SSLContext:
+    """One TLS context for every connection so certificates are loaded only once"""
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+def get_session() -> aiohttp.ClientSession:
+    """Get the pooled aiohttp session shared by every RPC and HTTP API call"""
+    global _session, _session_loop
+    loop = asyncio.get_running_loop()
+    if _session is None or _session.closed or _session_loop is not loop:
+        if _session_loop is not loop:
+            # Clients, their probe tasks and WebSocket feeds belong to the old loop
+            _clients.clear()
+            _feeds.clear()
+        connector = aiohttp.TCPConnector(
+            limit=RPC_CONFIG['pool_size'],
+            limit_per_host=RPC_CONFIG['pool_per_host'],
+            keepalive_timeout=RPC_CONFIG['keepalive'],
+            ttl_dns_cache=300,
+            ssl=get_ssl_context(),
+        )
+        _session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=aiohttp.ClientTimeout(total=RPC_CONFIG['timeout']),
+        )
+        _session_loop = loop
+    return _session
+
+async def close_session():
+    """Close the shared session, e.g. before the event loop shuts down"""
+    global _session
+    for w3 in _clients.values():
+        w3.provider.pool.stop()
+    _clients.clear()
+    for feed in _feeds.values():
+        feed.stop()
+    _feeds.clear()
+    if _session is not None and not _session.closed:
+        await _session.close()
+    _session = None
+
+class PooledHTTPProvider(AsyncJSONBaseProvider):
+    """AsyncWeb3 provider that sends each request to the best endpoint in the pool, failing over on errors"""
+
+    def __init__(self, pool: EndpointPool, subscriptions: Optional[SubscriptionFeed] = None):
+        super().__init__()
+        self.pool = pool
+        self.subscriptions = subscriptions  # WebSocket push feed, None when polling over HTTP only
+
+    def __str__(self) -> str:
+        return f"Pooled RPC connection {[endpoint.url for endpoint in self.pool.endpoints]}"
+
+    @property
+    def endpoint_uri(self) -> str:
+        return self.pool.ranked()[0].url
+
+    async def _post(self, endpoint: Endpoint, method: str, request_data: bytes) -> Any:
+        """POST a request body and decode the answer, recording the outcome on the endpoint"""
+        session = get_session()
+        started = time.perf_counter()
+        try:
+            async with session.post(endpoint.url, data=request_data, headers=REQUEST_HEADERS) as response:
+                response.raise_for_status()
+                body = await response.read()
+            decoded = self.decode_rpc_response(body)
+        except ENDPOINT_ERRORS as e:
+            endpoint.record_failure()
+            get_metrics().error(endpoint.url, method, error_class(e), len(request_data))
+            raise
+        elapsed = time.perf_counter() - started
+        endpoint.record_success(elapsed)
+        get_metrics().observe(endpoint.url, method, elapsed, len(request_data), len(body))
+        annotate(endpoint=endpoint.url)
+        return decoded
+
+    async def _send(self, endpoint: Endpoint, method: RPCEndpoint, request_data: bytes) -> RPCResponse:
+        try:
+            response = await self._post(endpoint, method, request_data)
+        except ENDPOINT_ERRORS as e:
+            # Out of rotation until the next health probe succeeds
+            endpoint.healthy = False
+            Logger.warning(f"RPC {endpoint.url} failed on {method}: {e or type(e).__name__}")
+            raise
+        if 'error' in response:
+            get_metrics().error(endpoint.url, method, 'rpc_error', answered=True)
+            fail(response['error'].get('message') if isinstance(response['error'], dict) else response['error'])
+        return response
+
+    def hedge_delay(self, endpoint: Endpoint) -> float:
+        """How long to wait on an endpoint before asking a second one"""
+        delay = endpoint.percentile(RPC_CONFIG['hedge_percentile'])
+        if delay is None:
+            delay = RPC_CONFIG['hedge_delay']
+        return max(delay, RPC_CONFIG['hedge_min_delay'])
+
+    async def _race(self, endpoints: List[Endpoint], method: RPCEndpoint, request_data: bytes, delay: float) -> RPCResponse:
+        """Start the request on each endpoint in turn, `delay` seconds apart, and return the first good answer
+
+        A JSON-RPC error only wins once every endpoint has answered, so a broadcast that
+        one node already knows about still returns the hash from the node that accepted it.
+        """
+        pending = set()
+        error_response: Optional[RPCResponse] = None
+        last_error: Optional[Exception] = None
+        queue = list(endpoints)
+        try:
+            while queue or pending:
+                if queue:
+                    pending.add(asyncio.ensure_future(self._send(queue.pop(0), method, request_data)))
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=delay if queue else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        continue
+                    response = task.result()
+                    if 'error' not in response or method not in BROADCAST_METHODS:
+                        return response
+                    error_response = error_response or response
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if error_response is not None:
+            return error_response
+        raise last_error or ConnectionError("no healthy RPC endpoint")
+
+    @property
+    def scope(self) -> str:
+        """The endpoints behind this provider, telling apart recorded traffic of different chains"""
+        return ','.join(endpoint.url for endpoint in self.pool.endpoints)
+
+    async def make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        with timed('rpc', method):
+            cassette = get_cassette()
+            if cassette is None:
+                response = await self._make_request(method, params)
+            elif cassette.replaying:
+                response = await self._replay(cassette, method, params)
+            else:
+                started = time.perf_counter()
+                response = await self._make_request(method, params)
+                cassette.record('rpc', self.scope, method, params, response, time.perf_counter() - started)
+            if method == 'eth_sendRawTransaction' and 'result' in response:
+                annotate(tx_hash=response['result'])
+            return response
+
+    async def _replay(self, cassette, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_id = next(self.request_counter)
+        response = await cassette.replay('rpc', self.scope, method, params)
+        if response is None:
+            return {'jsonrpc': '2.0', 'id': request_id, 'error': {'code': -32000, 'message': f"{method} not in cassette"}}
+        return dict(response, id=request_id)
+
+    async def _make_request(self, method: RPCEndpoint, params: Any) -> RPCResponse:
+        request_data = self.encode_rpc_request(method, params)
+        if RPC_CONFIG['hedge']:
+            healthy = self.pool.healthy()
+            if method in BROADCAST_METHODS and len(healthy) > 1:
+                return await self._race(healthy, method, request_data, 0)
+            if method in HEDGED_METHODS and len(healthy) > 1:
+                try:
+                    return await self._race(healthy[:2], method, request_data, self.hedge_delay(healthy[0]))
+                except ENDPOINT_ERRORS:
+                    pass  # both failed, fall back to walking the whole pool
+
+        last_error: Optional[Exception] = None
+        for attempt, endpoint in enumerate(self.pool.ranked()):
+            if attempt:
+                get_metrics().retry(endpoint.url, method)
+            try:
+                return await self._send(endpoint, method, request_data)
+            except ENDPOINT_ERRORS as e:
+                last_error = e
+        # Nothing was tried when the pool has no endpoint left to rank
+        raise last_error or ConnectionError("no healthy RPC endpoint")
+
+    async def _send_batch(self, endpoint: Endpoint, requests: List[Tuple[RPCEndpoint, Any]]) -> Optional[List[RPCResponse]]:
+        """POST one JSON array batch, or return None if the endpoint does not accept batches"""
+        try:
+            response = await self._post(endpoint, 'batch', self.encode_batch_rpc_request(requests))
+        except ENDPOINT_ERRORS as e:
+            if isinstance(e, aiohttp.ClientResponseError) and e.status in (400, 405, 413, 415):
+                # Some endpoints answer a JSON array body with an HTTP client error
+                response = None
+            else:
+                endpoint.healthy = False
+                Logger.warning(f"RPC {endpoint.url} failed on batch request: {e or type(e).__name__}")
+                raise
+        if not isinstance(response, list) or len(response) != len(requests):
+            Logger.warning(f"RPC {endpoint.url} rejected a batch request, sending calls one by one from now on")
+            endpoint.batch_supported = False
+            return None
+        return sorted(response, key=lambda item: item.get('id', 0))
+
+    async def make_batch_request(self, requests: List[Tuple[RPCEndpoint, Any]]) -> List[RPCResponse]:
+        """Send several calls in as few round trips as possible, returning one response per call in order
+
+        Calls go out as JSON-RPC batches of at most RPC_CONFIG['batch_size'] calls. Endpoints that
+        reject batches get the calls individually and concurrently instead.
+        """
+        with timed('rpc', 'batch'):
+            cassette = get_cassette()
+            if cassette is None:
+                return await self._make_batch_request(requests)
+            if cassette.replaying:
+                # Replayed call by call, concurrently, so the delays overlap like one round trip
+                return list(await asyncio.gather(*(self._replay(cassette, method, params) for method, params in requests)))
+            started = time.perf_counter()
+            responses = await self._make_batch_request(requests)
+            for (method, params), response in zip(requests, responses):
+                cassette.record('rpc', self.scope, method, params, response, time.perf_counter() - started)
+            return responses
+
+    async def _make_batch_request(self, requests: List[Tuple[RPCEndpoint, Any]]) -> List[RPCResponse]:
+        responses: List[RPCResponse] = []
+        size = RPC_CONFIG['batch_size']
+        for start in range(0, len(requests), size):
+            chunk = requests[start:start + size]
+            for endpoint in self.pool.ranked():
+                if not endpoint.batch_supported:
+                    continue
+                try:
+                    batch = await self._send_batch(endpoint, chunk)
+                except ENDPOINT_ERRORS:
+                    continue
+                if batch is not None:
+                    responses.extend(batch)
+                    break
+            else:
+                responses.extend(await asyncio.gather(*(self._make_request(method, params) for method, params in chunk)))
+        return responses
+
+async def get_web3(rpc_urls: Optional[List[str]] = None, chain_id: Optional[int] = None) -> Optional[AsyncWeb3]:
+    """Get an AsyncWeb3 client routed over a health-probed pool of the given URLs, reused across calls"""
+    rpc_urls = tuple(rpc_urls or RPC_CONFIG['urls'])
+    key = (rpc_urls, chain_id)
+    get_session()  # drops clients left over from a previous event loop
+    if key in _clients:
+        return _clients[key]
+
+    pool = EndpointPool(list(rpc_urls), get_session, chain_id)
+    cassette = get_cassette()
+    if cassette is not None and cassette.replaying:
+        # Nothing to probe offline: every endpoint answers from the cassette
+        for endpoint in pool.endpoints:
+            endpoint.healthy = True
+            endpoint.chain_id = chain_id
+        _clients[key] = w3 = AsyncWeb3(PooledHTTPProvider(pool))
+        return w3
+
+    with timed('connect', ','.join(rpc_urls)):
+        await pool.probe_all()
+    healthy = pool.healthy()
+    if not healthy:
+        Logger.error("Cannot connect to any RPC")
+        return None
+
+    Logger.success(f"Connected to RPC: {healthy[0].url} ({len(healthy)}/{len(rpc_urls)} endpoints healthy)")
+    pool.start()
+    feed = None
+    # Pushed blocks are not recorded, so a recording polls over HTTP the way its replay will
+    if RPC_CONFIG['ws_urls'] and healthy[0].chain_id == RPC_CONFIG['chain_id'] and cassette is None:
+        feed = await get_subscription_feed(RPC_CONFIG['ws_urls'])
+    w3 = AsyncWeb3(PooledHTTPProvider(pool, feed))
+    if feed is not None:
+        # Every new header refreshes the base fee without a request
+        await feed.subscribe('newHeads', callback=get_fee_oracle(w3).on_new_head)
+    _clients[key] = w3
+    return w3
+
+async def get_subscription_feed(ws_urls: List[str]) -> SubscriptionFeed:
+    """Get the WebSocket feed for these URLs, shared by every client of the same chain"""
+    key = tuple(ws_urls)
+    get_session()  # drops feeds left over from a previous event loop
+    if key not in _feeds:
+        feed = SubscriptionFeed(list(ws_urls), get_session)
+        if not await feed.start():
+            # The feed keeps reconnecting in the background; bots poll until it is up
+            Logger.warning(f"WebSocket feed {ws_urls[0]} not connected yet, polling over HTTP meanwhile")
+        _feeds[key] = feed
+    return _feeds[key]
+
+async def http_get_json(url: str, params: Optional[dict] = None, headers: Optional[dict] = None) -> Tuple[int, Any]:
+    """GET an HTTP API through the shared session, returning (status, parsed JSON or raw text)"""
+    parts = urlsplit(url)
+    with timed('http', parts.path):
+        cassette = get_cassette()
+        # Cassettes key on the URL without its query, so a query built into the URL is matched like params
+        endpoint = f"{parts.scheme}://{parts.netloc}{parts.path}"
+        query = dict(parse_qsl(parts.query), **(params or {}))
+        if cassette is not None and cassette.replaying:
+            recorded = await cassette.replay('http', endpoint, 'GET', query)
+            if recorded is None:
+                return 599, f"{url} not in cassette"
+            return recorded['status'], recorded['body']
+        host = f"{parts.scheme}://{parts.netloc}"
+        started = time.perf_counter()
+        try:
+            async with get_session().get(url, params=params, headers=headers) as response:
+                body = await response.read()
+                text = await response.text()
+        except TRANSPORT_ERRORS as e:
+            get_metrics().error(host, parts.path, error_class(e))
+            raise
+        # Request body bytes, as for JSON-RPC posts: a GET sends none
+        get_metrics().observe(host, parts.path, time.perf_counter() - started, 0, len(body))
+        annotate(endpoint=host, status=response.status)
+        if response.status >= 400:
+            get_metrics().error(host, parts.path, 'http_429' if response.status == 429 else f"http_{response.status // 100}xx", answered=True)
+            fail(f"HTTP {response.status}")
+        try:
+            result = response.status, json.loads(text)
+        except ValueError:
+            result = response.status, text
+        if cassette is not None:
+            cassette.record('http', endpoint, 'GET', query, {'status': result[0], 'body': result[1]}, time.perf_counter() - started)
+        return result
@@ -0,0 +1,105 @@
+"""
+Shard runner module for spreading private keys across worker processes
+"""
+import asyncio
+import functools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from config import RUNNER_CONFIG
+from utils.bot_runner import BotRunner
+from utils.logger import Logger
+from utils.metrics import get_metrics
+from utils.rpc_client import close_session
+from utils.worker_pool import AccountWorkerPool
+
+def partition_keys(private_keys: List[str], shards: int) -> List[List[Tuple[int, str]]]:
+    """Split keys into interleaved shards, keeping each key's global index"""
+    shards = max(1, min(shards, len(private_keys)))
+    indexed = list(enumerate(private_keys))
+    return [indexed[i::shards] for i in range(shards)]
+
+def merge_results(results: List[Any]) -> Dict[str, int]:
+    """Add up the per-key result dicts returned by account jobs"""
+    totals = {'keys': 0, 'runs': 0, 'succeeded': 0, 'failed': 0, 'errors': 0}
+    for result in results:
+        totals['keys'] += 1
+        if not isinstance(result, dict):
+            totals['errors'] += 1
+            continue
+        for field in ('runs', 'succeeded', 'failed'):
+            totals[field] += result.get(field, 0)
+    return totals
+
+async def _run_shard(job: Callable, shard_index: int, shard: List[Tuple[int, str]], total_keys: int, concurrency: int, bots: List[Tuple[str, str]]) -> Dict[str, Any]:
+    started = time.time()
+    runner = BotRunner()
+    if RUNNER_CONFIG['mode'] == 'inprocess':
+        runner.preload(bots)
+
+    pool = AccountWorkerPool(concurrency)
+    results = await pool.run_all([
+        (private_key, functools.partial(job, idx, total_keys, private_key, runner=runner))
+        for idx, private_key in shard
+    ])
+
+    await close_session()
+    summary = merge_results(results)
+    summary.update({'shard': shard_index, 'pid': os.getpid(), 'elapsed': time.time() - started})
+    summary['metrics'] = get_metrics().take_cycle()  # Merged into the parent's metrics by ShardedRunner.run
+    summary['fees'] = get_metrics().take_fee_cycle()
+    return summary
+
+def run_shard(job: Callable, shard_index: int, shard: List[Tuple[int, str]], total_keys: int, concurrency: int, bots: List[Tuple[str, str]]) -> Dict[str, Any]:
+    """Process pool entry point: run one shard of keys on its own event loop"""
+    return asyncio.run(_run_shard(job, shard_index, shard, total_keys, concurrency, bots))
+
+class ShardedRunner:
+    def __init__(self, shards: int = 0, bots: Optional[List[Tuple[str, str]]] = None):
+        self.shards = shards if shards > 0 else (os.cpu_count() or 1)
+        self.bots = bots or []
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        """Start the worker processes once and keep them warm between cycles"""
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.shards, mp_context=multiprocessing.get_context('spawn'))
+        return self.executor
+
+    async def run(self, job: Callable, private_keys: List[str], concurrency: int = 1) -> Dict[str, Any]:
+        """Run job(idx, total_keys, private_key, runner=...) for every key across all shards"""
+        started = time.time()
+        shards = partition_keys(private_keys, self.shards)
+        Logger.info(f"Running {len(private_keys)} keys in {len(shards)} shards")
+
+        loop = asyncio.get_running_loop()
+        executor = self.get_executor()
+        shard_results = await asyncio.gather(*(
+            loop.run_in_executor(executor, run_shard, job, i, shard, len(private_keys), concurrency, self.bots)
+            for i, shard in enumerate(shards)
+        ), return_exceptions=True)
+
+        totals = {'keys': 0, 'runs': 0, 'succeeded': 0, 'failed': 0, 'errors': 0, 'shards': []}
+        for i, result in enumerate(shard_results):
+            if isinstance(result, Exception):
+                Logger.error(f"Shard {i} crashed: {result}")
+                totals['keys'] += len(shards[i])
+                totals['errors'] += len(shards[i])
+                continue
+            get_metrics().merge(result.pop('metrics', {}))
+            get_metrics().merge_fees(result.pop('fees'))
+            Logger.status(f"shard {i}", f"{result['keys']} keys, {result['succeeded']}/{result['runs']} bot runs succeeded in {result['elapsed']:.1f}s (pid {result['pid']})")
+            for field in ('keys', 'runs', 'succeeded', 'failed', 'errors'):
+                totals[field] += result[field]
+            totals['shards'].append(result)
+
+        totals['elapsed'] = time.time() - started
+        return totals
+
+    def close(self):
+        """Stop the worker processes"""
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
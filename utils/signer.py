@@ -0,0 +1,128 @@
+"""
+Signer module signing transactions in batches on a worker pool, off the event loop, with cached accounts per key
+"""
+import asyncio
+import atexit
+import concurrent.futures
+import functools
+import multiprocessing
+import os
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+from eth_account import Account
+from eth_account.signers.local import LocalAccount
+from hexbytes import HexBytes
+from config import SIGNER_CONFIG
+from utils.key_store import KEY_SIZE, get_key_store
+from utils.logger import Logger
+from utils.timings import timed
+
+try:
+    # eth_keys signs with coincurve automatically once it is installed: libsecp256k1 in C, GIL released
+    import coincurve  # noqa: F401
+    BACKEND = 'coincurve'
+except ImportError:
+    BACKEND = 'native'
+
+class SignedTx(NamedTuple):
+    raw_transaction: bytes  # Ready for eth_sendRawTransaction
+    hash: HexBytes
+
+@functools.lru_cache(maxsize=None)
+def get_account(private_key: str) -> LocalAccount:
+    """LocalAccount for a key, derived once per process"""
+    return Account.from_key(private_key)
+
+_worker_keys: List[str] = []
+
+def load_worker_keys(packed_keys: bytes):
+    """Process pool initializer: the key store's keys, handed to each worker once instead of with every batch"""
+    global _worker_keys
+    _worker_keys = ['0x' + packed_keys[start:start + KEY_SIZE].hex() for start in range(0, len(packed_keys), KEY_SIZE)]
+
+def sign_many(items: Sequence[Tuple[Dict[str, Any], Union[str, int]]]) -> List[SignedTx]:
+    """Sign a chunk of (transaction, private key or key store index) pairs; runs inside a pool worker"""
+    signed = []
+    for transaction, key in items:
+        private_key = _worker_keys[key] if isinstance(key, int) else key
+        result = get_account(private_key).sign_transaction(transaction)
+        signed.append(SignedTx(bytes(result.raw_transaction), HexBytes(result.hash)))
+    return signed
+
+class TransactionSigner:
+    """Signs on a thread or process pool; sign() calls made in the same loop iteration share one batch
+
+    Process workers are spawned with the key store's keys and are sent key indexes, never the keys.
+    """
+
+    def __init__(self, workers: Optional[int] = None, pool: Optional[str] = None):
+        self.workers = workers or SIGNER_CONFIG['workers'] or os.cpu_count() or 1
+        pool = pool or SIGNER_CONFIG['pool']
+        if pool == 'auto':
+            # Pure-Python signing holds the GIL, so only processes run it in parallel. Shard workers
+            # already spread the keys over every core, so a pool per shard would only oversubscribe them.
+            in_shard = multiprocessing.parent_process() is not None
+            pool = 'process' if BACKEND == 'native' and self.workers > 1 and not in_shard else 'thread'
+        self.pool = pool
+        if pool == 'process':
+            # Spawned rather than forked: this process already runs an event loop and threads
+            self.executor = concurrent.futures.ProcessPoolExecutor(
+                self.workers, mp_context=multiprocessing.get_context('spawn'),
+                initializer=load_worker_keys, initargs=(bytes(get_key_store().keys),),
+            )
+        else:
+            self.executor = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix='signer')
+        self.queue: List[Tuple[Tuple[Dict[str, Any], str], asyncio.Future]] = []
+        Logger.info(f"Signing with the {BACKEND} secp256k1 backend on {self.workers} {pool} worker(s)")
+        if BACKEND == 'native':
+            Logger.info("Install coincurve for several times faster signing")
+
+    async def sign_batch(self, items: Sequence[Tuple[Dict[str, Any], str]]) -> List[SignedTx]:
+        """Sign (transaction, private key) pairs, split evenly across the workers, keeping their order"""
+        if not items:
+            return []
+        loop = asyncio.get_running_loop()
+        if self.pool == 'process':
+            indexes = [get_key_store().index_of(private_key) for _, private_key in items]
+            if None in indexes:
+                # Keys outside the key file (e.g. PRIVATE_KEY) are not sent to the workers; sign here instead
+                return await loop.run_in_executor(None, sign_many, items)
+            items = [(transaction, index) for (transaction, _), index in zip(items, indexes)]
+        size = -(-len(items) // self.workers)
+        chunks = [items[start:start + size] for start in range(0, len(items), size)]
+        results = await asyncio.gather(*(loop.run_in_executor(self.executor, sign_many, chunk) for chunk in chunks))
+        return [signed for chunk in results for signed in chunk]
+
+    async def _flush(self):
+        queue, self.queue = self.queue, []
+        try:
+            signed = await self.sign_batch([item for item, _ in queue])
+        except Exception as e:
+            for _, future in queue:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(queue, signed):
+            if not future.done():
+                future.set_result(result)
+
+    async def sign(self, transaction: Dict[str, Any], private_key: str) -> SignedTx:
+        """Sign one transaction, batched with any others requested in the same loop iteration"""
+        future = asyncio.get_running_loop().create_future()
+        if not self.queue:
+            asyncio.get_running_loop().call_soon(lambda: asyncio.ensure_future(self._flush()))
+        self.queue.append(((transaction, private_key), future))
+        with timed('sign', 'transaction'):
+            return await future
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+_signer: Optional[TransactionSigner] = None
+
+def get_signer() -> TransactionSigner:
+    """The process-wide transaction signer"""
+    global _signer
+    if _signer is None:
+        _signer = TransactionSigner()
+        atexit.register(_signer.close)
+    return _signer
@@ -0,0 +1,50 @@
+"""
+Timings module letting benchmarks and metrics observe how long RPC calls, API requests, signing and confirmations take
+"""
+import contextlib
+import time
+from typing import Callable, Iterator, List
+from utils.tracing import span, tracing_enabled
+
+# hook(kind, name, seconds, ok): kind is 'connect', 'rpc', 'http', 'sign' or 'confirm';
+# name is the RPC method, the API URL path or the client's endpoints
+TimingHook = Callable[[str, str, float, bool], None]
+
+_hooks: List[TimingHook] = []
+
+def add_timing_hook(hook: TimingHook):
+    _hooks.append(hook)
+
+def remove_timing_hook(hook: TimingHook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+def record_timing(kind: str, name: str, seconds: float, ok: bool = True):
+    for hook in list(_hooks):
+        hook(kind, name, seconds, ok)
+
+CLIENT_KINDS = ('connect', 'rpc', 'http')  # Traced as calls to a remote service
+
+@contextlib.contextmanager
+def timed(kind: str, name: str, **attributes) -> Iterator[None]:
+    """Report the duration of the block to every hook and trace it as a "<kind> <name>" span with
+    the given attributes; ok is False when it raised"""
+    if tracing_enabled():
+        with span(f"{kind} {name}", client=kind in CLIENT_KINDS, **attributes), _timed(kind, name):
+            yield
+    else:
+        with _timed(kind, name):
+            yield
+
+@contextlib.contextmanager
+def _timed(kind: str, name: str) -> Iterator[None]:
+    if not _hooks:
+        yield
+        return
+    started = time.perf_counter()
+    ok = False
+    try:
+        yield
+        ok = True
+    finally:
+        record_timing(kind, name, time.perf_counter() - started, ok)
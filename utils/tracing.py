@@ -0,0 +1,215 @@
+"""
+Tracing module recording bot runs and their phases as spans, written from a background thread to
+rotating JSON lines files in the OpenTelemetry collector's OTLP/JSON file format
+"""
+import atexit
+import contextlib
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from config import TRACING_CONFIG
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    __slots__ = ('name', 'trace_id', 'span_id', 'parent_id', 'kind', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start = time.time_ns()
+        self.end = 0
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def to_otlp(self) -> dict:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': self.kind,
+            'startTimeUnixNano': str(self.start),
+            'endTimeUnixNano': str(self.end),
+            'attributes': [{'key': key, 'value': otlp_value(value)} for key, value in self.attributes.items() if value is not None],
+            'status': {'code': STATUS_ERROR, 'message': self.error} if self.error is not None else {'code': STATUS_OK},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+def otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}  # OTLP/JSON carries 64-bit integers as strings
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+class TraceWriter:
+    """Appends finished spans to <directory>/spans-<pid>.jsonl from a daemon thread
+
+    Each line is one OTLP ExportTraceServiceRequest holding the spans finished since the previous
+    line, so the files can be fed to an OpenTelemetry collector's otlpjsonfile receiver. The file is
+    rotated to .1, .2, ... once it passes max_bytes, keeping `backups` old files.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, backups: int, service: str):
+        self.path = os.path.join(directory, f"spans-{os.getpid()}.jsonl")
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.resource = {'attributes': [
+            {'key': 'service.name', 'value': otlp_value(service)},
+            {'key': 'process.pid', 'value': otlp_value(os.getpid())},
+        ]}
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name='trace-writer', daemon=True)
+        self.thread.start()
+
+    def submit(self, span: Span):
+        self.queue.put(span)
+
+    def _run(self):
+        f = open(self.path, 'a', encoding='utf-8')
+        try:
+            done = False
+            while not done:
+                span = self.queue.get()
+                done = span is None
+                spans = [] if done else [span]
+                # Everything already queued goes out in the same line
+                while not done:
+                    try:
+                        span = self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if span is None:
+                        done = True
+                    else:
+                        spans.append(span)
+                if spans:
+                    f.write(json.dumps(self.export(spans), separators=(',', ':')) + '\n')
+                    f.flush()
+                    if f.tell() >= self.max_bytes:
+                        f.close()
+                        self._rotate()
+                        f = open(self.path, 'a', encoding='utf-8')
+        finally:
+            f.close()
+
+    def export(self, spans: List[Span]) -> dict:
+        return {'resourceSpans': [{
+            'resource': self.resource,
+            'scopeSpans': [{'scope': {'name': 'monad-bot'}, 'spans': [span.to_otlp() for span in spans]}],
+        }]}
+
+    def _rotate(self):
+        for index in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{index}"):
+                os.replace(f"{self.path}.{index}", f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def close(self):
+        """Write out every queued span and stop the thread"""
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar('current_span', default=None)
+_writer: Optional[TraceWriter] = None
+_writer_lock = threading.Lock()
+
+def tracing_enabled() -> bool:
+    return TRACING_CONFIG['enabled']
+
+def get_writer() -> TraceWriter:
+    """The process-wide trace writer, started on the first finished span"""
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = TraceWriter(TRACING_CONFIG['directory'], TRACING_CONFIG['max_bytes'], TRACING_CONFIG['backups'], TRACING_CONFIG['service'])
+            atexit.register(_writer.close)
+    return _writer
+
+def parse_traceparent(header: str) -> Optional[Tuple[str, str]]:
+    """(trace id, parent span id) from a W3C traceparent header"""
+    parts = header.strip().split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+@functools.lru_cache(maxsize=1)
+def remote_parent() -> Optional[Tuple[str, str]]:
+    """Parent span handed down by the process that started this one, see traceparent()"""
+    return parse_traceparent(os.getenv('TRACEPARENT', ''))
+
+def traceparent() -> Optional[str]:
+    """W3C traceparent of the current span, passed to bot subprocesses so their spans join the trace"""
+    current = _current.get()
+    return f"00-{current.trace_id}-{current.span_id}-01" if current is not None else None
+
+@contextlib.contextmanager
+def span(name: str, client: bool = False, **attributes) -> Iterator[Optional[Span]]:
+    """Trace the block as a child of the current span; yields None when tracing is off
+
+    An exception leaving the block marks the span as failed. client=True is for calls to a remote
+    service (RPC, HTTP API), which is how OpenTelemetry tells apart waiting from working.
+    """
+    if not TRACING_CONFIG['enabled']:
+        yield None
+        return
+    parent = _current.get()
+    if parent is not None:
+        trace_id, parent_id = parent.trace_id, parent.span_id
+    else:
+        trace_id, parent_id = remote_parent() or (os.urandom(16).hex(), None)
+    current = Span(name, trace_id, parent_id, SPAN_KIND_CLIENT if client else SPAN_KIND_INTERNAL, attributes)
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        if current.error is None:
+            current.error = str(e) or type(e).__name__
+        raise
+    finally:
+        _current.reset(token)
+        current.end = time.time_ns()
+        get_writer().submit(current)
+
+def traced(name: Optional[str] = None) -> Callable:
+    """Decorator tracing every call of a coroutine function as a span named after it"""
+    def decorate(function: Callable) -> Callable:
+        span_name = name or function.__name__
+
+        @functools.wraps(function)
+        async def wrapper(*args, **kwargs):
+            with span(span_name):
+                return await function(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def annotate(**attributes):
+    """Add attributes (tx hash, endpoint, ...) to the current span, if there is one"""
+    current = _current.get()
+    if current is not None:
+        current.attributes.update(attributes)
+
+def fail(error: Any):
+    """Mark the current span as failed without raising, for errors the caller handles"""
+    current = _current.get()
+    if current is not None:
+        current.error = str(error) or type(error).__name__
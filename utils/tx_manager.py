@@ -0,0 +1,227 @@
+"""
+Transaction manager module sending transactions with local nonces and replacing them when they get stuck
+"""
+import asyncio
+import math
+import weakref
+from typing import Any, Dict, List, Optional
+from hexbytes import HexBytes
+from web3 import AsyncWeb3
+from web3.datastructures import AttributeDict
+from web3.exceptions import TimeExhausted, Web3RPCError
+from config import RPC_CONFIG
+from utils.fee_oracle import FeeData, get_fee_oracle
+from utils.gas_profile import get_gas_profile
+from utils.logger import Logger
+from utils.nonce_manager import KNOWN_ERRORS, NONCE_ERRORS, error_text, get_nonce_manager
+from utils.receipt_tracker import get_receipt_tracker, tx_key
+from utils.signer import get_account, get_signer
+from utils.timings import timed
+
+class TrackedTransaction:
+    """A broadcast transaction together with every replacement sent for its nonce"""
+
+    def __init__(self, transaction: Dict[str, Any], private_key: str):
+        self.transaction = transaction  # Fields of the latest version, nonce included
+        self.private_key = private_key
+        # Heads first seen by the receipt tracker after the latest and the first version were broadcast
+        self.sent_block: Optional[int] = None
+        self.first_block: Optional[int] = None
+        self.priority_fee = transaction.get('maxPriorityFeePerGas')  # Tip of the first version
+        self.hashes: List[HexBytes] = []
+
+def bump_fees(transaction: Dict[str, Any], fees: Optional[FeeData], bump: float) -> Dict[str, int]:
+    """Fee fields for a replacement: the old ones times `bump`, raised to the current network fees if higher
+
+    Nodes only accept a replacement whose fee fields all grow by at least 10% (geth) to 12.5%.
+    Returns an empty dict for a transaction without fee fields.
+    """
+    if 'maxFeePerGas' in transaction:
+        priority_fee = math.ceil(transaction['maxPriorityFeePerGas'] * bump)
+        max_fee = math.ceil(transaction['maxFeePerGas'] * bump)
+        if fees is not None and fees.base_fee is not None:
+            priority_fee = max(priority_fee, fees.priority_fee or 0)
+            max_fee = max(max_fee, fees.base_fee * 2 + priority_fee)
+        return {'maxFeePerGas': max(max_fee, priority_fee), 'maxPriorityFeePerGas': priority_fee}
+    if 'gasPrice' in transaction:
+        gas_price = math.ceil(transaction['gasPrice'] * bump)
+        if fees is not None:
+            gas_price = max(gas_price, fees.gas_price)
+        return {'gasPrice': gas_price}
+    return {}
+
+class TxManager:
+    def __init__(self, w3: AsyncWeb3):
+        self.client = weakref.ref(w3)
+        self.tracked: Dict[str, TrackedTransaction] = {}  # Every hash of a pending nonce -> its record
+        self.stats = {'sent': 0, 'replaced': 0, 'landed_original': 0, 'landed_replacement': 0}
+
+    @property
+    def w3(self) -> AsyncWeb3:
+        w3 = self.client()
+        if w3 is None:
+            raise RuntimeError("The AsyncWeb3 client is gone")
+        return w3
+
+    async def send(self, transaction: Dict[str, Any], private_key: str, retries: int = 2) -> HexBytes:
+        """Fill in a locally allocated nonce, sign and broadcast a transaction, returning its hash
+
+        Nonce errors from the node trigger a resync and a retry with a fresh nonce.
+        """
+        address = transaction.get('from') or get_account(private_key).address
+        manager = get_nonce_manager(self.w3, address)
+        for attempt in range(retries + 1):
+            nonce = await manager.allocate()
+            signed_fields = dict(transaction, nonce=nonce)
+            signed = await get_signer().sign(signed_fields, private_key)
+            try:
+                tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+            except Exception as e:
+                message = error_text(e)
+                if any(known in message for known in KNOWN_ERRORS):
+                    tx_hash = HexBytes(signed.hash)
+                elif any(nonce_error in message for nonce_error in NONCE_ERRORS):
+                    await manager.reset()
+                    if attempt < retries:
+                        Logger.warning(f"Nonce {nonce} rejected for {address[:8]}... ({message}), resyncing")
+                        continue
+                    raise
+                else:
+                    if isinstance(e, (Web3RPCError, ValueError)):
+                        # The node answered and refused the transaction, so the nonce is still free
+                        await manager.release(nonce)
+                    else:
+                        # The request may or may not have reached the node
+                        await manager.reset()
+                    raise
+
+            tracked = TrackedTransaction(signed_fields, private_key)
+            tracked.hashes.append(tx_hash)
+            self.tracked[tx_key(tx_hash)] = tracked
+            self.stats['sent'] += 1
+            return tx_hash
+
+    async def replace(self, tracked: TrackedTransaction, head: int) -> Optional[HexBytes]:
+        """Re-sign the tracked nonce with bumped fees and broadcast it, returning the new hash if accepted"""
+        try:
+            fees = await get_fee_oracle(self.w3).get_fee_data()
+        except Exception:
+            fees = None
+        bumped = bump_fees(tracked.transaction, fees, RPC_CONFIG['replace_bump'])
+        if not bumped:
+            return None
+        transaction = dict(tracked.transaction, **bumped)
+        signed = await get_signer().sign(transaction, tracked.private_key)
+        blocks = head - tracked.sent_block
+        tracked.sent_block = head
+        try:
+            tx_hash = await self.w3.eth.send_raw_transaction(signed.raw_transaction)
+        except Exception as e:
+            message = error_text(e)
+            if not any(known in message for known in KNOWN_ERRORS):
+                if 'underpriced' in message:
+                    # Compound on the next bump instead of retrying the same fees
+                    tracked.transaction = transaction
+                # 'nonce too low' means one of the versions already landed; its receipt will show up
+                Logger.warning(f"Replacement of nonce {transaction['nonce']} rejected: {message}")
+                return None
+            tx_hash = HexBytes(signed.hash)
+
+        tracked.transaction = transaction
+        tracked.hashes.append(tx_hash)
+        self.tracked[tx_key(tx_hash)] = tracked
+        self.stats['replaced'] += 1
+        Logger.warning(
+            f"Nonce {transaction['nonce']} pending for {blocks} blocks, replaced with "
+            f"{', '.join(f'{field}={value}' for field, value in bumped.items())}: {tx_key(tx_hash)}"
+        )
+        return tx_hash
+
+    async def wait(self, tx_hash: Any, timeout: float = 300) -> AttributeDict:
+        """Wait for the receipt of whichever version of the transaction is mined
+
+        The nonce is re-sent with bumped fees each time it stays pending for
+        RPC_CONFIG['replace_after_blocks'] blocks, at most RPC_CONFIG['replace_max'] times.
+        """
+        with timed('confirm', 'receipt', tx_hash=tx_key(tx_hash)):
+            return await self._wait(tx_hash, timeout)
+
+    async def _wait(self, tx_hash: Any, timeout: float) -> AttributeDict:
+        tracker = get_receipt_tracker(self.w3)
+        tracked = self.tracked.get(tx_key(tx_hash))
+        if tracked is None:
+            return await tracker.wait(tx_hash, timeout)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        waiting = {asyncio.ensure_future(tracker.wait(version, timeout)): version for version in tracked.hashes}
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise TimeExhausted(f"Transaction {tx_key(tx_hash)} is not in the chain after {timeout} seconds")
+                if waiting:
+                    done, _ = await asyncio.wait(waiting, timeout=min(tracker.poll_interval, remaining), return_when=asyncio.FIRST_COMPLETED)
+                else:
+                    done = set()
+                    await asyncio.sleep(min(tracker.poll_interval, remaining))
+                for task in done:
+                    version = waiting.pop(task)
+                    if task.exception() is not None:
+                        continue
+                    receipt = task.result()
+                    index = tracked.hashes.index(version)
+                    if index:
+                        self.stats['landed_replacement'] += 1
+                        Logger.info(f"Replacement {index} of nonce {tracked.transaction['nonce']} was mined: {tx_key(version)}")
+                    else:
+                        self.stats['landed_original'] += 1
+                    profile = get_gas_profile()
+                    if profile is not None:
+                        profile.record_receipt(tracked.transaction, receipt)
+                    if tracked.priority_fee is not None and tracked.first_block is not None:
+                        # Measured from the first broadcast, so a needed replacement counts against the original tip
+                        get_fee_oracle(self.w3).controller.record_inclusion(
+                            tracked.priority_fee, max(receipt.blockNumber - tracked.first_block, 0)
+                        )
+                    return receipt
+
+                head = tracker.last_block
+                if head is not None and tracked.sent_block is None:
+                    # Counted from the first head polled after the broadcast; cached heads can be blocks behind
+                    tracked.sent_block = tracked.first_block = head
+                if (head is not None and head - tracked.sent_block >= RPC_CONFIG['replace_after_blocks']
+                        and len(tracked.hashes) <= RPC_CONFIG['replace_max']):
+                    replacement = await self.replace(tracked, head)
+                    if replacement is not None:
+                        waiting[asyncio.ensure_future(tracker.wait(replacement, remaining))] = replacement
+        finally:
+            for task in waiting:
+                task.cancel()
+            for version in tracked.hashes:
+                self.tracked.pop(tx_key(version), None)
+
+_managers: 'weakref.WeakKeyDictionary[AsyncWeb3, TxManager]' = weakref.WeakKeyDictionary()
+
+def get_tx_manager(w3: AsyncWeb3) -> TxManager:
+    """The transaction manager shared by every bot using this client"""
+    manager = _managers.get(w3)
+    if manager is None:
+        manager = _managers[w3] = TxManager(w3)
+    return manager
+
+async def send_transaction(w3: AsyncWeb3, transaction: Dict[str, Any], private_key: str, retries: int = 2) -> HexBytes:
+    """Sign and broadcast a transaction with the wallet's next nonce, returning its hash"""
+    return await get_tx_manager(w3).send(transaction, private_key, retries)
+
+async def wait_for_receipt(w3: AsyncWeb3, tx_hash: HexBytes, address: str, timeout: float = 300) -> AttributeDict:
+    """Wait for a receipt, replacing the transaction with higher fees while it is stuck
+
+    The returned receipt may belong to a replacement; its transactionHash says which one.
+    On timeout the transaction was probably dropped, so the wallet's nonce is resynced.
+    """
+    try:
+        return await get_tx_manager(w3).wait(tx_hash, timeout)
+    except TimeExhausted:
+        await get_nonce_manager(w3, address).reset()
+        raise
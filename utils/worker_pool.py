@@ -0,0 +1,44 @@
+"""
+Worker pool module for processing several accounts at the same time
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+from utils.logger import Logger
+
+class AccountWorkerPool:
+    def __init__(self, concurrency: int = 1):
+        self.concurrency = max(1, int(concurrency))
+        self.semaphore = asyncio.Semaphore(self.concurrency)
+        self.wallet_locks: Dict[str, asyncio.Lock] = {}
+        self.in_flight = 0
+        self.completed = 0
+        self.total = 0
+
+    def wallet_lock(self, private_key: str) -> asyncio.Lock:
+        """Get the lock that serializes jobs of one wallet"""
+        lock = self.wallet_locks.get(private_key)
+        if lock is None:
+            lock = self.wallet_locks[private_key] = asyncio.Lock()
+        return lock
+
+    async def submit(self, private_key: str, job: Callable[[], Awaitable[Any]]) -> Any:
+        """Run a job once its wallet is free and a worker slot is available"""
+        # Wait for the wallet first so a queued job never holds a worker slot
+        async with self.wallet_lock(private_key):
+            async with self.semaphore:
+                self.in_flight += 1
+                Logger.status("pool", f"{self.in_flight}/{self.concurrency} in flight, {self.completed}/{self.total} done")
+                try:
+                    return await job()
+                finally:
+                    self.in_flight -= 1
+                    self.completed += 1
+
+    async def run_all(self, jobs: List[Tuple[str, Callable[[], Awaitable[Any]]]]) -> List[Any]:
+        """Run (private_key, job) pairs and return their results in order"""
+        self.total += len(jobs)
+        results = await asyncio.gather(*(self.submit(key, job) for key, job in jobs), return_exceptions=True)
+        for result in results:
+            if isinstance(result, Exception):
+                Logger.error(f"Account job raised an exception: {result}")
+        return results
@@ -0,0 +1,161 @@
+"""
+WebSocket subscription module sharing eth_subscribe streams (newHeads, logs) between every bot
+"""
+import asyncio
+import itertools
+import json
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import aiohttp
+from config import RPC_CONFIG
+from utils.logger import Logger
+
+SubscriptionHandle = Tuple[str, Callable[[Any], None]]
+
+class SubscriptionFeed:
+    """One WebSocket connection fanning eth_subscribe notifications out to any number of callbacks
+
+    Each distinct subscription (e.g. newHeads, or logs with one filter) is made once on the
+    node however many callbacks listen to it. A dropped connection is re-established with
+    backoff, moving on to the next URL, and every subscription is made again.
+    """
+
+    def __init__(self, urls: List[str], get_session: Callable[[], aiohttp.ClientSession]):
+        self.urls = list(urls)
+        self.get_session = get_session
+        self.ws: Optional[aiohttp.ClientWebSocketResponse] = None
+        self.connected = asyncio.Event()
+        self.params: Dict[str, List[Any]] = {}  # key -> eth_subscribe params
+        self.callbacks: Dict[str, List[Callable[[Any], None]]] = {}
+        self.subscription_ids: Dict[str, str] = {}  # node subscription id -> key
+        self.requests: Dict[int, asyncio.Future] = {}
+        self.subscribing: Dict[int, str] = {}  # eth_subscribe request id -> key
+        self.ids = itertools.count(1)
+        self.task: Optional[asyncio.Task] = None
+
+    async def _request(self, method: str, params: List[Any], key: Optional[str] = None) -> Any:
+        if self.ws is None or self.ws.closed:
+            raise ConnectionError("WebSocket feed is not connected")
+        request_id = next(self.ids)
+        future = self.requests[request_id] = asyncio.get_running_loop().create_future()
+        if key is not None:
+            self.subscribing[request_id] = key
+        try:
+            await self.ws.send_str(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method, 'params': params}))
+            response = await asyncio.wait_for(future, RPC_CONFIG['timeout'])
+        finally:
+            self.requests.pop(request_id, None)
+            self.subscribing.pop(request_id, None)
+        if 'error' in response:
+            raise ValueError(f"{method} failed: {response['error']}")
+        return response['result']
+
+    async def _subscribe_on_node(self, key: str):
+        subscription_id = await self._request('eth_subscribe', self.params[key], key)
+        if key not in self.params:
+            # Every callback unsubscribed while the request was in flight
+            self.subscription_ids.pop(subscription_id, None)
+            await self._request('eth_unsubscribe', [subscription_id])
+
+    async def subscribe(self, kind: str, *args: Any, callback: Callable[[Any], None]) -> SubscriptionHandle:
+        """Call `callback` with every notification of an eth_subscribe stream, e.g. ('newHeads') or ('logs', filter)"""
+        params = [kind, *args]
+        key = json.dumps(params, sort_keys=True)
+        self.callbacks.setdefault(key, []).append(callback)
+        if key not in self.params:
+            self.params[key] = params
+            if self.ws is not None and not self.ws.closed:
+                try:
+                    await self._subscribe_on_node(key)
+                except Exception as e:
+                    Logger.warning(f"Subscribing to {kind} failed, retrying on reconnect: {e}")
+        return key, callback
+
+    async def unsubscribe(self, handle: SubscriptionHandle):
+        """Remove a callback; the node subscription is cancelled once nobody listens to it"""
+        key, callback = handle
+        callbacks = self.callbacks.get(key, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+        if callbacks:
+            return
+        self.callbacks.pop(key, None)
+        self.params.pop(key, None)
+        for subscription_id, subscribed_key in list(self.subscription_ids.items()):
+            if subscribed_key == key:
+                del self.subscription_ids[subscription_id]
+                try:
+                    await self._request('eth_unsubscribe', [subscription_id])
+                except Exception:
+                    pass  # Gone with the connection anyway
+
+    def _dispatch(self, message: Dict[str, Any]):
+        if message.get('method') == 'eth_subscription':
+            params = message.get('params', {})
+            key = self.subscription_ids.get(params.get('subscription'))
+            for callback in list(self.callbacks.get(key, ())):
+                try:
+                    callback(params.get('result'))
+                except Exception as e:
+                    Logger.warning(f"Subscription callback failed: {e}")
+            return
+        request_id = message.get('id')
+        if request_id in self.subscribing and 'result' in message:
+            # Registered here rather than in the caller so notifications right after the reply are not lost
+            self.subscription_ids[message['result']] = self.subscribing[request_id]
+        future = self.requests.get(request_id)
+        if future is not None and not future.done():
+            future.set_result(message)
+
+    async def _resubscribe(self):
+        for key in list(self.params):
+            try:
+                await self._subscribe_on_node(key)
+            except Exception as e:
+                Logger.warning(f"Resubscribing to {self.params.get(key, [key])[0]} failed: {e}")
+
+    async def _run(self):
+        delay = 1
+        for url in itertools.cycle(self.urls):
+            try:
+                async with self.get_session().ws_connect(url, heartbeat=RPC_CONFIG['ws_heartbeat']) as ws:
+                    self.ws = ws
+                    self.subscription_ids.clear()
+                    self.connected.set()
+                    Logger.info(f"WebSocket feed connected: {url}")
+                    delay = 1
+                    resubscribe = asyncio.ensure_future(self._resubscribe())
+                    async for message in ws:
+                        if message.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        payload = json.loads(message.data)
+                        for item in payload if isinstance(payload, list) else [payload]:
+                            self._dispatch(item)
+                    resubscribe.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                Logger.warning(f"WebSocket {url} failed: {e or type(e).__name__}")
+            finally:
+                self.ws = None
+                self.connected.clear()
+                for future in self.requests.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("WebSocket connection closed"))
+            Logger.warning(f"WebSocket feed disconnected, reconnecting in {delay}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RPC_CONFIG['ws_max_backoff'])
+
+    async def start(self, timeout: Optional[float] = None) -> bool:
+        """Start the connection loop and wait for the first connection; False if it did not come up in time"""
+        if self.task is None or self.task.done():
+            self.task = asyncio.ensure_future(self._run())
+        try:
+            await asyncio.wait_for(self.connected.wait(), timeout or RPC_CONFIG['timeout'])
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None